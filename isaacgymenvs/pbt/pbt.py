@@ -43,6 +43,7 @@ from rl_games.algos_torch.torch_ext import safe_filesystem_op, safe_save
 from rl_games.common.algo_observer import AlgoObserver
 
 from isaacgymenvs.pbt.mutation import mutate
+from isaacgymenvs.pbt.population_registry import PopulationRegistry
 from isaacgymenvs.utils.reformat import omegaconf_to_dict
 from isaacgymenvs.utils.utils import flatten_dict, project_tmp_dir, safe_ensure_dir_exists
 
@@ -104,6 +105,7 @@ class PbtParams:
         self.num_envs = params["task"]["env"]["numEnvs"]
 
         self.workspace = pbt_params["workspace"]
+        self.population_registry = pbt_params.get("population_registry", False)
 
         self.interval_steps = pbt_params["interval_steps"]
         self.start_after_steps = pbt_params["start_after"]
@@ -209,6 +211,7 @@ class PbtAlgoObserver(AlgoObserver):
         self.algo: Optional[RLAlgo] = None
 
         self.pbt_workspace_dir = self.curr_policy_workspace_dir = None
+        self.registry: Optional[PopulationRegistry] = None
 
         self.pbt_iteration = -1  # dummy value, stands for "not initialized"
         self.initial_env_frames = -1  # env frames at the beginning of the experiment, can be > 0 if we resume
@@ -236,6 +239,10 @@ class PbtAlgoObserver(AlgoObserver):
         self.curr_policy_workspace_dir = self._policy_workspace_dir(self.pbt_params.policy_idx)
         os.makedirs(self.curr_policy_workspace_dir, exist_ok=True)
 
+        if self.pbt_params.population_registry:
+            self.registry = PopulationRegistry(join(self.pbt_workspace_dir, "population.db"))
+            self.registry.sync_from_workspace(self.pbt_workspace_dir, self.pbt_num_policies)
+
     def process_infos(self, infos, done_indices):
         if "true_objective" in infos:
             done_indices_lst = done_indices.squeeze(-1).tolist()
@@ -524,6 +531,9 @@ class PbtAlgoObserver(AlgoObserver):
             print(f"Policy {self.policy_idx}: Saving {pbt_checkpoint_file}...")
             yaml.dump(pbt_checkpoint, fobj)
 
+        if self.registry is not None:
+            self.registry.add_checkpoint(self.policy_idx, pbt_checkpoint)
+
     def _policy_workspace_dir(self, policy_idx):
         return join(self.pbt_workspace_dir, f"{policy_idx:03d}")
 
@@ -532,6 +542,12 @@ class PbtAlgoObserver(AlgoObserver):
         Load checkpoints for other policies in the population.
         Pick the newest checkpoint, but not newer than our current iteration.
         """
+        if self.registry is not None:
+            checkpoints = self.registry.latest_checkpoints(self.pbt_num_policies, self.pbt_iteration)
+            print(f"Policy {self.policy_idx}: Loaded population checkpoints from registry")
+            assert self.policy_idx in checkpoints.keys()
+            return checkpoints
+
         checkpoints = dict()
 
         for policy_idx in range(self.pbt_num_policies):
@@ -568,12 +584,17 @@ class PbtAlgoObserver(AlgoObserver):
 
         best_objective_so_far = _UNINITIALIZED_VALUE
 
-        best_policy_checkpoint_files = [f for f in os.listdir(best_policy_workspace_dir) if f.endswith(".yaml")]
-        best_policy_checkpoint_files.sort(reverse=True)
-        if best_policy_checkpoint_files:
-            with open(join(best_policy_workspace_dir, best_policy_checkpoint_files[0]), "r") as fobj:
-                best_policy_checkpoint_so_far = safe_filesystem_op(yaml.load, fobj, Loader=yaml.FullLoader)
-                best_objective_so_far = best_policy_checkpoint_so_far["true_objective"]
+        if self.registry is not None:
+            registered_best_objective = self.registry.best_objective(self.policy_idx)
+            if registered_best_objective is not None:
+                best_objective_so_far = registered_best_objective
+        else:
+            best_policy_checkpoint_files = [f for f in os.listdir(best_policy_workspace_dir) if f.endswith(".yaml")]
+            best_policy_checkpoint_files.sort(reverse=True)
+            if best_policy_checkpoint_files:
+                with open(join(best_policy_workspace_dir, best_policy_checkpoint_files[0]), "r") as fobj:
+                    best_policy_checkpoint_so_far = safe_filesystem_op(yaml.load, fobj, Loader=yaml.FullLoader)
+                    best_objective_so_far = best_policy_checkpoint_so_far["true_objective"]
 
         if best_objective_so_far >= best_objective:
             # don't save the checkpoint if it is worse than the best checkpoint so far
@@ -603,6 +624,9 @@ class PbtAlgoObserver(AlgoObserver):
             for best_policy_checkpoint_file in best_policy_checkpoint_files[n_to_keep:]:
                 os.remove(join(best_policy_workspace_dir, best_policy_checkpoint_file))
 
+            if self.registry is not None:
+                self.registry.set_best_objective(self.policy_idx, best_objective, best_policy_checkpoint_name)
+
         except Exception as exc:
             print(f"Policy {self.policy_idx}: Exception {exc} when copying best checkpoint!")
             # no big deal if this fails, hopefully the next time we will succeeed
@@ -630,6 +654,7 @@ class PbtAlgoObserver(AlgoObserver):
 
         pbt_checkpoint_files = [f for f in os.listdir(self.curr_policy_workspace_dir)]
 
+        removed_iterations = []
         for f in pbt_checkpoint_files:
             if "." in f:
                 iteration_idx = int(f.split(".")[0])
@@ -637,6 +662,11 @@ class PbtAlgoObserver(AlgoObserver):
                     print(f"Policy {self.policy_idx}: PBT cleanup: removing checkpoint {f}")
                     # we catch all exceptions in this function so no need to use safe_filesystem_op
                     os.remove(join(self.curr_policy_workspace_dir, f))
+                    if f.endswith(".yaml"):
+                        removed_iterations.append(iteration_idx)
+
+        if self.registry is not None:
+            self.registry.remove_checkpoints(self.policy_idx, removed_iterations)
 
         # Sometimes, one of the PBT processes can get stuck, or crash, or be scheduled significantly later on Slurm
         # or a similar cluster management system.
@@ -689,4 +719,7 @@ class PbtAlgoObserver(AlgoObserver):
             )
             os.remove(join(self.curr_policy_workspace_dir, file_to_remove))
 
+        if self.registry is not None:
+            self.registry.remove_checkpoints(self.policy_idx, [_iter(best_candidate_file)])
+
         return True
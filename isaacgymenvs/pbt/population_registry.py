@@ -0,0 +1,184 @@
+# Copyright (c) 2018-2023, NVIDIA Corporation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Population registry for PBT: a single SQLite database in the PBT workspace that indexes the PBT checkpoints and
+best objectives of all policies, so that a PBT iteration does not have to list and parse the yaml files of every
+policy workspace.
+
+The database runs in WAL mode, so readers never block the writer and an interrupted write is rolled back.
+WAL relies on shared memory between processes, so the workspace must be on a local filesystem of a single host.
+"""
+
+import json
+import os
+import sqlite3
+from typing import Dict, List, Optional
+
+import yaml
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    policy_idx INTEGER NOT NULL,
+    iteration INTEGER NOT NULL,
+    true_objective REAL NOT NULL,
+    frame INTEGER NOT NULL,
+    params TEXT NOT NULL,
+    checkpoint TEXT NOT NULL,
+    pbt_checkpoint TEXT NOT NULL,
+    experiment_name TEXT NOT NULL,
+    PRIMARY KEY (policy_idx, iteration)
+);
+CREATE TABLE IF NOT EXISTS best_policies (
+    owner_idx INTEGER PRIMARY KEY,
+    true_objective REAL NOT NULL,
+    name TEXT NOT NULL
+);
+"""
+
+_CHECKPOINT_COLUMNS = [
+    "iteration",
+    "true_objective",
+    "frame",
+    "params",
+    "checkpoint",
+    "pbt_checkpoint",
+    "experiment_name",
+]
+
+
+def _load_yaml(path: str) -> Optional[Dict]:
+    try:
+        with open(path, "r") as fobj:
+            content = yaml.load(fobj, Loader=yaml.FullLoader)
+        return content if isinstance(content, dict) else None
+    except (OSError, yaml.YAMLError) as exc:
+        # the file may have been removed by a cleanup, or be partially written by a crashed process
+        print(f"Could not load {path}: {exc}")
+        return None
+
+
+class PopulationRegistry:
+    def __init__(self, path: str, timeout: float = 60.0):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def add_checkpoint(self, policy_idx: int, pbt_checkpoint: Dict) -> None:
+        """Register a PBT checkpoint with the same fields as the PBT checkpoint yaml file."""
+        values = dict(pbt_checkpoint, params=json.dumps(pbt_checkpoint["params"]))
+        with self.conn:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO checkpoints (policy_idx, {', '.join(_CHECKPOINT_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' * len(_CHECKPOINT_COLUMNS))})",
+                [policy_idx] + [values[column] for column in _CHECKPOINT_COLUMNS],
+            )
+
+    def remove_checkpoints(self, policy_idx: int, iterations: List[int]) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM checkpoints WHERE policy_idx = ? AND iteration = ?",
+                [(policy_idx, iteration) for iteration in iterations],
+            )
+
+    def latest_checkpoints(self, num_policies: int, max_iteration: int) -> Dict[int, Optional[Dict]]:
+        """
+        Newest checkpoint of every policy that is not newer than max_iteration, None for policies without one.
+        One indexed query over the (policy_idx, iteration) primary key.
+        """
+        rows = self.conn.execute(
+            f"SELECT c.policy_idx, {', '.join('c.' + column for column in _CHECKPOINT_COLUMNS)} "
+            "FROM checkpoints c JOIN ("
+            "  SELECT policy_idx, MAX(iteration) AS iteration FROM checkpoints WHERE iteration <= ? GROUP BY policy_idx"
+            ") latest ON c.policy_idx = latest.policy_idx AND c.iteration = latest.iteration",
+            (max_iteration,),
+        ).fetchall()
+
+        checkpoints: Dict[int, Optional[Dict]] = {policy_idx: None for policy_idx in range(num_policies)}
+        for row in rows:
+            if row[0] not in checkpoints:
+                continue
+            checkpoint = dict(zip(_CHECKPOINT_COLUMNS, row[1:]))
+            checkpoint["params"] = json.loads(checkpoint["params"])
+            checkpoints[row[0]] = checkpoint
+        return checkpoints
+
+    def sync_from_workspace(self, workspace_dir: str, num_policies: int) -> None:
+        """
+        Register PBT checkpoint yaml files and best policy checkpoints found in the workspace but missing from the
+        registry, e.g. when the registry is enabled in an existing workspace, or after a crash between writing a
+        checkpoint file and registering it.
+        """
+        registered = set(self.conn.execute("SELECT policy_idx, iteration FROM checkpoints").fetchall())
+
+        for policy_idx in range(num_policies):
+            policy_workspace_dir = os.path.join(workspace_dir, f"{policy_idx:03d}")
+            if os.path.isdir(policy_workspace_dir):
+                for pbt_checkpoint_file in os.listdir(policy_workspace_dir):
+                    if not pbt_checkpoint_file.endswith(".yaml"):
+                        continue
+                    if (policy_idx, int(pbt_checkpoint_file.split(".")[0])) in registered:
+                        continue
+                    pbt_checkpoint = _load_yaml(os.path.join(policy_workspace_dir, pbt_checkpoint_file))
+                    if pbt_checkpoint is not None and all(key in pbt_checkpoint for key in _CHECKPOINT_COLUMNS):
+                        self.add_checkpoint(policy_idx, pbt_checkpoint)
+
+            best_policy_workspace_dir = os.path.join(workspace_dir, f"best{policy_idx}")
+            if os.path.isdir(best_policy_workspace_dir):
+                for best_policy_checkpoint_file in os.listdir(best_policy_workspace_dir):
+                    if not best_policy_checkpoint_file.endswith(".yaml"):
+                        continue
+                    best_policy_checkpoint = _load_yaml(
+                        os.path.join(best_policy_workspace_dir, best_policy_checkpoint_file)
+                    )
+                    if best_policy_checkpoint is None or "true_objective" not in best_policy_checkpoint:
+                        continue
+                    best_objective_so_far = self.best_objective(policy_idx)
+                    if best_objective_so_far is None or best_policy_checkpoint["true_objective"] > best_objective_so_far:
+                        self.set_best_objective(
+                            policy_idx, best_policy_checkpoint["true_objective"], best_policy_checkpoint_file[:-5]
+                        )
+
+    def best_objective(self, owner_idx: int) -> Optional[float]:
+        row = self.conn.execute(
+            "SELECT true_objective FROM best_policies WHERE owner_idx = ?", (owner_idx,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def set_best_objective(self, owner_idx: int, true_objective: float, name: str) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO best_policies (owner_idx, true_objective, name) VALUES (?, ?, ?)",
+                (owner_idx, true_objective, name),
+            )
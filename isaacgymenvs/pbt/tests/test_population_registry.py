@@ -0,0 +1,135 @@
+# Copyright (c) 2018-2023, NVIDIA Corporation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import random
+import time
+from typing import Dict, Optional
+
+import yaml
+
+from isaacgymenvs.pbt.population_registry import PopulationRegistry
+
+
+NUM_POLICIES = 64
+NUM_CHECKPOINTS = 25
+
+
+def scan_latest_checkpoints(workspace_dir: str, num_policies: int, max_iteration: int) -> Dict[int, Optional[Dict]]:
+    """Directory scan done by PbtAlgoObserver._load_population_checkpoints without the registry."""
+    checkpoints: Dict[int, Optional[Dict]] = dict()
+    for policy_idx in range(num_policies):
+        checkpoints[policy_idx] = None
+        policy_workspace_dir = os.path.join(workspace_dir, f"{policy_idx:03d}")
+        if not os.path.isdir(policy_workspace_dir):
+            continue
+        pbt_checkpoint_files = sorted([f for f in os.listdir(policy_workspace_dir) if f.endswith(".yaml")], reverse=True)
+        for pbt_checkpoint_file in pbt_checkpoint_files:
+            if int(pbt_checkpoint_file.split(".")[0]) <= max_iteration:
+                with open(os.path.join(policy_workspace_dir, pbt_checkpoint_file), "r") as fobj:
+                    checkpoints[policy_idx] = yaml.load(fobj, Loader=yaml.FullLoader)
+                break
+    return checkpoints
+
+
+def write_population(workspace_dir: str, registry: Optional[PopulationRegistry] = None) -> None:
+    """Write the PBT checkpoint yaml files of a simulated population, registering them if a registry is given."""
+    rng = random.Random(0)
+    params = {f"train.params.config.param_{i}": rng.random() for i in range(10)}
+
+    for policy_idx in range(NUM_POLICIES):
+        policy_workspace_dir = os.path.join(workspace_dir, f"{policy_idx:03d}")
+        os.makedirs(policy_workspace_dir)
+        # policies progress at different speeds
+        for iteration in range(rng.randint(NUM_CHECKPOINTS // 2, NUM_CHECKPOINTS)):
+            pbt_checkpoint_file = os.path.join(policy_workspace_dir, f"{iteration:06d}.yaml")
+            pbt_checkpoint = {
+                "iteration": iteration,
+                "true_objective": rng.random(),
+                "frame": iteration * 10000000,
+                "params": params,
+                "checkpoint": os.path.join(policy_workspace_dir, f"{iteration:06d}.pth"),
+                "pbt_checkpoint": pbt_checkpoint_file,
+                "experiment_name": f"policy_{policy_idx}",
+            }
+            with open(pbt_checkpoint_file, "w") as fobj:
+                yaml.dump(pbt_checkpoint, fobj)
+            if registry is not None:
+                registry.add_checkpoint(policy_idx, pbt_checkpoint)
+
+
+def test_registry_matches_directory_scan_and_is_faster(tmp_path):
+    workspace_dir = str(tmp_path)
+    registry = PopulationRegistry(os.path.join(workspace_dir, "population.db"))
+    write_population(workspace_dir, registry)
+
+    max_iteration = NUM_CHECKPOINTS - 5
+    assert registry.latest_checkpoints(NUM_POLICIES, max_iteration) == scan_latest_checkpoints(
+        workspace_dir, NUM_POLICIES, max_iteration
+    )
+
+    def timed(fn, repeats=5):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        return (time.perf_counter() - start) / repeats
+
+    scan_time = timed(lambda: scan_latest_checkpoints(workspace_dir, NUM_POLICIES, max_iteration))
+    registry_time = timed(lambda: registry.latest_checkpoints(NUM_POLICIES, max_iteration))
+    print(f"{NUM_POLICIES} policies: directory scan {scan_time * 1000:.2f} ms, registry {registry_time * 1000:.2f} ms")
+    assert registry_time < scan_time
+
+    registry.close()
+
+
+def test_registry_is_backfilled_from_workspace(tmp_path):
+    workspace_dir = str(tmp_path)
+    write_population(workspace_dir)
+
+    best_policy_workspace_dir = os.path.join(workspace_dir, "best3")
+    os.makedirs(best_policy_workspace_dir)
+    for objective in [1.5, 2.5]:
+        with open(os.path.join(best_policy_workspace_dir, f"Task_best_obj_{objective:015.5f}.yaml"), "w") as fobj:
+            yaml.dump({"true_objective": objective}, fobj)
+
+    # registry enabled in an existing workspace
+    registry = PopulationRegistry(os.path.join(workspace_dir, "population.db"))
+    assert all(checkpoint is None for checkpoint in registry.latest_checkpoints(NUM_POLICIES, NUM_CHECKPOINTS).values())
+
+    registry.sync_from_workspace(workspace_dir, NUM_POLICIES)
+    assert registry.latest_checkpoints(NUM_POLICIES, NUM_CHECKPOINTS) == scan_latest_checkpoints(
+        workspace_dir, NUM_POLICIES, NUM_CHECKPOINTS
+    )
+    assert registry.best_objective(3) == 2.5
+    assert registry.best_objective(4) is None
+
+    # syncing again does not change anything
+    registry.sync_from_workspace(workspace_dir, NUM_POLICIES)
+    assert registry.best_objective(3) == 2.5
+
+    registry.close()
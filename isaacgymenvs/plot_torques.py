@@ -1,20 +1,23 @@
-import pickle
+import argparse
+
 import numpy as np
 import matplotlib.pyplot as plt
 
-isaac_torques = pickle.load(open("isaac_torques.pkl", "rb"))
-custom_torques = pickle.load(open("custom_torques.pkl", "rb"))
+from isaacgymenvs.utils.trajectory_recorder import load_trajectory
 
-nb_dofs = 15
+parser = argparse.ArgumentParser()
+parser.add_argument("--isaac", type=str, default="isaac_recordings")
+parser.add_argument("--custom", type=str, default="custom_recordings")
+parser.add_argument("--env", type=int, default=0, help="index into the recorded envs")
+args = parser.parse_args()
 
-isaac_dofs_torques = np.zeros((nb_dofs, len(isaac_torques)))
-custom_dofs_torques = np.zeros((nb_dofs, len(custom_torques)))
+isaac_torques, _, _ = load_trajectory(args.isaac, "torques")
+custom_torques, _, _ = load_trajectory(args.custom, "torques")
 
-for i in range(len(isaac_torques)):
-    isaac_dofs_torques[:, i] = isaac_torques[i]
+nb_dofs = isaac_torques.shape[-1]
 
-for i in range(len(custom_torques)):
-    custom_dofs_torques[:, i] = custom_torques[i]
+isaac_dofs_torques = isaac_torques[:, args.env].T
+custom_dofs_torques = custom_torques[:, args.env].T
 
 
 # one plot per dof in one figure
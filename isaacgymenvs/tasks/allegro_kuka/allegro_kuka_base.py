@@ -29,7 +29,6 @@
 import io
 import math
 import os
-import random
 import tempfile
 from copy import copy
 from os.path import join
@@ -38,7 +37,13 @@ from typing import List, Tuple
 from isaacgym import gymapi, gymtorch, gymutil
 from torch import Tensor
 
-from isaacgymenvs.tasks.allegro_kuka.allegro_kuka_utils import DofParameters, populate_dof_properties
+from isaacgymenvs.tasks.allegro_kuka.allegro_kuka_utils import (
+    DofParameters,
+    EnvStateBank,
+    EnvStateBankWriter,
+    EnvStateBuffer,
+    populate_dof_properties,
+)
 from isaacgymenvs.tasks.base.vec_task import VecTask
 from isaacgymenvs.tasks.allegro_kuka.generate_cuboids import (
     generate_big_cuboids,
@@ -94,10 +99,14 @@ class AllegroKukaBase(VecTask):
 
         self.save_states = self.cfg["env"]["saveStates"]
         self.save_states_filename = self.cfg["env"]["saveStatesFile"]
+        self.save_states_format = self.cfg["env"].get("saveStatesFormat", "stream")
+        assert self.save_states_format in ["stream", "bank"], f"Unknown state format {self.save_states_format}"
+        self.state_bank_writer = None
 
         self.should_load_initial_states = self.cfg["env"]["loadInitialStates"]
         self.load_states_filename = self.cfg["env"]["loadStatesFile"]
         self.initial_root_state_tensors = self.initial_dof_state_tensors = None
+        self.initial_state_bank = None
         self.initial_state_idx = self.num_initial_states = 0
 
         self.reach_goal_bonus = self.cfg["env"]["reachGoalBonus"]
@@ -294,8 +303,6 @@ class AllegroKukaBase(VecTask):
 
         self.root_state_tensor = gymtorch.wrap_tensor(actor_root_state_tensor).view(-1, 13)
 
-        self.set_actor_root_state_object_indices: List[Tensor] = []
-
         self.num_dofs = self.gym.get_sim_dof_count(self.sim) // self.num_envs
         self.prev_targets = torch.zeros((self.num_envs, self.num_dofs), dtype=torch.float, device=self.device)
         self.cur_targets = torch.zeros((self.num_envs, self.num_dofs), dtype=torch.float, device=self.device)
@@ -373,8 +380,18 @@ class AllegroKukaBase(VecTask):
 
         self.last_curriculum_update = 0
 
-        self.episode_root_state_tensors = [[] for _ in range(self.num_envs)]
-        self.episode_dof_states = [[] for _ in range(self.num_envs)]
+        self.env_state_buffer = None
+        if self.save_states:
+            self.env_state_buffer = EnvStateBuffer(
+                self.num_envs,
+                self.cfg["env"].get("saveStatesBufferSize", 50),
+                dict(
+                    root_state=(self.root_state_tensor.shape[0] // self.num_envs, *self.root_state_tensor.shape[1:]),
+                    dof_state=(self.dof_state.shape[0] // self.num_envs, *self.dof_state.shape[1:]),
+                ),
+                self.cfg["env"].get("saveStatesReservoir", True),
+                self.device,
+            )
 
         self.eval_stats: bool = self.cfg["env"]["evalStats"]
         if self.eval_stats:
@@ -1223,26 +1240,6 @@ class AllegroKukaBase(VecTask):
         self.closest_fingertip_dist[env_ids] = -1
         self.furthest_hand_dist[env_ids] = -1
 
-    def deferred_set_actor_root_state_tensor_indexed(self, obj_indices: List[Tensor]) -> None:
-        self.set_actor_root_state_object_indices.extend(obj_indices)
-
-    def set_actor_root_state_tensor_indexed(self) -> None:
-        object_indices: List[Tensor] = self.set_actor_root_state_object_indices
-        if not object_indices:
-            # nothing to set
-            return
-
-        unique_object_indices = torch.unique(torch.cat(object_indices).to(torch.int32))
-
-        self.gym.set_actor_root_state_tensor_indexed(
-            self.sim,
-            gymtorch.unwrap_tensor(self.root_state_tensor),
-            gymtorch.unwrap_tensor(unique_object_indices),
-            len(unique_object_indices),
-        )
-
-        self.set_actor_root_state_object_indices = []
-
     def reset_idx(self, env_ids: Tensor) -> None:
         # randomization can happen only at reset time, since it can reset actor positions on GPU
         if self.randomize:
@@ -1296,15 +1293,19 @@ class AllegroKukaBase(VecTask):
                 if self.initial_state_idx + len(env_ids) > self.num_initial_states:
                     self.initial_state_idx = 0
 
-                dof_states_to_load = self.initial_dof_state_tensors[
-                    self.initial_state_idx : self.initial_state_idx + len(env_ids)
-                ]
-                self.dof_state.reshape([self.num_envs, -1, *self.dof_state.shape[1:]])[
-                    env_ids
-                ] = dof_states_to_load.clone()
-                root_state_tensors_to_load = self.initial_root_state_tensors[
-                    self.initial_state_idx : self.initial_state_idx + len(env_ids)
-                ]
+                if self.initial_state_bank is not None:
+                    initial_states = self.initial_state_bank.get(self.initial_state_idx, len(env_ids))
+                    dof_states_to_load = initial_states["dof_state"]
+                    root_state_tensors_to_load = initial_states["root_state"]
+                else:
+                    dof_states_to_load = self.initial_dof_state_tensors[
+                        self.initial_state_idx : self.initial_state_idx + len(env_ids)
+                    ].clone()
+                    root_state_tensors_to_load = self.initial_root_state_tensors[
+                        self.initial_state_idx : self.initial_state_idx + len(env_ids)
+                    ]
+
+                self.dof_state.reshape([self.num_envs, -1, *self.dof_state.shape[1:]])[env_ids] = dof_states_to_load
                 cube_object_idx = self.object_indices[0]
                 self.root_state_tensor.reshape([self.num_envs, -1, *self.root_state_tensor.shape[1:]])[
                     env_ids, cube_object_idx
@@ -1316,13 +1317,11 @@ class AllegroKukaBase(VecTask):
             self.sim, gymtorch.unwrap_tensor(self.prev_targets), gymtorch.unwrap_tensor(hand_indices), len(env_ids)
         )
 
-        self.gym.set_dof_state_tensor_indexed(
-            self.sim, gymtorch.unwrap_tensor(self.dof_state), gymtorch.unwrap_tensor(hand_indices), len(env_ids)
-        )
+        self.defer_set_dof_state_tensor_indexed(self.dof_state, hand_indices)
 
         object_indices = [self.object_indices[env_ids]]
         object_indices.extend(self._extra_object_indices(env_ids))
-        self.deferred_set_actor_root_state_tensor_indexed(object_indices)
+        self.defer_set_actor_root_state_tensor_indexed(self.root_state_tensor, torch.cat(object_indices))
 
         self.progress_buf[env_ids] = 0
         self.reset_buf[env_ids] = 0
@@ -1368,8 +1367,6 @@ class AllegroKukaBase(VecTask):
         if len(reset_env_ids) > 0:
             self.reset_idx(reset_env_ids)
 
-        self.set_actor_root_state_tensor_indexed()
-
         if self.use_relative_control:
             raise NotImplementedError("Use relative control False for now")
         else:
@@ -1491,17 +1488,12 @@ class AllegroKukaBase(VecTask):
                     gymutil.draw_lines(sphere_geom, self.gym, self.viewer, self.envs[i], goal_keypoint_transform)
 
     def accumulate_env_states(self):
-        root_state_tensor = self.root_state_tensor.reshape(
-            [self.num_envs, -1, *self.root_state_tensor.shape[1:]]
-        ).clone()
-        dof_state = self.dof_state.reshape([self.num_envs, -1, *self.dof_state.shape[1:]]).clone()
-
-        for env_idx in range(self.num_envs):
-            env_root_state_tensor = root_state_tensor[env_idx]
-            self.episode_root_state_tensors[env_idx].append(env_root_state_tensor)
-
-            env_dof_state = dof_state[env_idx]
-            self.episode_dof_states[env_idx].append(env_dof_state)
+        self.env_state_buffer.add(
+            dict(
+                root_state=self.root_state_tensor.reshape([self.num_envs, -1, *self.root_state_tensor.shape[1:]]),
+                dof_state=self.dof_state.reshape([self.num_envs, -1, *self.dof_state.shape[1:]]),
+            )
+        )
 
     def dump_env_states(self, env_ids):
         def write_tensor_to_bin_stream(tensor, stream):
@@ -1511,38 +1503,42 @@ class AllegroKukaBase(VecTask):
             stream.write(int(len(bin_buff)).to_bytes(4, "big"))
             stream.write(bin_buff)
 
-        with open(self.save_states_filename, "ab") as save_states_file:
-            bin_stream = io.BytesIO()
-
-            for env_idx in env_ids:
-                ep_len = len(self.episode_root_state_tensors[env_idx])
-                if ep_len <= 20:
-                    continue
+        # sample states of all finished episodes longer than 20 steps at once, written as a single chunk
+        ep_lens = self.env_state_buffer.num_seen[env_ids]
+        states_to_save = torch.where(ep_lens > 20, torch.clamp(ep_lens // 10, max=50), torch.zeros_like(ep_lens))
+        states = self.env_state_buffer.sample(env_ids, states_to_save)
+        self.env_state_buffer.clear(env_ids)
 
-                states_to_save = min(ep_len // 10, 50)
-                state_indices = random.sample(range(ep_len), states_to_save)
-
-                print(f"Adding {states_to_save} states {state_indices}")
-                bin_stream.write(int(states_to_save).to_bytes(4, "big"))
-
-                root_states = [self.episode_root_state_tensors[env_idx][si] for si in state_indices]
-                dof_states = [self.episode_dof_states[env_idx][si] for si in state_indices]
+        num_states = len(states["root_state"])
+        if num_states == 0:
+            return
 
-                root_states = torch.stack(root_states)
-                dof_states = torch.stack(dof_states)
+        print(f"Adding {num_states} states")
 
-                write_tensor_to_bin_stream(root_states, bin_stream)
-                write_tensor_to_bin_stream(dof_states, bin_stream)
+        if self.save_states_format == "bank":
+            if self.state_bank_writer is None:
+                self.state_bank_writer = EnvStateBankWriter(self.save_states_filename)
+            self.state_bank_writer.append(states)
+            return
 
-                self.episode_root_state_tensors[env_idx] = []
-                self.episode_dof_states[env_idx] = []
+        bin_stream = io.BytesIO()
+        bin_stream.write(int(num_states).to_bytes(4, "big"))
+        write_tensor_to_bin_stream(states["root_state"], bin_stream)
+        write_tensor_to_bin_stream(states["dof_state"], bin_stream)
 
+        with open(self.save_states_filename, "ab") as save_states_file:
             bin_data = bin_stream.getbuffer()
-            if bin_data.nbytes > 0:
-                print(f"Writing {len(bin_data)} to file {self.save_states_filename}")
-                save_states_file.write(bin_data)
+            print(f"Writing {len(bin_data)} to file {self.save_states_filename}")
+            save_states_file.write(bin_data)
 
     def load_initial_states(self):
+        if os.path.isdir(self.load_states_filename):
+            # columnar state bank, memory-mapped instead of deserialized
+            self.initial_state_bank = EnvStateBank(self.load_states_filename, self.device, self.num_envs)
+            self.num_initial_states = len(self.initial_state_bank)
+            print(f"{self.num_initial_states} states mapped from state bank {self.load_states_filename}!")
+            return
+
         loaded_root_states = []
         loaded_dof_states = []
 
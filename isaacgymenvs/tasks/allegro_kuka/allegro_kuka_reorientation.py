@@ -125,7 +125,7 @@ class AllegroKukaReorientation(AllegroKukaBase):
         )
 
         object_indices_to_reset = [self.goal_object_indices[env_ids]]
-        self.deferred_set_actor_root_state_tensor_indexed(object_indices_to_reset)
+        self.defer_set_actor_root_state_tensor_indexed(self.root_state_tensor, torch.cat(object_indices_to_reset))
 
     def _extra_object_indices(self, env_ids: Tensor) -> List[Tensor]:
         return [self.goal_object_indices[env_ids]]
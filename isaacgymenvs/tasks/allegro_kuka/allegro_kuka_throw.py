@@ -112,7 +112,7 @@ class AllegroKukaThrow(AllegroKukaBase):
         self.lifted_object[env_ids] = False
 
         object_indices_to_reset = [self.bucket_object_indices[env_ids], self.object_indices[env_ids]]
-        self.deferred_set_actor_root_state_tensor_indexed(object_indices_to_reset)
+        self.defer_set_actor_root_state_tensor_indexed(self.root_state_tensor, torch.cat(object_indices_to_reset))
 
     def _extra_object_indices(self, env_ids: Tensor) -> List[Tensor]:
         return [self.bucket_object_indices[env_ids]]
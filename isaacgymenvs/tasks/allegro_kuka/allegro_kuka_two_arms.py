@@ -290,8 +290,6 @@ class AllegroKukaTwoArmsBase(VecTask):
 
         self.fingertip_offsets = torch.from_numpy(self.fingertip_offsets).to(self.device).repeat((self.num_envs, 1, 1))
 
-        self.set_actor_root_state_object_indices: List[Tensor] = []
-
         self.prev_targets = torch.zeros(
             (self.num_envs, self.num_arms * self.num_hand_arm_dofs), dtype=torch.float, device=self.device
         )
@@ -1192,26 +1190,6 @@ class AllegroKukaTwoArmsBase(VecTask):
         # since we reset the object, we also should update distances between fingers and the object
         self.closest_fingertip_dist[env_ids] = -1
 
-    def deferred_set_actor_root_state_tensor_indexed(self, obj_indices: List[Tensor]) -> None:
-        self.set_actor_root_state_object_indices.extend(obj_indices)
-
-    def set_actor_root_state_tensor_indexed(self) -> None:
-        object_indices: List[Tensor] = self.set_actor_root_state_object_indices
-        if not object_indices:
-            # nothing to set
-            return
-
-        unique_object_indices = torch.unique(torch.cat(object_indices).to(torch.int32))
-
-        self.gym.set_actor_root_state_tensor_indexed(
-            self.sim,
-            gymtorch.unwrap_tensor(self.root_state_tensor),
-            gymtorch.unwrap_tensor(unique_object_indices),
-            len(unique_object_indices),
-        )
-
-        self.set_actor_root_state_object_indices = []
-
     def reset_idx(self, env_ids: Tensor) -> None:
         # randomization can happen only at reset time, since it can reset actor positions on GPU
         if self.randomize:
@@ -1262,13 +1240,11 @@ class AllegroKukaTwoArmsBase(VecTask):
         self.gym.set_dof_position_target_tensor_indexed(
             self.sim, gymtorch.unwrap_tensor(self.prev_targets), arm_indices_gym, num_arm_indices
         )
-        self.gym.set_dof_state_tensor_indexed(
-            self.sim, gymtorch.unwrap_tensor(self.dof_state), arm_indices_gym, num_arm_indices
-        )
+        self.defer_set_dof_state_tensor_indexed(self.dof_state, arm_indices)
 
         object_indices = [self.object_indices[env_ids]]
         object_indices.extend(self._extra_object_indices(env_ids))
-        self.deferred_set_actor_root_state_tensor_indexed(object_indices)
+        self.defer_set_actor_root_state_tensor_indexed(self.root_state_tensor, torch.cat(object_indices))
 
         self.progress_buf[env_ids] = 0
         self.reset_buf[env_ids] = 0
@@ -1306,8 +1282,6 @@ class AllegroKukaTwoArmsBase(VecTask):
         if len(reset_env_ids) > 0:
             self.reset_idx(reset_env_ids)
 
-        self.set_actor_root_state_tensor_indexed()
-
         if self.use_relative_control:
             raise NotImplementedError("Use relative control False for now")
         else:
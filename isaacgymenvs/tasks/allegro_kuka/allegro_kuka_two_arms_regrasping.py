@@ -105,8 +105,8 @@ class AllegroKukaTwoArmsRegrasping(AllegroKukaTwoArmsBase):
         # since we put the object back on the table, also reset the lifting reward
         self.lifted_object[env_ids] = False
 
-        self.deferred_set_actor_root_state_tensor_indexed(
-            [self.object_indices[env_ids], self.goal_object_indices[env_ids]]
+        self.defer_set_actor_root_state_tensor_indexed(
+            self.root_state_tensor, torch.cat([self.object_indices[env_ids], self.goal_object_indices[env_ids]])
         )
 
     def _extra_object_indices(self, env_ids: Tensor) -> List[Tensor]:
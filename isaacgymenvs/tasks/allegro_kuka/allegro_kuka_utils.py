@@ -29,9 +29,13 @@
 
 from __future__ import annotations
 
+import json
+import os
 from dataclasses import dataclass
-from typing import Tuple, Dict, List
+from typing import Tuple, Dict, List, Optional
 
+import numpy as np
+import torch
 from torch import Tensor
 
 
@@ -156,3 +160,183 @@ def tolerance_successes_objective(
         true_objective = successes + tolerance_objective
 
     return true_objective
+
+
+class EnvStateBuffer:
+    """
+    Preallocated device buffer of the states each env visited during its current episode.
+    States of all envs are written with one scatter per step, so the per-step cost does not depend on the
+    number of envs. With reservoir sampling (algorithm R) each env keeps a uniform sample of all states of its
+    episode in a fixed number of slots, otherwise the most recent states are kept in a ring.
+    """
+
+    def __init__(
+        self, num_envs: int, capacity: int, state_shapes: Dict[str, Tuple[int, ...]], reservoir: bool, device
+    ):
+        self.num_envs = num_envs
+        self.capacity = capacity
+        self.reservoir = reservoir
+        self.device = device
+
+        # the extra slot at the end is a write target for states rejected by reservoir sampling
+        self.buffers: Dict[str, Tensor] = {
+            key: torch.zeros((num_envs, capacity + 1, *shape), dtype=torch.float, device=device)
+            for key, shape in state_shapes.items()
+        }
+        self.num_seen = torch.zeros(num_envs, dtype=torch.long, device=device)
+        self.all_env_ids = torch.arange(num_envs, dtype=torch.long, device=device)
+        self.slot_ids = torch.arange(capacity, dtype=torch.long, device=device)
+
+    def add(self, states: Dict[str, Tensor]) -> None:
+        """Add one state per env, states are tensors of shape [num_envs, *state_shape]."""
+        self.num_seen += 1
+
+        if self.reservoir:
+            # k-th state replaces a random slot with probability capacity/k
+            slots = (torch.rand(self.num_envs, device=self.device) * self.num_seen).long()
+            slots = torch.where(self.num_seen <= self.capacity, self.num_seen - 1, slots)
+            slots.clamp_(max=self.capacity)
+        else:
+            slots = (self.num_seen - 1) % self.capacity
+
+        for key, state in states.items():
+            self.buffers[key][self.all_env_ids, slots] = state
+
+    def sample(self, env_ids: Tensor, num_samples: Tensor) -> Dict[str, Tensor]:
+        """
+        Sample num_samples[i] distinct stored states of env env_ids[i] uniformly at random.
+        Returns tensors of shape [num_samples.sum(), *state_shape] with the samples of all envs concatenated.
+        """
+        num_stored = torch.clamp(self.num_seen[env_ids], max=self.capacity)
+        num_samples = torch.minimum(num_samples, num_stored)
+
+        # random permutation of the filled slots of every env, unfilled slots are sorted last
+        keys = torch.rand((len(env_ids), self.capacity), device=self.device)
+        keys.masked_fill_(self.slot_ids.unsqueeze(0) >= num_stored.unsqueeze(-1), 2.0)
+        slots = torch.argsort(keys, dim=1)
+
+        selected = self.slot_ids.unsqueeze(0) < num_samples.unsqueeze(-1)
+        selected_env_ids = env_ids.unsqueeze(-1).expand_as(slots)[selected]
+        selected_slots = slots[selected]
+
+        return {key: buffer[selected_env_ids, selected_slots] for key, buffer in self.buffers.items()}
+
+    def clear(self, env_ids: Tensor) -> None:
+        self.num_seen[env_ids] = 0
+
+
+STATE_BANK_VERSION = 1
+STATE_BANK_INDEX = "index.json"
+
+
+def _read_state_bank_index(path: str) -> Optional[Dict]:
+    index_path = os.path.join(path, STATE_BANK_INDEX)
+    if not os.path.isfile(index_path):
+        return None
+    with open(index_path, "r") as index_file:
+        index = json.load(index_file)
+    assert index["version"] == STATE_BANK_VERSION, f"Unsupported state bank version {index['version']} in {path}"
+    return index
+
+
+class EnvStateBankWriter:
+    """
+    Appends states to a columnar state bank: a directory with one raw binary file per state tensor (column) and
+    an index.json header holding the dtype and per-state shape of every column and the number of valid states.
+    Column data is appended first and the header is replaced atomically afterwards, so a crash can only leave
+    trailing bytes that readers ignore and the next append truncates.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.index = _read_state_bank_index(path) or dict(version=STATE_BANK_VERSION, num_states=0, columns={})
+
+    def append(self, states: Dict[str, Tensor]) -> None:
+        num_states = {len(state) for state in states.values()}
+        assert len(num_states) == 1, "All columns must have the same number of states"
+        num_states = num_states.pop()
+        if num_states == 0:
+            return
+
+        for key, state in states.items():
+            array = state.detach().cpu().numpy()
+            column = self.index["columns"].setdefault(
+                key, dict(dtype=array.dtype.str, shape=list(array.shape[1:]))
+            )
+            assert array.dtype.str == column["dtype"] and list(array.shape[1:]) == column["shape"], (
+                f"State {key} of dtype {array.dtype.str} and shape {array.shape[1:]} does not match bank column "
+                f"{column}"
+            )
+
+            column_path = os.path.join(self.path, f"{key}.bin")
+            with open(column_path, "ab") as column_file:
+                # drop bytes of an interrupted append that the index does not account for
+                column_file.truncate(self.index["num_states"] * array[0].nbytes)
+                column_file.write(np.ascontiguousarray(array).tobytes())
+
+        self.index["num_states"] += num_states
+
+        tmp_index_path = os.path.join(self.path, f"{STATE_BANK_INDEX}.tmp")
+        with open(tmp_index_path, "w") as index_file:
+            json.dump(self.index, index_file)
+        os.replace(tmp_index_path, os.path.join(self.path, STATE_BANK_INDEX))
+
+
+class EnvStateBank:
+    """
+    Read-only view of a state bank written by EnvStateBankWriter. Columns are memory-mapped, so opening the bank
+    costs the same regardless of its size and only the states that are actually gathered become resident.
+    Batches are copied through a pinned staging buffer to the simulation device.
+    """
+
+    def __init__(self, path: str, device, max_batch_size: int):
+        index = _read_state_bank_index(path)
+        if index is None:
+            # a save directory that was never filled: the writer only creates the index once states are appended
+            print(f"No state bank index found in {path}, treating it as an empty bank")
+            index = dict(version=STATE_BANK_VERSION, num_states=0, columns={})
+
+        self.num_states: int = index["num_states"]
+        self.device = device
+        self.columns: Dict[str, np.ndarray] = dict()
+        for key, column in index["columns"].items():
+            dtype, shape = np.dtype(column["dtype"]), (self.num_states, *column["shape"])
+            if self.num_states == 0:
+                # np.memmap cannot map an empty file
+                self.columns[key] = np.empty(shape, dtype=dtype)
+            else:
+                self.columns[key] = np.memmap(
+                    os.path.join(path, f"{key}.bin"),
+                    dtype=dtype,
+                    mode="c",  # copy-on-write, so that slices can be wrapped by torch without copies
+                    shape=shape,
+                )
+
+        pin_memory = torch.device(device).type == "cuda"
+        self.staging: Dict[str, Tensor] = dict()
+        for key, column in self.columns.items():
+            staging = torch.from_numpy(np.empty((max_batch_size, *column.shape[1:]), dtype=column.dtype))
+            self.staging[key] = staging.pin_memory() if pin_memory else staging
+        self.copy_done = torch.cuda.Event() if pin_memory else None
+
+    def __len__(self) -> int:
+        return self.num_states
+
+    def get(self, start: int, count: int) -> Dict[str, Tensor]:
+        """Gather states [start, start + count) of every column onto the device."""
+        if self.copy_done is not None:
+            # the previous batch may still be copying out of the staging buffers
+            self.copy_done.synchronize()
+
+        states = dict()
+        for key, column in self.columns.items():
+            staging = self.staging[key][:count]
+            staging.copy_(torch.from_numpy(column[start : start + count]))
+            states[key] = staging.to(self.device, non_blocking=True)
+
+        if self.copy_done is not None:
+            self.copy_done.record()
+
+        return states
+
@@ -34,9 +34,10 @@ import torch
 from isaacgym import gymtorch
 from isaacgym import gymapi
 from isaacgymenvs.utils.torch_jit_utils import quat_mul, to_torch, get_axis_params, calc_heading_quat_inv, \
-     exp_map_to_quat, quat_to_tan_norm, my_quat_rotate, calc_heading_quat_inv
+     quat_to_tan_norm, my_quat_rotate, calc_heading_quat_inv
 
 from ..base.vec_task import VecTask
+from .utils_amp.dof_obs_layout import DofObsLayout
 
 DOF_BODY_IDS = [1, 2, 3, 4, 6, 7, 9, 10, 11, 12, 13, 14]
 DOF_OFFSETS = [0, 3, 6, 9, 10, 13, 14, 17, 18, 21, 24, 25, 28]
@@ -74,6 +75,8 @@ class HumanoidAMPBase(VecTask):
         
         dt = self.cfg["sim"]["dt"]
         self.dt = self.control_freq_inv * dt
+
+        self._dof_obs_layout = DofObsLayout(DOF_OFFSETS, self.device)
         
         # get gym GPU state tensors
         actor_root_state = self.gym.acquire_actor_root_state_tensor(self.sim)
@@ -337,7 +340,8 @@ class HumanoidAMPBase(VecTask):
             dof_vel = self._dof_vel[env_ids]
             key_body_pos = self._rigid_body_pos[env_ids][:, self._key_body_ids, :]
         
-        obs = compute_humanoid_observations(root_states, dof_pos, dof_vel,
+        dof_obs = self._dof_obs_layout.compute(dof_pos)
+        obs = compute_humanoid_observations(root_states, dof_obs, dof_vel,
                                             key_body_pos, self._local_root_obs)
         return obs
 
@@ -460,39 +464,7 @@ class HumanoidAMPBase(VecTask):
 #####################################################################
 
 @torch.jit.script
-def dof_to_obs(pose):
-    # type: (Tensor) -> Tensor
-    #dof_obs_size = 64
-    #dof_offsets = [0, 3, 6, 9, 12, 13, 16, 19, 20, 23, 24, 27, 30, 31, 34]
-    dof_obs_size = 52
-    dof_offsets = [0, 3, 6, 9, 10, 13, 14, 17, 18, 21, 24, 25, 28]
-    num_joints = len(dof_offsets) - 1
-
-    dof_obs_shape = pose.shape[:-1] + (dof_obs_size,)
-    dof_obs = torch.zeros(dof_obs_shape, device=pose.device)
-    dof_obs_offset = 0
-
-    for j in range(num_joints):
-        dof_offset = dof_offsets[j]
-        dof_size = dof_offsets[j + 1] - dof_offsets[j]
-        joint_pose = pose[:, dof_offset:(dof_offset + dof_size)]
-
-        # assume this is a spherical joint
-        if (dof_size == 3):
-            joint_pose_q = exp_map_to_quat(joint_pose)
-            joint_dof_obs = quat_to_tan_norm(joint_pose_q)
-            dof_obs_size = 6
-        else:
-            joint_dof_obs = joint_pose
-            dof_obs_size = 1
-
-        dof_obs[:, dof_obs_offset:(dof_obs_offset + dof_obs_size)] = joint_dof_obs
-        dof_obs_offset += dof_obs_size
-
-    return dof_obs
-
-@torch.jit.script
-def compute_humanoid_observations(root_states, dof_pos, dof_vel, key_body_pos, local_root_obs):
+def compute_humanoid_observations(root_states, dof_obs, dof_vel, key_body_pos, local_root_obs):
     # type: (Tensor, Tensor, Tensor, Tensor, bool) -> Tensor
     root_pos = root_states[:, 0:3]
     root_rot = root_states[:, 3:7]
@@ -522,8 +494,6 @@ def compute_humanoid_observations(root_states, dof_pos, dof_vel, key_body_pos, l
     local_end_pos = my_quat_rotate(flat_heading_rot, flat_end_pos)
     flat_local_key_pos = local_end_pos.view(local_key_body_pos.shape[0], local_key_body_pos.shape[1] * local_key_body_pos.shape[2])
 
-    dof_obs = dof_to_obs(dof_pos)
-
     obs = torch.cat((root_h, root_rot_obs, local_root_vel, local_root_ang_vel, dof_obs, dof_vel, flat_local_key_pos), dim=-1)
     return obs
 
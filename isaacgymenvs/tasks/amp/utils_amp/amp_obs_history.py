@@ -0,0 +1,88 @@
+# Copyright (c) 2018-2023, NVIDIA Corporation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import torch
+
+
+class AMPObsHistory:
+    """Circular history of the last ``num_steps`` AMP observations of every env.
+
+    Instead of shifting the whole history by one slot on every step, the slot holding the current observation
+    moves backwards through the ring. Slot ``(head + k) % num_steps`` holds the observation from ``k`` steps ago.
+    All envs advance together, so a single head index is shared by the whole population. The ordered
+    ``[num_envs, num_steps, num_obs_per_step]`` view expected by the discriminator is only materialized by
+    :meth:`get_ordered`, with one gather into a persistent buffer.
+    """
+
+    def __init__(self, num_envs, num_steps, num_obs_per_step, device):
+        self.num_envs = num_envs
+        self.num_steps = num_steps
+        self.num_obs_per_step = num_obs_per_step
+        self.device = device
+
+        self._buf = torch.zeros((num_envs, num_steps, num_obs_per_step), device=device, dtype=torch.float)
+        self._ordered_buf = torch.zeros_like(self._buf)
+        self._head = 0
+
+        # row h holds the slot of every history step when the head is at h
+        steps = torch.arange(num_steps, device=device, dtype=torch.long)
+        self._slot_table = (steps.unsqueeze(-1) + steps.unsqueeze(0)) % num_steps
+
+    @property
+    def current(self):
+        """View of the slot holding the current observation of every env."""
+        return self._buf[:, self._head]
+
+    def advance(self):
+        """Start a new step. The current observation becomes history and the oldest slot is reused."""
+        self._head = (self._head - 1) % self.num_steps
+
+    def set_current(self, obs, env_ids=None):
+        if env_ids is None:
+            self._buf[:, self._head] = obs
+        else:
+            self._buf[env_ids, self._head] = obs
+
+    def set_history(self, env_ids, hist_obs):
+        """Overwrite the past observations of ``env_ids``.
+
+        Args:
+            env_ids: envs to update.
+            hist_obs: [len(env_ids), num_steps - 1, num_obs_per_step], ordered from the most recent past step.
+                A singleton step dimension is broadcast to every history slot.
+        """
+        hist_slots = self._slot_table[self._head, 1:]
+        self._buf[env_ids.unsqueeze(-1), hist_slots.unsqueeze(0)] = hist_obs
+
+    def get_ordered(self):
+        """Returns the history ordered from the current step backwards.
+
+        The returned tensor is a persistent buffer that is overwritten on the next call.
+        """
+        torch.index_select(self._buf, 1, self._slot_table[self._head], out=self._ordered_buf)
+        return self._ordered_buf
@@ -0,0 +1,100 @@
+# Copyright (c) 2018-2023, NVIDIA Corporation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import torch
+
+from isaacgymenvs.utils.torch_jit_utils import exp_map_to_quat, quat_to_tan_norm
+
+
+class DofObsLayout:
+    """Precomputed mapping from DOF positions to the AMP joint observation.
+
+    Every joint is either revolute (1 DOF, observed as is) or spherical (3 DOFs holding an exponential map,
+    observed as the 6D tangent/normal representation). The layout is resolved once from the joint DOF offsets so
+    that the conversion is a single gather for all revolute joints and one batched exp-map -> tan-norm conversion
+    for all spherical joints, instead of a per-joint loop. When every joint is revolute the observation is the DOF
+    positions themselves and no work is done at all.
+    """
+
+    def __init__(self, dof_offsets, device):
+        """
+        Args:
+            dof_offsets: offset of the first DOF of every joint followed by the total number of DOFs,
+                e.g. `DOF_OFFSETS` in humanoid_amp_base.
+            device: device of the DOF position tensors.
+        """
+        revolute_dof_ids, revolute_obs_ids = [], []
+        spherical_dof_ids, spherical_obs_ids = [], []
+
+        obs_offset = 0
+        for dof_offset, next_dof_offset in zip(dof_offsets[:-1], dof_offsets[1:]):
+            dof_size = next_dof_offset - dof_offset
+            if dof_size == 3:
+                spherical_dof_ids.append(list(range(dof_offset, dof_offset + 3)))
+                spherical_obs_ids.append(list(range(obs_offset, obs_offset + 6)))
+                obs_offset += 6
+            elif dof_size == 1:
+                revolute_dof_ids.append(dof_offset)
+                revolute_obs_ids.append(obs_offset)
+                obs_offset += 1
+            else:
+                raise RuntimeError("Unexpected joint type encountered")
+
+        self.num_dofs = dof_offsets[-1]
+        self.num_obs = obs_offset
+        self.is_identity = len(spherical_dof_ids) == 0
+
+        self._revolute_dof_ids = torch.tensor(revolute_dof_ids, dtype=torch.long, device=device)
+        self._revolute_obs_ids = torch.tensor(revolute_obs_ids, dtype=torch.long, device=device)
+        self._spherical_dof_ids = torch.tensor(spherical_dof_ids, dtype=torch.long, device=device).view(-1)
+        self._spherical_obs_ids = torch.tensor(spherical_obs_ids, dtype=torch.long, device=device).view(-1)
+
+    def compute(self, dof_pos):
+        """Returns the joint observation of `dof_pos` ([num_envs, num_dofs])."""
+        if self.is_identity:
+            return dof_pos
+
+        return compute_dof_obs(dof_pos, self._revolute_dof_ids, self._revolute_obs_ids,
+                               self._spherical_dof_ids, self._spherical_obs_ids, self.num_obs)
+
+
+@torch.jit.script
+def compute_dof_obs(dof_pos, revolute_dof_ids, revolute_obs_ids, spherical_dof_ids, spherical_obs_ids, num_obs):
+    # type: (Tensor, Tensor, Tensor, Tensor, Tensor, int) -> Tensor
+    num_envs = dof_pos.shape[0]
+    dof_obs = torch.empty((num_envs, num_obs), device=dof_pos.device, dtype=dof_pos.dtype)
+
+    if revolute_dof_ids.shape[0] > 0:
+        dof_obs.index_copy_(1, revolute_obs_ids, dof_pos.index_select(1, revolute_dof_ids))
+
+    if spherical_dof_ids.shape[0] > 0:
+        joint_exp_maps = dof_pos.index_select(1, spherical_dof_ids).reshape(-1, 3)
+        joint_tan_norms = quat_to_tan_norm(exp_map_to_quat(joint_exp_maps))
+        dof_obs.index_copy_(1, spherical_obs_ids, joint_tan_norms.reshape(num_envs, -1))
+
+    return dof_obs
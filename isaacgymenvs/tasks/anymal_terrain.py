@@ -28,6 +28,9 @@
 
 import numpy as np
 import os, time
+import hashlib
+import json
+import tempfile
 
 from isaacgym import gymtorch
 from isaacgym import gymapi
@@ -38,6 +41,8 @@ from typing import Tuple, Dict
 
 from isaacgymenvs.utils.torch_jit_utils import to_torch, get_axis_params, torch_rand_float, normalize, quat_apply, quat_rotate_inverse
 from isaacgymenvs.tasks.base.vec_task import VecTask
+from isaacgymenvs.tasks.utils.height_sampler import HeightScanSampler
+from isaacgymenvs.utils.terrain_generation import generate_sub_terrains
 
 
 class AnymalTerrain(VecTask):
@@ -145,6 +150,10 @@ class AnymalTerrain(VecTask):
 
         self.height_points = self.init_height_points()
         self.measured_heights = None
+        self.height_sampler = None
+        if self.height_samples is not None:
+            self.height_sampler = HeightScanSampler(self.height_samples, self.terrain.horizontal_scale, self.terrain.vertical_scale,
+                                                    self.terrain.border_size, self.height_points[0, :, :2], self.num_envs)
         # joint positions offsets
         self.default_dof_pos = torch.zeros_like(self.dof_pos, dtype=torch.float, device=self.device, requires_grad=False)
         for i in range(self.num_actions):
@@ -486,19 +495,14 @@ class AnymalTerrain(VecTask):
 
         if self.viewer and self.enable_viewer_sync and self.debug_viz:
             # draw height lines
-            self.gym.clear_lines(self.viewer)
             self.gym.refresh_rigid_body_state_tensor(self.sim)
-            sphere_geom = gymutil.WireframeSphereGeometry(0.02, 4, 4, None, color=(1, 1, 0))
-            for i in range(self.num_envs):
-                base_pos = (self.root_states[i, :3]).cpu().numpy()
-                heights = self.measured_heights[i].cpu().numpy()
-                height_points = quat_apply_yaw(self.base_quat[i].repeat(heights.shape[0]), self.height_points[i]).cpu().numpy()
-                for j in range(heights.shape[0]):
-                    x = height_points[j, 0] + base_pos[0]
-                    y = height_points[j, 1] + base_pos[1]
-                    z = heights[j]
-                    sphere_pose = gymapi.Transform(gymapi.Vec3(x, y, z), r=None)
-                    gymutil.draw_lines(sphere_geom, self.gym, self.viewer, self.envs[i], sphere_pose) 
+            height_points = quat_apply_yaw(self.base_quat.repeat(1, self.num_height_points), self.height_points)
+            height_points = height_points.view(self.num_envs, self.num_height_points, 3)
+            points = torch.cat([height_points[..., :2] + self.root_states[:, None, :2], self.measured_heights.unsqueeze(-1)], dim=-1)
+
+            debug_draw = self.get_debug_draw()
+            debug_draw.add_points(points, (1, 1, 0))
+            debug_draw.draw()
 
     def init_height_points(self):
         # 1mx1.6m rectangle (without center line)
@@ -518,29 +522,17 @@ class AnymalTerrain(VecTask):
         elif self.cfg["env"]["terrain"]["terrainType"] == 'none':
             raise NameError("Can't measure height with terrain type 'none'")
 
-        if env_ids:
-            points = quat_apply_yaw(self.base_quat[env_ids].repeat(1, self.num_height_points), self.height_points[env_ids]) + (self.root_states[env_ids, :3]).unsqueeze(1)
-        else:
-            points = quat_apply_yaw(self.base_quat.repeat(1, self.num_height_points), self.height_points) + (self.root_states[:, :3]).unsqueeze(1)
- 
-        points += self.terrain.border_size
-        points = (points/self.terrain.horizontal_scale).long()
-        px = points[:, :, 0].view(-1)
-        py = points[:, :, 1].view(-1)
-        px = torch.clip(px, 0, self.height_samples.shape[0]-2)
-        py = torch.clip(py, 0, self.height_samples.shape[1]-2)
-
-        heights1 = self.height_samples[px, py]
-
-        heights2 = self.height_samples[px+1, py+1]
-        heights = torch.min(heights1, heights2)
-
-        return heights.view(self.num_envs, -1) * self.terrain.vertical_scale
+        return self.height_sampler.sample(self.root_states[:, :3], self.base_quat, env_ids)
 
 
 # terrain generator
 from isaacgym.terrain_utils import *
 class Terrain:
+    # terrain config entries the generated geometry depends on, and version of the generator for cached terrains
+    cache_cfg_keys = ("terrainType", "curriculum", "mapLength", "mapWidth", "numLevels", "numTerrains",
+                      "terrainProportions", "slopeTreshold")
+    cache_version = 2
+
     def __init__(self, cfg, num_robots) -> None:
 
         self.type = cfg["terrainType"]
@@ -559,6 +551,9 @@ class Terrain:
         self.num_maps = self.env_rows * self.env_cols
         self.num_per_env = int(num_robots / self.num_maps)
         self.env_origins = np.zeros((self.env_rows, self.env_cols, 3))
+        self.generation_workers = cfg.get("generationWorkers", 1)
+        if self.generation_workers <= 0:
+            self.generation_workers = os.cpu_count()
 
         self.width_per_env_pixels = int(self.env_width / self.horizontal_scale)
         self.length_per_env_pixels = int(self.env_length / self.horizontal_scale)
@@ -567,6 +562,15 @@ class Terrain:
         self.tot_cols = int(self.env_cols * self.width_per_env_pixels) + 2 * self.border
         self.tot_rows = int(self.env_rows * self.length_per_env_pixels) + 2 * self.border
 
+        # generated terrains can be cached on disk, keyed by the terrain config and the numpy random state
+        cache_path = None
+        if cfg.get("cache", False):
+            cache_dir = os.path.expanduser(cfg.get("cacheDir", "~/.cache/isaacgymenvs/terrains"))
+            cache_path = os.path.join(cache_dir, self.cache_key(cfg, num_robots) + ".npz")
+            if self.load_cache(cache_path):
+                print(f"Loaded terrain from cache {cache_path}")
+                return
+
         self.height_field_raw = np.zeros((self.tot_rows , self.tot_cols), dtype=np.int16)
         if cfg["curriculum"]:
             self.curiculum(num_robots, num_terrains=self.env_cols, num_levels=self.env_rows)
@@ -574,103 +578,98 @@ class Terrain:
             self.randomized_terrain()   
         self.heightsamples = self.height_field_raw
         self.vertices, self.triangles = convert_heightfield_to_trimesh(self.height_field_raw, self.horizontal_scale, self.vertical_scale, cfg["slopeTreshold"])
+
+        if cache_path is not None:
+            self.save_cache(cache_path)
+
+    def cache_key(self, cfg, num_robots):
+        key = {k: cfg[k] for k in self.cache_cfg_keys if k in cfg}
+        key["numRobots"] = num_robots
+        key["horizontalScale"] = self.horizontal_scale
+        key["verticalScale"] = self.vertical_scale
+        key["borderSize"] = self.border_size
+        key["version"] = self.cache_version
+        hasher = hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode())
+        # the generation draws from the global numpy generator, whose state is seeded per run
+        rng_state = np.random.get_state()
+        hasher.update(rng_state[1].tobytes())
+        hasher.update(repr(rng_state[2:]).encode())
+        return hasher.hexdigest()
+
+    def load_cache(self, cache_path):
+        if not os.path.exists(cache_path):
+            return False
+        with np.load(cache_path) as data:
+            self.height_field_raw = data["height_field_raw"]
+            self.vertices = data["vertices"]
+            self.triangles = data["triangles"]
+            self.env_origins = data["env_origins"]
+            rng_state = ("MT19937", data["rng_keys"], int(data["rng_pos"]), int(data["rng_has_gauss"]), float(data["rng_cached_gaussian"]))
+        self.heightsamples = self.height_field_raw
+        # leave the global generator as the generation would have, so that the rest of the run is identical
+        np.random.set_state(rng_state)
+        return True
+
+    def save_cache(self, cache_path):
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        _, rng_keys, rng_pos, rng_has_gauss, rng_cached_gaussian = np.random.get_state()
+        # unique temporary file per process, so concurrent workers building the same terrain do not clobber it
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix=".tmp.npz")
+        os.close(fd)
+        np.savez(tmp_path, height_field_raw=self.height_field_raw, vertices=self.vertices, triangles=self.triangles,
+                 env_origins=self.env_origins, rng_keys=rng_keys, rng_pos=rng_pos, rng_has_gauss=rng_has_gauss,
+                 rng_cached_gaussian=rng_cached_gaussian)
+        os.replace(tmp_path, cache_path)
     
     def randomized_terrain(self):
+        tiles = []
         for k in range(self.num_maps):
             # Env coordinates in the world
             (i, j) = np.unravel_index(k, (self.env_rows, self.env_cols))
-
-            # Heightfield coordinate system from now on
-            start_x = self.border + i * self.length_per_env_pixels
-            end_x = self.border + (i + 1) * self.length_per_env_pixels
-            start_y = self.border + j * self.width_per_env_pixels
-            end_y = self.border + (j + 1) * self.width_per_env_pixels
-
-            terrain = SubTerrain("terrain",
-                              width=self.width_per_env_pixels,
-                              length=self.width_per_env_pixels,
-                              vertical_scale=self.vertical_scale,
-                              horizontal_scale=self.horizontal_scale)
-            choice = np.random.uniform(0, 1)
-            if choice < 0.1:
-                if np.random.choice([0, 1]):
-                    pyramid_sloped_terrain(terrain, np.random.choice([-0.3, -0.2, 0, 0.2, 0.3]))
-                    random_uniform_terrain(terrain, min_height=-0.1, max_height=0.1, step=0.05, downsampled_scale=0.2)
-                else:
-                    pyramid_sloped_terrain(terrain, np.random.choice([-0.3, -0.2, 0, 0.2, 0.3]))
-            elif choice < 0.6:
-                # step_height = np.random.choice([-0.18, -0.15, -0.1, -0.05, 0.05, 0.1, 0.15, 0.18])
-                step_height = np.random.choice([-0.15, 0.15])
-                pyramid_stairs_terrain(terrain, step_width=0.31, step_height=step_height, platform_size=3.)
-            elif choice < 1.:
-                discrete_obstacles_terrain(terrain, 0.15, 1., 2., 40, platform_size=3.)
-
-            self.height_field_raw[start_x: end_x, start_y:end_y] = terrain.height_field_raw
-
-            env_origin_x = (i + 0.5) * self.env_length
-            env_origin_y = (j + 0.5) * self.env_width
-            x1 = int((self.env_length/2. - 1) / self.horizontal_scale)
-            x2 = int((self.env_length/2. + 1) / self.horizontal_scale)
-            y1 = int((self.env_width/2. - 1) / self.horizontal_scale)
-            y2 = int((self.env_width/2. + 1) / self.horizontal_scale)
-            env_origin_z = np.max(terrain.height_field_raw[x1:x2, y1:y2])*self.vertical_scale
-            self.env_origins[i, j] = [env_origin_x, env_origin_y, env_origin_z]
+            tiles.append((i, j, None, None))
+        self._build_tiles(tiles)
 
     def curiculum(self, num_robots, num_terrains, num_levels):
-        num_robots_per_map = int(num_robots / num_terrains)
-        left_over = num_robots % num_terrains
-        idx = 0
+        tiles = []
         for j in range(num_terrains):
             for i in range(num_levels):
-                terrain = SubTerrain("terrain",
-                                    width=self.width_per_env_pixels,
-                                    length=self.width_per_env_pixels,
-                                    vertical_scale=self.vertical_scale,
-                                    horizontal_scale=self.horizontal_scale)
                 difficulty = i / num_levels
                 choice = j / num_terrains
-
-                slope = difficulty * 0.4
-                step_height = 0.05 + 0.175 * difficulty
-                discrete_obstacles_height = 0.025 + difficulty * 0.15
-                stepping_stones_size = 2 - 1.8 * difficulty
-                if choice < self.proportions[0]:
-                    if choice < 0.05:
-                        slope *= -1
-                    pyramid_sloped_terrain(terrain, slope=slope, platform_size=3.)
-                elif choice < self.proportions[1]:
-                    if choice < 0.15:
-                        slope *= -1
-                    pyramid_sloped_terrain(terrain, slope=slope, platform_size=3.)
-                    random_uniform_terrain(terrain, min_height=-0.1, max_height=0.1, step=0.025, downsampled_scale=0.2)
-                elif choice < self.proportions[3]:
-                    if choice<self.proportions[2]:
-                        step_height *= -1
-                    pyramid_stairs_terrain(terrain, step_width=0.31, step_height=step_height, platform_size=3.)
-                elif choice < self.proportions[4]:
-                    discrete_obstacles_terrain(terrain, discrete_obstacles_height, 1., 2., 40, platform_size=3.)
-                else:
-                    stepping_stones_terrain(terrain, stone_size=stepping_stones_size, stone_distance=0.1, max_height=0., platform_size=3.)
-
-                # Heightfield coordinate system
-                start_x = self.border + i * self.length_per_env_pixels
-                end_x = self.border + (i + 1) * self.length_per_env_pixels
-                start_y = self.border + j * self.width_per_env_pixels
-                end_y = self.border + (j + 1) * self.width_per_env_pixels
-                self.height_field_raw[start_x: end_x, start_y:end_y] = terrain.height_field_raw
-
-                robots_in_map = num_robots_per_map
-                if j < left_over:
-                    robots_in_map +=1
-
-                env_origin_x = (i + 0.5) * self.env_length
-                env_origin_y = (j + 0.5) * self.env_width
-                x1 = int((self.env_length/2. - 1) / self.horizontal_scale)
-                x2 = int((self.env_length/2. + 1) / self.horizontal_scale)
-                y1 = int((self.env_width/2. - 1) / self.horizontal_scale)
-                y2 = int((self.env_width/2. + 1) / self.horizontal_scale)
-                env_origin_z = np.max(terrain.height_field_raw[x1:x2, y1:y2])*self.vertical_scale
-                self.env_origins[i, j] = [env_origin_x, env_origin_y, env_origin_z]
+                tiles.append((i, j, difficulty, choice))
+        self._build_tiles(tiles)
+
+    def _build_tiles(self, tiles):
+        """Generate the sub-terrains of `tiles`, in parallel if `generationWorkers` > 1, and stitch them in order.
+
+        Every tile is generated with its own seed derived from a single draw of the global numpy generator, so
+        the result does not depend on the number of workers.
+        """
+        base_seed = np.random.randint(0, 2**31 - 1 - len(tiles))
+        tile_cfg = dict(width=self.width_per_env_pixels, vertical_scale=self.vertical_scale,
+                        horizontal_scale=self.horizontal_scale, proportions=self.proportions)
+        jobs = [(base_seed + k, tile_cfg, difficulty, choice) for k, (_, _, difficulty, choice) in enumerate(tiles)]
+
+        height_fields = generate_sub_terrains(jobs, self.generation_workers)
+
+        for (i, j, _, _), height_field in zip(tiles, height_fields):
+            self._set_tile(i, j, height_field)
+
+    def _set_tile(self, i, j, height_field):
+        # Heightfield coordinate system
+        start_x = self.border + i * self.length_per_env_pixels
+        end_x = self.border + (i + 1) * self.length_per_env_pixels
+        start_y = self.border + j * self.width_per_env_pixels
+        end_y = self.border + (j + 1) * self.width_per_env_pixels
+        self.height_field_raw[start_x: end_x, start_y:end_y] = height_field
+
+        env_origin_x = (i + 0.5) * self.env_length
+        env_origin_y = (j + 0.5) * self.env_width
+        x1 = int((self.env_length/2. - 1) / self.horizontal_scale)
+        x2 = int((self.env_length/2. + 1) / self.horizontal_scale)
+        y1 = int((self.env_width/2. - 1) / self.horizontal_scale)
+        y2 = int((self.env_width/2. + 1) / self.horizontal_scale)
+        env_origin_z = np.max(height_field[x1:x2, y1:y2])*self.vertical_scale
+        self.env_origins[i, j] = [env_origin_x, env_origin_y, env_origin_z]
 
 
 @torch.jit.script
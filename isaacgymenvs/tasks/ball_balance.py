@@ -394,12 +394,12 @@ class BallBalance(VecTask):
 
         # reset root state for bbots and balls in selected envs
         actor_indices = self.all_actor_indices[env_ids].flatten()
-        self.gym.set_actor_root_state_tensor_indexed(self.sim, self.root_tensor, gymtorch.unwrap_tensor(actor_indices), len(actor_indices))
+        self.defer_set_actor_root_state_tensor_indexed(self.root_states, actor_indices)
 
         # reset DOF states for bbots in selected envs
         bbot_indices = self.all_bbot_indices[env_ids].flatten()
         self.dof_states[env_ids] = self.initial_dof_states[env_ids]
-        self.gym.set_dof_state_tensor_indexed(self.sim, self.dof_state_tensor, gymtorch.unwrap_tensor(bbot_indices), len(bbot_indices))
+        self.defer_set_dof_state_tensor_indexed(self.dof_states, bbot_indices)
 
         self.reset_buf[env_ids] = 0
         self.progress_buf[env_ids] = 0
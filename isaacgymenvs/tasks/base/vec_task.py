@@ -37,13 +37,16 @@ from gym import spaces
 from isaacgym import gymtorch, gymapi
 from isaacgymenvs.utils.torch_jit_utils import to_torch
 from isaacgymenvs.utils.dr_utils import get_property_setter_map, get_property_getter_map, \
-    get_default_setter_args, apply_random_samples, check_buckets, generate_random_samples
+    get_default_setter_args, apply_random_samples, check_buckets, generate_random_samples, BatchedActorRandomizer
 
 import torch
 import numpy as np
-import operator, random
+import random
 from copy import deepcopy
 from isaacgymenvs.utils.utils import nested_dict_get_attr, nested_dict_set_attr
+from isaacgymenvs.utils.rl_device_transfer import RlDeviceTransfer
+from isaacgymenvs.utils.dr_noise import NonphysicalNoise
+from isaacgymenvs.utils.debug_draw import DebugDraw
 
 from collections import deque
 
@@ -55,6 +58,21 @@ from abc import ABC
 EXISTING_SIM = None
 SCREEN_CAPTURE_RESOLUTION = (1027, 768)
 
+def get_state_tensor_refresh_map(gym):
+    state_tensor_to_refreshers = {
+        "actor_root_state": gym.refresh_actor_root_state_tensor,
+        "dof_state": gym.refresh_dof_state_tensor,
+        "dof_force": gym.refresh_dof_force_tensor,
+        "rigid_body_state": gym.refresh_rigid_body_state_tensor,
+        "net_contact_force": gym.refresh_net_contact_force_tensor,
+        "force_sensor": gym.refresh_force_sensor_tensor,
+        "jacobian": gym.refresh_jacobian_tensors,
+        "mass_matrix": gym.refresh_mass_matrix_tensors,
+    }
+
+    return state_tensor_to_refreshers
+
+
 def _create_sim_once(gym, *args, **kwargs):
     global EXISTING_SIM
     if EXISTING_SIM is not None:
@@ -250,9 +268,20 @@ class VecTask(Env):
         self.original_props = {}
         self.dr_randomizations = {}
         self.actor_params_generator = None
+        self.actor_randomizer = None
+        self.dr_timing_report = {}
         self.extern_actor_params = {}
         self.last_step = -1
         self.last_rand_step = -1
+
+        self.substep_callback = None
+        self.substep_refreshers = []
+
+        # state writes deferred until right before the next physics step, see `defer_set_actor_root_state_tensor_indexed`
+        self.deferred_root_state = None
+        self.deferred_root_indices = []
+        self.deferred_dof_state = None
+        self.deferred_dof_indices = []
         for env_id in range(self.num_envs):
             self.extern_actor_params[env_id] = None
 
@@ -273,6 +302,7 @@ class VecTask(Env):
         # todo: read from config
         self.enable_viewer_sync = True
         self.viewer = None
+        self.debug_draw = None
 
         # if running with a viewer, set up keyboard shortcuts and camera
         if self.headless == False:
@@ -298,6 +328,16 @@ class VecTask(Env):
             self.gym.viewer_camera_look_at(
                 self.viewer, None, cam_pos, cam_target)
 
+    def get_debug_draw(self) -> DebugDraw:
+        """Return the batched debug line drawer of the viewer, created on first use.
+
+        Only the first `debugVizMaxEnvs` envs of the task config are drawn, all of them if it is not set.
+        """
+        if self.debug_draw is None:
+            self.debug_draw = DebugDraw(self.gym, self.viewer, self.envs, self.device,
+                                        self.cfg["env"].get("debugVizMaxEnvs", None))
+        return self.debug_draw
+
     def allocate_buffers(self):
         """Allocate the observation, states, etc. buffers.
 
@@ -316,13 +356,63 @@ class VecTask(Env):
         self.reset_buf = torch.ones(
             self.num_envs, device=self.device, dtype=torch.long)
         self.timeout_buf = torch.zeros(
-             self.num_envs, device=self.device, dtype=torch.long)
+             self.num_envs, device=self.device, dtype=torch.bool)
         self.progress_buf = torch.zeros(
             self.num_envs, device=self.device, dtype=torch.long)
         self.randomize_buf = torch.zeros(
             self.num_envs, device=self.device, dtype=torch.long)
         self.extras = {}
 
+        self.allocate_output_buffers()
+
+    def allocate_output_buffers(self):
+        """Allocate the buffers returned by `step`, `reset`, `reset_done` and `get_state`.
+
+        Observations and states are clamped in place into these buffers, and copied into buffers on the rl device
+        only when it differs from the sim device. They are reused on every call: the returned tensors are owned by
+        the task and only valid until the next call, callers that need to keep them must copy them.
+
+        When the rl device is a different CUDA device, the copies are asynchronous (see `RlDeviceTransfer`) unless
+        `asyncRlTransfer` is set to False in the env config, in which case they are synchronous copies.
+        """
+        self.outputs_on_rl_device = torch.device(self.device) == torch.device(self.rl_device)
+
+        self.rl_transfer = None
+        if self.cfg["env"].get("asyncRlTransfer", True) and RlDeviceTransfer.is_supported(self.device, self.rl_device):
+            self.rl_transfer = RlDeviceTransfer(self.device, self.rl_device)
+
+        # with a CPU sim, clamp straight into pinned memory so the copy to the rl device needs no staging
+        pin_memory = self.rl_transfer is not None and torch.device(self.device).type == "cpu"
+        self.obs_out_buf = torch.empty(self.obs_buf.shape, dtype=self.obs_buf.dtype, device=self.device,
+                                       pin_memory=pin_memory).zero_()
+        self.states_out_buf = torch.empty(self.states_buf.shape, dtype=self.states_buf.dtype, device=self.device,
+                                          pin_memory=pin_memory).zero_()
+
+        if not self.outputs_on_rl_device:
+            self.rl_obs_buf = torch.zeros_like(self.obs_buf, device=self.rl_device)
+            self.rl_states_buf = torch.zeros_like(self.states_buf, device=self.rl_device)
+            self.rl_rew_buf = torch.zeros_like(self.rew_buf, device=self.rl_device)
+            self.rl_reset_buf = torch.zeros_like(self.reset_buf, device=self.rl_device)
+            self.rl_timeout_buf = torch.zeros_like(self.timeout_buf, device=self.rl_device)
+
+    def _to_rl_device(self, tensor: torch.Tensor, rl_buf_name: str) -> torch.Tensor:
+        """Returns `tensor` on the rl device, copying it into the preallocated `rl_buf_name` buffer if needed."""
+        if self.outputs_on_rl_device:
+            return tensor
+        rl_buf = getattr(self, rl_buf_name)
+        if self.rl_transfer is not None:
+            return self.rl_transfer.copy(rl_buf_name, tensor, rl_buf)
+        rl_buf.copy_(tensor)
+        return rl_buf
+
+    def _get_obs(self) -> torch.Tensor:
+        """Returns the clamped observation buffer on the rl device."""
+        if self.rl_transfer is not None:
+            # with a CPU sim the pinned output buffer may still be read by the previous asynchronous copy
+            self.rl_transfer.wait_source("rl_obs_buf")
+        torch.clamp(self.obs_buf, -self.clip_obs, self.clip_obs, out=self.obs_out_buf)
+        return self._to_rl_device(self.obs_out_buf, "rl_obs_buf")
+
     def create_sim(self, compute_device: int, graphics_device: int, physics_engine, sim_params: gymapi.SimParams):
         """Create an Isaac Gym sim object.
 
@@ -342,8 +432,86 @@ class VecTask(Env):
         return sim
 
     def get_state(self):
-        """Returns the state buffer of the environment (the privileged observations for asymmetric training)."""
-        return torch.clamp(self.states_buf, -self.clip_obs, self.clip_obs).to(self.rl_device)
+        """Returns the state buffer of the environment (the privileged observations for asymmetric training).
+
+        The returned tensor is only valid until the next call, see `allocate_output_buffers`.
+        """
+        if self.rl_transfer is not None:
+            self.rl_transfer.wait_source("rl_states_buf")
+        torch.clamp(self.states_buf, -self.clip_obs, self.clip_obs, out=self.states_out_buf)
+        return self._to_rl_device(self.states_out_buf, "rl_states_buf")
+
+    def register_substep_callback(self, callback, refresh_tensors=("dof_state",)):
+        """Run a callback before every physics substep of `step`.
+
+        `step` simulates `control_freq_inv` substeps per control step. Tasks that compute their actuation at the
+        physics rate (e.g. a custom PD controller producing torques) register it here instead of running their own
+        simulation loop in `pre_physics_step`, so the control/physics ratio is owned by `controlFrequencyInv` only.
+
+        Args:
+            callback: called as `callback(substep)` before each `gym.simulate`, after `pre_physics_step`.
+            refresh_tensors: state tensors the callback reads, refreshed between substeps. See
+                `get_state_tensor_refresh_map` for the valid names. Tensors only needed by `post_physics_step` should
+                not be listed, they are refreshed there once per control step.
+        """
+        refresh_map = get_state_tensor_refresh_map(self.gym)
+        for name in refresh_tensors:
+            if name not in refresh_map:
+                raise ValueError(f"Unknown state tensor '{name}', expected one of {list(refresh_map.keys())}")
+
+        self.substep_callback = callback
+        self.substep_refreshers = [refresh_map[name] for name in refresh_tensors]
+
+    def refresh_substep_tensors(self):
+        """Refresh the state tensors requested by the registered substep callback."""
+        if self.device == 'cpu':
+            self.gym.fetch_results(self.sim, True)
+
+        for refresh in self.substep_refreshers:
+            refresh(self.sim)
+
+    def defer_set_actor_root_state_tensor_indexed(self, root_state: torch.Tensor, actor_indices: torch.Tensor):
+        """Queue a write of the root states of `actor_indices` from `root_state` to the simulator.
+
+        The writes queued by all reset sources during a step are merged and issued once by
+        `apply_deferred_state_writes`, right before the physics step.
+
+        Args:
+            root_state: the full actor root state tensor the rows of `actor_indices` are written from
+            actor_indices: global actor indices to write
+        """
+        if self.deferred_root_state is not None and self.deferred_root_state is not root_state:
+            raise ValueError("All deferred actor root state writes of a step must use the same root state tensor")
+        self.deferred_root_state = root_state
+        self.deferred_root_indices.append(actor_indices)
+
+    def defer_set_dof_state_tensor_indexed(self, dof_state: torch.Tensor, actor_indices: torch.Tensor):
+        """Queue a write of the DOF states of `actor_indices` from `dof_state` to the simulator.
+
+        Args:
+            dof_state: the full DOF state tensor the DOFs of `actor_indices` are written from
+            actor_indices: global indices of the actors whose DOF states are written
+        """
+        if self.deferred_dof_state is not None and self.deferred_dof_state is not dof_state:
+            raise ValueError("All deferred DOF state writes of a step must use the same DOF state tensor")
+        self.deferred_dof_state = dof_state
+        self.deferred_dof_indices.append(actor_indices)
+
+    def apply_deferred_state_writes(self):
+        """Issue the queued root and DOF state writes, one indexed set call per state tensor."""
+        if self.deferred_root_indices:
+            indices = torch.unique(torch.cat(self.deferred_root_indices).to(torch.int32))
+            self.gym.set_actor_root_state_tensor_indexed(self.sim, gymtorch.unwrap_tensor(self.deferred_root_state),
+                                                         gymtorch.unwrap_tensor(indices), len(indices))
+            self.deferred_root_state = None
+            self.deferred_root_indices = []
+
+        if self.deferred_dof_indices:
+            indices = torch.unique(torch.cat(self.deferred_dof_indices).to(torch.int32))
+            self.gym.set_dof_state_tensor_indexed(self.sim, gymtorch.unwrap_tensor(self.deferred_dof_state),
+                                                  gymtorch.unwrap_tensor(indices), len(indices))
+            self.deferred_dof_state = None
+            self.deferred_dof_indices = []
 
     @abc.abstractmethod
     def pre_physics_step(self, actions: torch.Tensor):
@@ -365,6 +533,7 @@ class VecTask(Env):
         Returns:
             Observations, rewards, resets, info
             Observations are dict of observations (currently only one member called 'obs')
+            The returned tensors are reused by the next step, see `allocate_output_buffers`.
         """
 
         # randomize actions
@@ -374,11 +543,17 @@ class VecTask(Env):
         action_tensor = torch.clamp(actions, -self.clip_actions, self.clip_actions)
         # apply actions
         self.pre_physics_step(action_tensor)
+        self.apply_deferred_state_writes()
 
         # step physics and render each frame
         for i in range(self.control_freq_inv):
             if self.force_render:
                 self.render()
+            if self.substep_callback is not None:
+                # the state read by the first substep is the one post_physics_step left behind
+                if i > 0:
+                    self.refresh_substep_tensors()
+                self.substep_callback(i)
             self.gym.simulate(self.sim)
 
         # to fix!
@@ -391,21 +566,23 @@ class VecTask(Env):
         self.control_steps += 1
 
         # fill time out buffer: set to 1 if we reached the max episode length AND the reset buffer is 1. Timeout == 1 makes sense only if the reset buffer is 1.
-        self.timeout_buf = (self.progress_buf >= self.max_episode_length - 1) & (self.reset_buf != 0)
+        torch.ge(self.progress_buf, self.max_episode_length - 1, out=self.timeout_buf)
+        self.timeout_buf.logical_and_(self.reset_buf)
 
         # randomize observations
         if self.dr_randomizations.get('observations', None):
-            self.obs_buf = self.dr_randomizations['observations']['noise_lambda'](self.obs_buf)
+            self.dr_randomizations['observations']['noise_lambda'](self.obs_buf, out=self.obs_buf)
 
-        self.extras["time_outs"] = self.timeout_buf.to(self.rl_device)
+        self.extras["time_outs"] = self._to_rl_device(self.timeout_buf, "rl_timeout_buf")
 
-        self.obs_dict["obs"] = torch.clamp(self.obs_buf, -self.clip_obs, self.clip_obs).to(self.rl_device)
+        self.obs_dict["obs"] = self._get_obs()
 
         # asymmetric actor-critic
         if self.num_states > 0:
             self.obs_dict["states"] = self.get_state()
 
-        return self.obs_dict, self.rew_buf.to(self.rl_device), self.reset_buf.to(self.rl_device), self.extras
+        return self.obs_dict, self._to_rl_device(self.rew_buf, "rl_rew_buf"), \
+            self._to_rl_device(self.reset_buf, "rl_reset_buf"), self.extras
 
     def zero_actions(self) -> torch.Tensor:
         """Returns a buffer with zero actions.
@@ -429,7 +606,7 @@ class VecTask(Env):
         Returns:
             Observation dictionary
         """
-        self.obs_dict["obs"] = torch.clamp(self.obs_buf, -self.clip_obs, self.clip_obs).to(self.rl_device)
+        self.obs_dict["obs"] = self._get_obs()
 
         # asymmetric actor-critic
         if self.num_states > 0:
@@ -441,12 +618,13 @@ class VecTask(Env):
         """Reset the environment.
         Returns:
             Observation dictionary, indices of environments being reset
+            The returned observations are reused by the next step, see `allocate_output_buffers`.
         """
         done_env_ids = self.reset_buf.nonzero(as_tuple=False).flatten()
         if len(done_env_ids) > 0:
             self.reset_idx(done_env_ids)
 
-        self.obs_dict["obs"] = torch.clamp(self.obs_buf, -self.clip_obs, self.clip_obs).to(self.rl_device)
+        self.obs_dict["obs"] = self._get_obs()
 
         # asymmetric actor-critic
         if self.num_states > 0:
@@ -651,7 +829,6 @@ class VecTask(Env):
                 op_type = dr_params[nonphysical_param]["operation"]
                 sched_type = dr_params[nonphysical_param]["schedule"] if "schedule" in dr_params[nonphysical_param] else None
                 sched_step = dr_params[nonphysical_param]["schedule_steps"] if "schedule" in dr_params[nonphysical_param] else None
-                op = operator.add if op_type == 'additive' else operator.mul
 
                 if sched_type == 'linear':
                     sched_scaling = 1.0 / sched_step * \
@@ -679,17 +856,8 @@ class VecTask(Env):
                         mu_corr = mu_corr * sched_scaling + 1.0 * \
                             (1.0 - sched_scaling)  # linearly interpolate
 
-                    def noise_lambda(tensor, param_name=nonphysical_param):
-                        params = self.dr_randomizations[param_name]
-                        corr = params.get('corr', None)
-                        if corr is None:
-                            corr = torch.randn_like(tensor)
-                            params['corr'] = corr
-                        corr = corr * params['var_corr'] + params['mu_corr']
-                        return op(
-                            tensor, corr + torch.randn_like(tensor) * params['var'] + params['mu'])
-
-                    self.dr_randomizations[nonphysical_param] = {'mu': mu, 'var': var, 'mu_corr': mu_corr, 'var_corr': var_corr, 'noise_lambda': noise_lambda}
+                    noise_params = {'mu': mu, 'var': var, 'mu_corr': mu_corr, 'var_corr': var_corr}
+                    range_params = (mu, var, mu_corr, var_corr)
 
                 elif dist == 'uniform':
                     lo, hi = dr_params[nonphysical_param]["range"]
@@ -706,16 +874,19 @@ class VecTask(Env):
                         lo_corr = lo_corr * sched_scaling + 1.0 * (1.0 - sched_scaling)
                         hi_corr = hi_corr * sched_scaling + 1.0 * (1.0 - sched_scaling)
 
-                    def noise_lambda(tensor, param_name=nonphysical_param):
-                        params = self.dr_randomizations[param_name]
-                        corr = params.get('corr', None)
-                        if corr is None:
-                            corr = torch.randn_like(tensor)
-                            params['corr'] = corr
-                        corr = corr * (params['hi_corr'] - params['lo_corr']) + params['lo_corr']
-                        return op(tensor, corr + torch.rand_like(tensor) * (params['hi'] - params['lo']) + params['lo'])
+                    noise_params = {'lo': lo, 'hi': hi, 'lo_corr': lo_corr, 'hi_corr': hi_corr}
+                    range_params = (lo, hi, lo_corr, hi_corr)
 
-                    self.dr_randomizations[nonphysical_param] = {'lo': lo, 'hi': hi, 'lo_corr': lo_corr, 'hi_corr': hi_corr, 'noise_lambda': noise_lambda}
+                # the noise module and its buffers are kept across randomizations, only its parameters are updated
+                # and its correlated noise redrawn
+                prev = self.dr_randomizations.get(nonphysical_param, None)
+                if prev is None or (prev['noise_lambda'].distribution, prev['noise_lambda'].operation) != (dist, op_type):
+                    noise = NonphysicalNoise(dist, op_type, self.device)
+                else:
+                    noise = prev['noise_lambda']
+                    noise.resample_correlated()
+                noise.set_params(*range_params)
+                self.dr_randomizations[nonphysical_param] = dict(noise_params, noise_lambda=noise)
 
         if "sim_params" in dr_params and do_nonenv_randomize:
             prop_attrs = dr_params["sim_params"]
@@ -743,89 +914,99 @@ class VecTask(Env):
                     self.actor_params_generator.sample()
                 extern_offsets[env_id] = 0
 
-        # randomise all attributes of each actor (hand, cube etc..)
-        # actor_properties are (stiffness, damping etc..)
+        # Without an external sampler all envs are randomized in one batch: the values of every attribute are drawn
+        # for all envs at once and only the gym getter/setter calls remain per env
+        if self.actor_params_generator is None:
+            if self.actor_randomizer is None:
+                self.actor_randomizer = BatchedActorRandomizer(self.gym, self.envs, dr_params)
+            self.actor_randomizer.apply(env_ids, self.last_step, self.sim_initialized)
+            self.dr_timing_report = self.actor_randomizer.last_report
+            if dr_params.get("report_timing", False):
+                print(self.actor_randomizer.format_report())
+        else:
+            # randomise all attributes of each actor (hand, cube etc..)
+            # actor_properties are (stiffness, damping etc..)
 
-        # Loop over actors, then loop over envs, then loop over their props 
-        # and lastly loop over the ranges of the params 
+            # Loop over actors, then loop over envs, then loop over their props 
+            # and lastly loop over the ranges of the params 
 
-        for actor, actor_properties in dr_params["actor_params"].items():
+            for actor, actor_properties in dr_params["actor_params"].items():
 
-            # Loop over all envs as this part is not tensorised yet 
-            for env_id in env_ids:
-                env = self.envs[env_id]
-                handle = self.gym.find_actor_handle(env, actor)
-                extern_sample = self.extern_actor_params[env_id]
-
-                # randomise dof_props, rigid_body, rigid_shape properties 
-                # all obtained from the YAML file
-                # EXAMPLE: prop name: dof_properties, rigid_body_properties, rigid_shape properties  
-                #          prop_attrs: 
-                #               {'damping': {'range': [0.3, 3.0], 'operation': 'scaling', 'distribution': 'loguniform'}
-                #               {'stiffness': {'range': [0.75, 1.5], 'operation': 'scaling', 'distribution': 'loguniform'}
-                for prop_name, prop_attrs in actor_properties.items():
-                    if prop_name == 'color':
-                        num_bodies = self.gym.get_actor_rigid_body_count(
-                            env, handle)
-                        for n in range(num_bodies):
-                            self.gym.set_rigid_body_color(env, handle, n, gymapi.MESH_VISUAL,
-                                                          gymapi.Vec3(random.uniform(0, 1), random.uniform(0, 1), random.uniform(0, 1)))
-                        continue
-
-                    if prop_name == 'scale':
-                        setup_only = prop_attrs.get('setup_only', False)
-                        if (setup_only and not self.sim_initialized) or not setup_only:
-                            attr_randomization_params = prop_attrs
-                            sample = generate_random_samples(attr_randomization_params, 1,
-                                                             self.last_step, None)
-                            og_scale = 1
-                            if attr_randomization_params['operation'] == 'scaling':
-                                new_scale = og_scale * sample
-                            elif attr_randomization_params['operation'] == 'additive':
-                                new_scale = og_scale + sample
-                            self.gym.set_actor_scale(env, handle, new_scale)
-                        continue
-
-                    prop = param_getters_map[prop_name](env, handle)
-                    set_random_properties = True
-
-                    if isinstance(prop, list):
-                        if self.first_randomization:
-                            self.original_props[prop_name] = [
-                                {attr: getattr(p, attr) for attr in dir(p)} for p in prop]
-                        for p, og_p in zip(prop, self.original_props[prop_name]):
+                # Loop over all envs as this part is not tensorised yet 
+                for env_id in env_ids:
+                    env = self.envs[env_id]
+                    handle = self.gym.find_actor_handle(env, actor)
+                    extern_sample = self.extern_actor_params[env_id]
+
+                    # randomise dof_props, rigid_body, rigid_shape properties 
+                    # all obtained from the YAML file
+                    # EXAMPLE: prop name: dof_properties, rigid_body_properties, rigid_shape properties  
+                    #          prop_attrs: 
+                    #               {'damping': {'range': [0.3, 3.0], 'operation': 'scaling', 'distribution': 'loguniform'}
+                    #               {'stiffness': {'range': [0.75, 1.5], 'operation': 'scaling', 'distribution': 'loguniform'}
+                    for prop_name, prop_attrs in actor_properties.items():
+                        if prop_name == 'color':
+                            num_bodies = self.gym.get_actor_rigid_body_count(
+                                env, handle)
+                            for n in range(num_bodies):
+                                self.gym.set_rigid_body_color(env, handle, n, gymapi.MESH_VISUAL,
+                                                              gymapi.Vec3(random.uniform(0, 1), random.uniform(0, 1), random.uniform(0, 1)))
+                            continue
+
+                        if prop_name == 'scale':
+                            setup_only = prop_attrs.get('setup_only', False)
+                            if (setup_only and not self.sim_initialized) or not setup_only:
+                                attr_randomization_params = prop_attrs
+                                sample = generate_random_samples(attr_randomization_params, 1,
+                                                                 self.last_step, None)
+                                og_scale = 1
+                                if attr_randomization_params['operation'] == 'scaling':
+                                    new_scale = og_scale * sample
+                                elif attr_randomization_params['operation'] == 'additive':
+                                    new_scale = og_scale + sample
+                                self.gym.set_actor_scale(env, handle, new_scale)
+                            continue
+
+                        prop = param_getters_map[prop_name](env, handle)
+                        set_random_properties = True
+
+                        if isinstance(prop, list):
+                            if self.first_randomization:
+                                self.original_props[prop_name] = [
+                                    {attr: getattr(p, attr) for attr in dir(p)} for p in prop]
+                            for p, og_p in zip(prop, self.original_props[prop_name]):
+                                for attr, attr_randomization_params in prop_attrs.items():
+                                    setup_only = attr_randomization_params.get('setup_only', False)
+                                    if (setup_only and not self.sim_initialized) or not setup_only:
+                                        smpl = None
+                                        if self.actor_params_generator is not None:
+                                            smpl, extern_offsets[env_id] = get_attr_val_from_sample(
+                                                extern_sample, extern_offsets[env_id], p, attr)
+                                        apply_random_samples(
+                                            p, og_p, attr, attr_randomization_params,
+                                            self.last_step, smpl)
+                                    else:
+                                        set_random_properties = False
+                        else:
+                            if self.first_randomization:
+                                self.original_props[prop_name] = deepcopy(prop)
                             for attr, attr_randomization_params in prop_attrs.items():
                                 setup_only = attr_randomization_params.get('setup_only', False)
                                 if (setup_only and not self.sim_initialized) or not setup_only:
                                     smpl = None
                                     if self.actor_params_generator is not None:
                                         smpl, extern_offsets[env_id] = get_attr_val_from_sample(
-                                            extern_sample, extern_offsets[env_id], p, attr)
+                                            extern_sample, extern_offsets[env_id], prop, attr)
                                     apply_random_samples(
-                                        p, og_p, attr, attr_randomization_params,
-                                        self.last_step, smpl)
+                                        prop, self.original_props[prop_name], attr,
+                                        attr_randomization_params, self.last_step, smpl)
                                 else:
                                     set_random_properties = False
-                    else:
-                        if self.first_randomization:
-                            self.original_props[prop_name] = deepcopy(prop)
-                        for attr, attr_randomization_params in prop_attrs.items():
-                            setup_only = attr_randomization_params.get('setup_only', False)
-                            if (setup_only and not self.sim_initialized) or not setup_only:
-                                smpl = None
-                                if self.actor_params_generator is not None:
-                                    smpl, extern_offsets[env_id] = get_attr_val_from_sample(
-                                        extern_sample, extern_offsets[env_id], prop, attr)
-                                apply_random_samples(
-                                    prop, self.original_props[prop_name], attr,
-                                    attr_randomization_params, self.last_step, smpl)
-                            else:
-                                set_random_properties = False
-
-                    if set_random_properties:
-                        setter = param_setters_map[prop_name]
-                        default_args = param_setter_defaults_map[prop_name]
-                        setter(env, handle, prop, *default_args)
+
+                        if set_random_properties:
+                            setter = param_setters_map[prop_name]
+                            default_args = param_setter_defaults_map[prop_name]
+                            setter(env, handle, prop, *default_args)
 
         if self.actor_params_generator is not None:
             for env_id in env_ids:  # check that we used all dims in sample
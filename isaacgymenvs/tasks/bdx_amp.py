@@ -36,6 +36,8 @@ from gym import spaces
 from isaacgym import gymapi, gymtorch
 from isaacgym.torch_utils import *
 
+from isaacgymenvs.tasks.amp.utils_amp.amp_obs_history import AMPObsHistory
+from isaacgymenvs.tasks.amp.utils_amp.dof_obs_layout import DofObsLayout
 from isaacgymenvs.tasks.bdx_amp_base import BdxAMPBase
 from isaacgymenvs.utilities.bdx_motion_data import MotionLib
 from isaacgymenvs.utils.torch_jit_utils import *
@@ -93,19 +95,23 @@ class BdxAMP(BdxAMPBase):
         self._motion_file = cfg["env"]["motionFile"]
         self._load_motion(self._motion_file)
 
-        # Initialize _amp_obs_buf, _curr_amp_obs_buf, _hist_amp_obs_buf, _amp_obs_demo_buf (?)
+        # Initialize the AMP observation space and the AMPObsHistory ring holding the last
+        # _num_amp_obs_steps AMP observations, whose ordered view is what the discriminator
+        # reads. _amp_obs_demo_buf is allocated on the first demo fetch.
         self._amp_obs_space = spaces.Box(
             np.ones(self.get_num_amp_obs()) * -np.Inf,
             np.ones(self.get_num_amp_obs()) * np.Inf,
         )
 
-        self._amp_obs_buf = torch.zeros(
-            (self.num_envs, self._num_amp_obs_steps, self._num_amp_obs_per_step),
-            device=self.device,
-            dtype=torch.float,
+        # every bdx joint is revolute, so the dof obs are the dof positions
+        self._dof_obs_layout = DofObsLayout(list(range(self.num_dof + 1)), self.device)
+
+        self._amp_obs_hist = AMPObsHistory(
+            self.num_envs,
+            self._num_amp_obs_steps,
+            self._num_amp_obs_per_step,
+            self.device,
         )
-        self._curr_amp_obs_buf = self._amp_obs_buf[:, 0]
-        self._hist_amp_obs_buf = self._amp_obs_buf[:, 1:]
 
         self._amp_obs_demo_buf = None
 
@@ -115,7 +121,9 @@ class BdxAMP(BdxAMPBase):
         self._update_hist_amp_obs()
         self._compute_amp_observations()
 
-        amp_obs_flat = self._amp_obs_buf.view(-1, self.get_num_amp_obs())
+        amp_obs_flat = self._amp_obs_hist.get_ordered().view(
+            -1, self.get_num_amp_obs()
+        )
         self.extras["amp_obs"] = amp_obs_flat
 
         return
@@ -161,7 +169,10 @@ class BdxAMP(BdxAMPBase):
         )
         root_states = torch.cat([root_pos, root_rot, root_vel, root_ang_vel], dim=-1)
         amp_obs_demo = build_amp_observations(
-            root_states, dof_pos, dof_vel, self._local_root_obs
+            root_states,
+            self._dof_obs_layout.compute(dof_pos),
+            dof_vel,
+            self._local_root_obs,
         )
         self._amp_obs_demo_buf[:] = amp_obs_demo.view(self._amp_obs_demo_buf.shape)
 
@@ -319,8 +330,8 @@ class BdxAMP(BdxAMPBase):
         """Default initialization of AMP obs
 
         AMP obs kept the same as previously."""
-        curr_amp_obs = self._curr_amp_obs_buf[env_ids].unsqueeze(-2)
-        self._hist_amp_obs_buf[env_ids] = curr_amp_obs
+        curr_amp_obs = self._amp_obs_hist.current[env_ids].unsqueeze(-2)
+        self._amp_obs_hist.set_history(env_ids, curr_amp_obs)
         return
 
     def _init_amp_obs_ref(self, env_ids, motion_ids, motion_times):
@@ -347,10 +358,16 @@ class BdxAMP(BdxAMPBase):
         ) = self._motion_lib.get_motion_state(motion_ids, motion_times)
         root_states = torch.cat([root_pos, root_rot, root_vel, root_ang_vel], dim=-1)
         amp_obs_demo = build_amp_observations(
-            root_states, dof_pos, dof_vel, self._local_root_obs
+            root_states,
+            self._dof_obs_layout.compute(dof_pos),
+            dof_vel,
+            self._local_root_obs,
         )
-        self._hist_amp_obs_buf[env_ids] = amp_obs_demo.view(
-            self._hist_amp_obs_buf[env_ids].shape
+        self._amp_obs_hist.set_history(
+            env_ids,
+            amp_obs_demo.view(
+                env_ids.shape[0], self._num_amp_obs_steps - 1, amp_obs_demo.shape[-1]
+            ),
         )
         return
 
@@ -380,27 +397,30 @@ class BdxAMP(BdxAMPBase):
         )
         return
 
-    def _update_hist_amp_obs(self, env_ids=None):
-        """Update history of AMP obs by shifting the timestep forward by 1."""
-        if env_ids is None:
-            for i in reversed(range(self._amp_obs_buf.shape[1] - 1)):
-                self._amp_obs_buf[:, i + 1] = self._amp_obs_buf[:, i]
-        else:
-            for i in reversed(range(self._amp_obs_buf.shape[1] - 1)):
-                self._amp_obs_buf[env_ids, i + 1] = self._amp_obs_buf[env_ids, i]
+    def _update_hist_amp_obs(self):
+        """Update history of AMP obs by advancing the ring buffer head by 1."""
+        self._amp_obs_hist.advance()
         return
 
     def _compute_amp_observations(self, env_ids=None):
         if env_ids is None:
-            self._curr_amp_obs_buf[:] = build_amp_observations(
-                self.root_states, self.dof_pos, self.dof_vel, self._local_root_obs
+            self._amp_obs_hist.set_current(
+                build_amp_observations(
+                    self.root_states,
+                    self._dof_obs_layout.compute(self.dof_pos),
+                    self.dof_vel,
+                    self._local_root_obs,
+                )
             )
         else:
-            self._curr_amp_obs_buf[env_ids] = build_amp_observations(
-                self.root_states[env_ids],
-                self.dof_pos[env_ids],
-                self.dof_vel[env_ids],
-                self._local_root_obs,
+            self._amp_obs_hist.set_current(
+                build_amp_observations(
+                    self.root_states[env_ids],
+                    self._dof_obs_layout.compute(self.dof_pos[env_ids]),
+                    self.dof_vel[env_ids],
+                    self._local_root_obs,
+                ),
+                env_ids,
             )
         return
 
@@ -411,41 +431,7 @@ class BdxAMP(BdxAMPBase):
 
 
 @torch.jit.script
-def dof_to_obs(pose):
-    # type: (Tensor) -> Tensor
-    dof_obs_size = 15  # 15 revolute joints
-    dof_offsets = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15]
-    num_joints = len(dof_offsets) - 1
-
-    dof_obs_shape = pose.shape[:-1] + (dof_obs_size,)
-    dof_obs = torch.zeros(dof_obs_shape, device=pose.device)
-    dof_obs_offset = 0
-
-    for j in range(num_joints):
-        dof_offset = dof_offsets[j]
-        dof_size = dof_offsets[j + 1] - dof_offsets[j]
-        joint_pose = pose[:, dof_offset : (dof_offset + dof_size)]
-
-        # assume this is a spherical joint
-        if dof_size == 3:
-            raise RuntimeError("Unexpected spherical joint in bdx dofs")
-            joint_pose_q = exp_map_to_quat(joint_pose)
-            joint_dof_obs = quat_to_tan_norm(joint_pose_q)
-            dof_obs_size = 6
-        elif dof_size == 1:
-            joint_dof_obs = joint_pose
-            dof_obs_size = 1
-        else:
-            raise RuntimeError("Unexpected joint type encountered")
-
-        dof_obs[:, dof_obs_offset : (dof_obs_offset + dof_obs_size)] = joint_dof_obs
-        dof_obs_offset += dof_obs_size
-
-    return dof_obs
-
-
-@torch.jit.script
-def build_amp_observations(root_states, dof_pos, dof_vel, local_root_obs):
+def build_amp_observations(root_states, dof_obs, dof_vel, local_root_obs):
     # type: (Tensor, Tensor, Tensor, bool) -> Tensor
     root_pos = root_states[:, 0:3]
     root_rot = root_states[:, 3:7]
@@ -466,8 +452,6 @@ def build_amp_observations(root_states, dof_pos, dof_vel, local_root_obs):
     local_root_vel = my_quat_rotate(heading_rot, root_vel)
     local_root_ang_vel = my_quat_rotate(heading_rot, root_ang_vel)
 
-    dof_obs = dof_to_obs(dof_pos)
-
     obs = torch.cat(
         (
             # dummy_root_h,
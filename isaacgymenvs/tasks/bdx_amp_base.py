@@ -27,8 +27,6 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import os
-import pickle
-import time
 from typing import Dict, Tuple
 
 import numpy as np
@@ -38,6 +36,7 @@ from isaacgym.torch_utils import *
 
 from isaacgymenvs.tasks.base.vec_task import VecTask
 from isaacgymenvs.utils.torch_jit_utils import calc_heading_quat_inv
+from isaacgymenvs.utils.trajectory_recorder import TrajectoryRecorder
 
 
 class BdxAMPBase(VecTask):
@@ -75,6 +74,13 @@ class BdxAMPBase(VecTask):
             self._pd_control and self._custom_pd_control
         ), "Choose one control method"
 
+        self.decimation = self.cfg["env"]["control"]["decimation"]
+        if self._custom_pd_control:
+            # VecTask runs the self.decimation physics substeps between each call to the policy
+            assert (
+                self.cfg["env"].get("controlFrequencyInv", 1) == self.decimation
+            ), "controlFrequencyInv must match control.decimation with custom PD control"
+
         self.power_scale = self.cfg["env"]["powerScale"]
         self.randomize = self.cfg["task"]["randomize"]
         self.randomization_params = self.cfg["task"]["randomization_params"]
@@ -131,7 +137,6 @@ class BdxAMPBase(VecTask):
         self.Kd = self.cfg["env"]["control"]["damping"]
         self.effort = self.cfg["env"]["control"]["effort"]
         self.action_scale = self.cfg["env"]["control"]["actionScale"]
-        self.decimation = self.cfg["env"]["control"]["decimation"]
 
         # self.dt = self.sim_params.dt
         self.dt = self.decimation * self.sim_params.dt
@@ -220,6 +225,11 @@ class BdxAMPBase(VecTask):
         )
         self._build_pd_action_offset_scale()
 
+        if self._custom_pd_control:
+            self.register_substep_callback(
+                self._apply_custom_pd_torques, refresh_tensors=["dof_state"]
+            )
+
         if self.viewer != None:
             self._init_camera()
 
@@ -234,9 +244,21 @@ class BdxAMPBase(VecTask):
         # self.imu_tensor = gymtorch.wrap_tensor(_imu_tensor)
         #
         if self.debug_save_obs_actions:
-            self.saved_obs = []
-            self.saved_actions = []
-            self.saved_torques = []
+            recorder_cfg = self.cfg["env"].get("debugRecorder", {})
+            self.dof_force_tensor = gymtorch.wrap_tensor(torques).view(
+                self.num_envs, self.num_dof
+            )
+            self.recorder = TrajectoryRecorder(
+                output_dir=recorder_cfg.get("outputDir", "recordings"),
+                fields={
+                    "obs": self.num_obs,
+                    "actions": self.num_actions,
+                    "torques": self.num_dof,
+                },
+                env_ids=recorder_cfg.get("envIds", [0]),
+                chunk_length=recorder_cfg.get("chunkLength", 1000),
+                device=self.device,
+            )
 
     def create_sim(self):
         self.up_axis_idx = 2  # index of up axis: Y=1, Z=2
@@ -387,32 +409,8 @@ class BdxAMPBase(VecTask):
             self.gym.set_dof_position_target_tensor(self.sim, target_tensor)
 
         elif self._custom_pd_control:
-            # There is self.decimation steps of simulation between each call to the policy
-            for _ in range(self.decimation):
-                torques = (
-                    self.Kp
-                    * (
-                        self.actions * self.action_scale
-                        + self.default_dof_pos
-                        - self.dof_pos
-                    )
-                    - self.Kd * self.dof_vel
-                )
-                self.torques = torch.clip(torques, -self.effort, self.effort)
-                # Send desired joint torques to the simulation, run one step of simulator then refresh joint states
-                self.gym.set_dof_actuation_force_tensor(
-                    self.sim, gymtorch.unwrap_tensor(self.torques)
-                )
-                self.torques = self.torques.view(self.torques.shape)
-                self.gym.simulate(self.sim)
-                if self.device == "cpu":
-                    self.gym.fetch_results(self.sim, True)
-                self.gym.refresh_dof_state_tensor(self.sim)
-                self.gym.refresh_net_contact_force_tensor(self.sim)
-
-            # Render the simulation (if there is a graphical interface)
-            if self.force_render:
-                self.render()
+            # torques are computed at the physics rate in _apply_custom_pd_torques
+            pass
 
         else:
             forces = self.actions * self.motor_efforts.unsqueeze(0) * self.power_scale
@@ -420,19 +418,32 @@ class BdxAMPBase(VecTask):
             self.gym.set_dof_actuation_force_tensor(self.sim, force_tensor)
 
         if self.debug_save_obs_actions:
-            self.saved_actions.append((self.actions[0].cpu().numpy(), time.time()))
-            pickle.dump(self.saved_actions, open("saved_actions.pkl", "wb"))
+            self.recorder.record("actions", self.actions)
 
-            self.gym.refresh_dof_force_tensor(self.sim)
-            torques = self.gym.acquire_dof_force_tensor(self.sim)
-            torques = gymtorch.wrap_tensor(torques).view(self.num_envs, self.num_dof)
-
-            self.saved_torques.append(torques[0].cpu().numpy())
-            pickle.dump(self.saved_torques, open("torques.pkl", "wb"))
+            if not self._custom_pd_control:
+                self.gym.refresh_dof_force_tensor(self.sim)
+                self.recorder.record("torques", self.dof_force_tensor)
 
         return
 
+    def _apply_custom_pd_torques(self, substep):
+        torques = (
+            self.Kp
+            * (self.actions * self.action_scale + self.default_dof_pos - self.dof_pos)
+            - self.Kd * self.dof_vel
+        )
+        torch.clip(torques, -self.effort, self.effort, out=self.torques)
+        # Send desired joint torques to the simulation, VecTask then runs one step of simulator
+        self.gym.set_dof_actuation_force_tensor(
+            self.sim, gymtorch.unwrap_tensor(self.torques)
+        )
+
     def post_physics_step(self):
+        if self.debug_save_obs_actions and self._custom_pd_control:
+            # the custom PD torques are recorded once all the substeps ran
+            self.gym.refresh_dof_force_tensor(self.sim)
+            self.recorder.record("torques", self.dof_force_tensor)
+
         self.progress_buf += 1
         self.common_step_counter += 1
 
@@ -517,8 +528,7 @@ class BdxAMPBase(VecTask):
                 self.dof_vel_scale,
             )
         if self.debug_save_obs_actions:
-            self.saved_obs.append(self.obs_buf[0].cpu().numpy())
-            pickle.dump(self.saved_obs, open("saved_obs.pkl", "wb"))
+            self.recorder.record("obs", self.obs_buf)
 
     def reset_idx(self, env_ids):
         self.commands_x[env_ids] = torch_rand_float(
@@ -549,9 +559,7 @@ class BdxAMPBase(VecTask):
             self.apply_randomizations(self.randomization_params)
 
         if self.debug_save_obs_actions:
-            self.saved_obs = []
-            self.saved_actions = []
-            self.saved_torques = []
+            self.recorder.new_episode(env_ids)
 
         self.dof_pos[env_ids] = self.default_dof_pos[env_ids]
         self.dof_vel[env_ids] = self.default_dof_vel[env_ids]
@@ -38,11 +38,10 @@ from isaacgymenvs.utils.dr_utils import get_property_setter_map, get_property_ge
 
 import torch
 import numpy as np
-import operator, random
+import random
 from copy import deepcopy
 from isaacgymenvs.utils.utils import nested_dict_get_attr, nested_dict_set_attr
 
-from collections import deque
 from enum import Enum
 
 
@@ -60,6 +59,64 @@ class RolloutWorkerModes:
     TEST_ENV = 2 # rollout wit default DR params, used to measure overall success rate. (currently unused)
 
 from isaacgymenvs.tasks.base.vec_task import Env, VecTask
+from isaacgymenvs.utils.dr_noise import NonphysicalNoise
+
+
+class ADRBoundaryStats:
+    """Per ADR mode queues of the objective values reached by boundary workers, kept on device.
+
+    Each of the `num_queues` queues is a ring buffer holding the last `queue_length` values pushed to it, like a
+    `deque(maxlen=queue_length)`. Pushing the results of a step and computing the queue means are single batched
+    ops over all queues, with no host sync.
+    """
+
+    def __init__(self, num_queues, queue_length, device):
+        self.num_queues = num_queues
+        self.queue_length = queue_length
+        # the last row collects the values of envs that are not pushed, it is never read
+        self.values = torch.zeros((num_queues + 1, queue_length), dtype=torch.float, device=device)
+        self.heads = torch.zeros(num_queues + 1, dtype=torch.long, device=device)
+        self.lengths = torch.zeros(num_queues + 1, dtype=torch.long, device=device)
+        self.env_ranks = None
+
+    def push(self, queue_ids, values, mask):
+        """Append values[i] to queue queue_ids[i] for every env i where mask[i] is set."""
+        queue_ids = torch.where(mask, queue_ids, torch.full_like(queue_ids, self.num_queues))
+        sorted_ids, order = torch.sort(queue_ids, stable=True)
+        counts = torch.bincount(queue_ids, minlength=self.num_queues + 1)
+        starts = torch.cumsum(counts, dim=0) - counts
+
+        if self.env_ranks is None or self.env_ranks.shape[0] != queue_ids.shape[0]:
+            self.env_ranks = torch.arange(queue_ids.shape[0], dtype=torch.long, device=queue_ids.device)
+        # rank of each value among the values pushed to its queue during this call
+        ranks = self.env_ranks - starts[sorted_ids]
+        # only the last queue_length values pushed to a queue are kept
+        kept = ranks >= counts[sorted_ids] - self.queue_length
+        sorted_ids = torch.where(kept, sorted_ids, torch.full_like(sorted_ids, self.num_queues))
+
+        positions = (self.heads[sorted_ids] + ranks) % self.queue_length
+        self.values[sorted_ids, positions] = values[order].float()
+
+        self.heads.add_(counts).remainder_(self.queue_length)
+        self.lengths.add_(counts).clamp_(max=self.queue_length)
+
+    def means(self):
+        """Mean of the values in each queue, 0 for empty queues."""
+        return self.values[:-1].sum(dim=1) / self.lengths[:-1].clamp(min=1)
+
+    def queue_lengths(self):
+        return self.lengths[:-1]
+
+    def clear(self, queue_id=None):
+        """Empty queue `queue_id`, or all queues if it is None."""
+        if queue_id is None:
+            self.values.zero_()
+            self.heads.zero_()
+            self.lengths.zero_()
+        else:
+            self.values[queue_id] = 0
+            self.heads[queue_id] = 0
+            self.lengths[queue_id] = 0
 
 
 class EnvDextreme(Env):
@@ -158,6 +215,12 @@ class VecTaskDextreme(EnvDextreme, VecTask):
         self.extern_actor_params = {}
         self.last_step = -1
         self.last_rand_step = -1
+
+        # state writes deferred until right before the next physics step, see `defer_set_actor_root_state_tensor_indexed`
+        self.deferred_root_state = None
+        self.deferred_root_indices = []
+        self.deferred_dof_state = None
+        self.deferred_dof_indices = []
         for env_id in range(self.num_envs):
             self.extern_actor_params[env_id] = None
 
@@ -212,13 +275,32 @@ class VecTaskDextreme(EnvDextreme, VecTask):
         self.reset_buf = torch.ones(
             self.num_envs, device=self.device, dtype=torch.long)
         self.timeout_buf = torch.zeros(
-             self.num_envs, device=self.device, dtype=torch.long)
+             self.num_envs, device=self.device, dtype=torch.bool)
         self.progress_buf = torch.zeros(
             self.num_envs, device=self.device, dtype=torch.long)
         self.randomize_buf = torch.zeros(
             self.num_envs, device=self.device, dtype=torch.long)
         self.extras = {}
 
+        self.allocate_output_buffers()
+
+    def allocate_output_buffers(self):
+        """Allocate the buffers returned by `step`, `reset` and `get_state`, see `VecTask.allocate_output_buffers`.
+
+        With `use_dict_obs` the observations are still cloned on every call, only the rewards, resets and time-outs
+        are returned from preallocated buffers.
+        """
+        if not self.use_dict_obs:
+            VecTask.allocate_output_buffers(self)
+            return
+
+        self.outputs_on_rl_device = torch.device(self.device) == torch.device(self.rl_device)
+        self.rl_transfer = None
+        if not self.outputs_on_rl_device:
+            self.rl_rew_buf = torch.zeros_like(self.rew_buf, device=self.rl_device)
+            self.rl_reset_buf = torch.zeros_like(self.reset_buf, device=self.rl_device)
+            self.rl_timeout_buf = torch.zeros_like(self.timeout_buf, device=self.rl_device)
+
     def create_sim(self, compute_device: int, graphics_device: int, physics_engine, sim_params: gymapi.SimParams):
         """Create an Isaac Gym sim object.
 
@@ -241,7 +323,7 @@ class VecTaskDextreme(EnvDextreme, VecTask):
         """Returns the state buffer of the environment (the priviledged observations for asymmetric training)."""
         if self.use_dict_obs:
             raise NotImplementedError("No states in vec task when `use_dict_obs=True`")
-        return torch.clamp(self.states_buf, -self.clip_obs, self.clip_obs).to(self.rl_device)
+        return VecTask.get_state(self)
 
     @abc.abstractmethod
     def pre_physics_step(self, actions: torch.Tensor):
@@ -264,6 +346,7 @@ class VecTaskDextreme(EnvDextreme, VecTask):
         Returns:
             Observations, rewards, resets, info
             Observations are dict of observations (currently only one member called 'obs')
+            The returned tensors are reused by the next step, see `allocate_output_buffers`.
         """
 
         # randomize actions
@@ -273,6 +356,7 @@ class VecTaskDextreme(EnvDextreme, VecTask):
         action_tensor = torch.clamp(actions, -self.clip_actions, self.clip_actions)
         # apply actions
         self.pre_physics_step(action_tensor)
+        self.apply_deferred_state_writes()
 
         # step physics and render each frame
         for i in range(self.control_freq_inv):
@@ -287,7 +371,8 @@ class VecTaskDextreme(EnvDextreme, VecTask):
         self.post_physics_step()
 
         # fill time out buffer: set to 1 if we reached the max episode length AND the reset buffer is 1. Timeout == 1 makes sense only if the reset buffer is 1.
-        self.timeout_buf = (self.progress_buf >= self.max_episode_length - 1) & (self.reset_buf != 0)
+        torch.ge(self.progress_buf, self.max_episode_length - 1, out=self.timeout_buf)
+        self.timeout_buf.logical_and_(self.reset_buf)
 
         # randomize observations
         # cannot randomise in the env because of missing suffix in the observation dict
@@ -312,7 +397,9 @@ class VecTaskDextreme(EnvDextreme, VecTask):
         elif self.randomize and self.randomize_obs_builtin and not self.use_dict_obs and self.obs_randomizations is not None:
             self.obs_buf = self.obs_randomizations['noise_lambda'](self.obs_buf)
 
-        self.extras["time_outs"] = self.timeout_buf.to(self.rl_device)
+        self.extras["time_outs"] = self._to_rl_device(self.timeout_buf, "rl_timeout_buf")
+        rew = self._to_rl_device(self.rew_buf, "rl_rew_buf")
+        reset = self._to_rl_device(self.reset_buf, "rl_reset_buf")
 
         if self.use_dict_obs:
             obs_dict_ret = {
@@ -322,15 +409,15 @@ class VecTaskDextreme(EnvDextreme, VecTask):
                 for k, t in self.obs_dict.items()
             }
 
-            return obs_dict_ret, self.rew_buf.to(self.rl_device), self.reset_buf.to(self.rl_device), self.extras
+            return obs_dict_ret, rew, reset, self.extras
         else:
-            self.obs_dict["obs"] = torch.clamp(self.obs_buf, -self.clip_obs, self.clip_obs).to(self.rl_device)
+            self.obs_dict["obs"] = self._get_obs()
 
             # asymmetric actor-critic
             if self.num_states > 0:
                 self.obs_dict["states"] = self.get_state()
 
-            return self.obs_dict, self.rew_buf.to(self.rl_device), self.reset_buf.to(self.rl_device), self.extras
+            return self.obs_dict, rew, reset, self.extras
 
     def reset(self) -> torch.Tensor:
         """Reset the environment.
@@ -353,7 +440,7 @@ class VecTaskDextreme(EnvDextreme, VecTask):
             return obs_dict_ret
         else:
 
-            self.obs_dict["obs"] = torch.clamp(self.obs_buf, -self.clip_obs, self.clip_obs).to(self.rl_device)
+            self.obs_dict["obs"] = self._get_obs()
 
             # asymmetric actor-critic
             if self.num_states > 0:
@@ -397,15 +484,16 @@ class VecTaskDextreme(EnvDextreme, VecTask):
             print(f'ADR Params after loading from checkpoint: {self.adr_params}')
 
                   
-    def get_randomization_dict(self, dr_params, obs_shape):
+    def get_randomization_dict(self, dr_params, prev=None):
+        """Return the noise of an observation/action DR config, reusing the noise module of `prev` if it matches.
+
+        The correlated noise is redrawn on every call. Without ADR, the white noise is applied to each env with
+        probability `apply_white_noise`, also redrawn on every call.
+        """
         dist = dr_params["distribution"]
         op_type = dr_params["operation"]
         sched_type = dr_params["schedule"] if "schedule" in dr_params else None
         sched_step = dr_params["schedule_steps"] if "schedule" in dr_params else None
-        op = operator.add if op_type == 'additive' else operator.mul
-
-        if not self.use_adr:
-            apply_white_noise_prob = dr_params.get("apply_white_noise", 0.5)
 
         if sched_type == 'linear':
             sched_scaling = 1.0 / sched_step * \
@@ -432,23 +520,8 @@ class VecTaskDextreme(EnvDextreme, VecTask):
                 var_corr = var_corr * sched_scaling  # scale up var over time
                 mu_corr = mu_corr * sched_scaling + 1.0 * \
                     (1.0 - sched_scaling)  # linearly interpolate
-            
-            local_params = {
-                'mu': mu, 'var': var, 'mu_corr': mu_corr, 'var_corr': var_corr,
-                'corr': torch.randn(self.num_envs, *obs_shape, device=self.device)            
-            }
-            if not self.use_adr:
-                local_params['apply_white_noise_mask'] = (torch.rand(self.num_envs, device=self.device) < apply_white_noise_prob).float()
-            def noise_lambda(tensor, params=local_params):
-                corr = local_params['corr']
-                corr = corr * params['var_corr'] + params['mu_corr']
-                if self.use_adr:
-                    return op(
-                        tensor, corr + torch.randn_like(tensor) * params['var'] + params['mu'])
-                else:
-                    return op(
-                    tensor, corr + torch.randn_like(tensor) * params['apply_white_noise_mask'].view(-1, 1) * params['var'] + params['mu'])
 
+            range_params = (mu, var, mu_corr, var_corr)
 
         elif dist == 'uniform':
             lo, hi = dr_params["range"]
@@ -465,26 +538,24 @@ class VecTaskDextreme(EnvDextreme, VecTask):
                 lo_corr = lo_corr * sched_scaling + 1.0 * (1.0 - sched_scaling)
                 hi_corr = hi_corr * sched_scaling + 1.0 * (1.0 - sched_scaling)
 
-            local_params = {'lo': lo, 'hi': hi, 'lo_corr': lo_corr, 'hi_corr': hi_corr,
-                            'corr': torch.rand(self.num_envs, *obs_shape, device=self.device)
-                            }
-            if not self.use_adr:
-                local_params['apply_white_noise_mask'] = (torch.rand(self.num_envs, device=self.device) < apply_white_noise_prob).float()
-
-            def noise_lambda(tensor, params=local_params):
-                corr = params['corr']
-                corr = corr * (params['hi_corr'] - params['lo_corr']) + params['lo_corr']
-                if self.use_adr:
-                    return op(tensor, corr + torch.rand_like(tensor) * (params['hi'] - params['lo']) + params['lo'])
-                else:
-                    return op(tensor, corr + torch.rand_like(tensor) * params['apply_white_noise_mask'].view(-1, 1) * (params['hi'] - params['lo']) + params['lo'])
-
+            range_params = (lo, hi, lo_corr, hi_corr)
 
         else:
             raise NotImplementedError
 
-        # return {'lo': lo, 'hi': hi, 'lo_corr': lo_corr, 'hi_corr': hi_corr, 'noise_lambda': noise_lambda}
-        return {'noise_lambda': noise_lambda, 'corr_val': local_params['corr']}
+        # the correlated noise is drawn from the same distribution as the white noise
+        if prev is None or (prev['noise_lambda'].distribution, prev['noise_lambda'].operation) != (dist, op_type):
+            noise = NonphysicalNoise(dist, op_type, self.device, corr_distribution=dist)
+        else:
+            noise = prev['noise_lambda']
+            noise.resample_correlated()
+        noise.set_params(*range_params)
+
+        if not self.use_adr:
+            apply_white_noise_prob = dr_params.get("apply_white_noise", 0.5)
+            noise.set_white_noise_mask(torch.rand(self.num_envs, device=self.device) < apply_white_noise_prob)
+
+        return {'noise_lambda': noise}
 
 class ADRVecTask(VecTaskDextreme):
 
@@ -553,7 +624,7 @@ class ADRVecTask(VecTaskDextreme):
             # there are 2n modes, where mode 2n is lower range and mode 2n+1 is upper range for DR parameter n
             self.adr_modes = torch.zeros(self.cfg["env"]["numEnvs"], dtype=torch.long, device=sim_device)
 
-            self.adr_objective_queues = [deque(maxlen=self.adr_queue_threshold_length) for _ in range(2*self.num_adr_params)]
+            self.adr_boundary_stats = ADRBoundaryStats(2*self.num_adr_params, self.adr_queue_threshold_length, sim_device)
 
         super().__init__(config, rl_device, sim_device, graphics_device_id, headless, use_dict_obs=use_dict_obs)
 
@@ -579,13 +650,19 @@ class ADRVecTask(VecTaskDextreme):
             a patched dictionary with the env randomisations corresponding to the env ID.
         """
 
-        env_type = self.worker_types[env_id]
+        return self.get_dr_params_by_group(int(self.worker_types[env_id]), int(self.adr_modes[env_id]),
+                                           default_dr_params, current_adr_params)
+
+    def get_dr_params_by_group(self, env_type, adr_mode, default_dr_params, current_adr_params):
+        """Returns the (dictionary) DR params for the envs of a worker type and ADR mode.
+
+        All envs with the same worker type, and for ADR boundary workers the same ADR mode, share their DR params,
+        so these only need to be resolved once per group.
+        """
+
         if env_type == RolloutWorkerModes.ADR_ROLLOUT: # rollout worker, uses current ADR params
             return current_adr_params
         elif env_type == RolloutWorkerModes.ADR_BOUNDARY: # ADR worker, substitute upper or lower bound as entire range for this env
-            adr_mode = int(self.adr_modes[env_id])
-
-            env_adr_params = copy.deepcopy(current_adr_params)
             adr_id = adr_mode // 2 # which adr parameter
             adr_bound = adr_mode % 2 # 0 = lower, 1 = upper
             param_name = self.adr_params_keys[adr_id]
@@ -593,7 +670,7 @@ class ADRVecTask(VecTaskDextreme):
             # this DR parameter is randomised as a tensor not through normal DR api
             # if not "range_path" in self.adr_params[self.adr_params_keys[adr_id]]:
             if not param_name in self.adr_params_builtin_keys:
-                return env_adr_params
+                return current_adr_params
             
             if self.adr_extended_boundary_sample:
                 boundary_value = self.adr_params[param_name]["next_limits"][adr_bound] 
@@ -601,6 +678,7 @@ class ADRVecTask(VecTaskDextreme):
                 boundary_value = self.adr_params[param_name]["range"][adr_bound]
             new_range = [boundary_value, boundary_value]
             
+            env_adr_params = copy.deepcopy(current_adr_params)
             nested_dict_set_attr(env_adr_params, self.adr_params[param_name]["range_path"], new_range)
 
             return env_adr_params
@@ -768,6 +846,25 @@ class ADRVecTask(VecTaskDextreme):
 
         if self.update_adr_ranges:
 
+            # add the objective values of environments which have been evaluating an ADR boundary (and finished
+            # the episode) to the queue of the boundary they evaluated, all at once on device
+            adr_done = rand_env_mask & (self.worker_types == RolloutWorkerModes.ADR_BOUNDARY)
+            self.adr_boundary_stats.push(self.adr_modes, adr_objective, adr_done)
+
+            queue_means = self.adr_boundary_stats.means()
+            queue_lengths = self.adr_boundary_stats.queue_lengths()
+            queue_full = queue_lengths >= self.adr_queue_threshold_length
+            boundary_moves = queue_full & ((queue_means < self.adr_objective_threshold_low) | (queue_means > self.adr_objective_threshold_high))
+
+            # the queue statistics are only copied to the host when a boundary may change, or for logging
+            log_adr = hasattr(self, 'extras') and self.last_step % 100 == 0
+            if log_adr or boundary_moves.any():
+                queue_means = queue_means.tolist()
+                queue_lengths = queue_lengths.tolist()
+                stats_on_host = True
+            else:
+                stats_on_host = False
+
             adr_params_iter = list(enumerate(self.adr_params))
             random.shuffle(adr_params_iter)
             
@@ -781,28 +878,10 @@ class ADRVecTask(VecTaskDextreme):
                 # mode index for environments evaluating upper ADR bound
                 high_idx = 2*n+1
 
-                adr_workers_low = (self.worker_types == RolloutWorkerModes.ADR_BOUNDARY) & (self.adr_modes == low_idx)
-                adr_workers_high = (self.worker_types == RolloutWorkerModes.ADR_BOUNDARY) & (self.adr_modes == high_idx)
-                
-                # environments which will be evaluated for ADR (finished the episode) and which are evaluating performance at the
-                # lower and upper boundaries
-                adr_done_low = rand_env_mask & adr_workers_low
-                adr_done_high = rand_env_mask & adr_workers_high
-                
-                # objective value at environments which have been evaluating the lower bound of ADR param n 
-                objective_low_bounds = adr_objective[adr_done_low]
-                # objective value at environments which have been evaluating the upper bound of ADR param n 
-                objective_high_bounds = adr_objective[adr_done_high]
-
-                # add the success of objectives to queues
-                self.adr_objective_queues[low_idx].extend(objective_low_bounds.cpu().numpy().tolist())
-                self.adr_objective_queues[high_idx].extend(objective_high_bounds.cpu().numpy().tolist())
-
-                low_queue = self.adr_objective_queues[low_idx]
-                high_queue = self.adr_objective_queues[high_idx]
-
-                mean_low = np.mean(low_queue) if len(low_queue) > 0 else 0.
-                mean_high = np.mean(high_queue) if len(high_queue) > 0 else 0.
+                mean_low = queue_means[low_idx] if stats_on_host else 0.
+                mean_high = queue_means[high_idx] if stats_on_host else 0.
+                low_queue_len = queue_lengths[low_idx] if stats_on_host else 0
+                high_queue_len = queue_lengths[high_idx] if stats_on_host else 0
 
                 current_range = self.adr_params[adr_param_name]["range"]
                 range_lower = current_range[0]
@@ -816,7 +895,7 @@ class ADRVecTask(VecTaskDextreme):
                 
                 changed_low, changed_high = False, False
                 
-                if len(low_queue) >= self.adr_queue_threshold_length:
+                if low_queue_len >= self.adr_queue_threshold_length:
 
                     changed_low = False
 
@@ -835,11 +914,12 @@ class ADRVecTask(VecTaskDextreme):
                     # if the ADR boundary is changed, workers working from the old paremeters become invalid.
                     # Therefore, while we use the data from them to train, we can no longer use them to evaluate DR at the boundary
                     if changed_low:
-                        print(f'Changing {adr_param_name} lower bound. Queue length {len(self.adr_objective_queues[low_idx])}. Mean perf: {mean_low}. Old val: {current_range[0]}. New val: {range_lower}')
-                        self.adr_objective_queues[low_idx].clear()
+                        print(f'Changing {adr_param_name} lower bound. Queue length {low_queue_len}. Mean perf: {mean_low}. Old val: {current_range[0]}. New val: {range_lower}')
+                        self.adr_boundary_stats.clear(low_idx)
+                        adr_workers_low = (self.worker_types == RolloutWorkerModes.ADR_BOUNDARY) & (self.adr_modes == low_idx)
                         self.worker_types[adr_workers_low] = RolloutWorkerModes.ADR_ROLLOUT
                 
-                if len(high_queue) >= self.adr_queue_threshold_length:
+                if high_queue_len >= self.adr_queue_threshold_length:
 
                     if mean_high < self.adr_objective_threshold_low:
                         # reduce upper bound
@@ -855,8 +935,9 @@ class ADRVecTask(VecTaskDextreme):
                     # if the ADR boundary is changed, workers working from the old paremeters become invalid.
                     # Therefore, while we use the data from them to train, we can no longer use them to evaluate DR at the boundary
                     if changed_high:
-                        print(f'Changing upper bound {adr_param_name}. Queue length {len(self.adr_objective_queues[high_idx])}. Mean perf {mean_high}. Old val: {current_range[1]}. New val: {range_upper}')
-                        self.adr_objective_queues[high_idx].clear()
+                        print(f'Changing upper bound {adr_param_name}. Queue length {high_queue_len}. Mean perf {mean_high}. Old val: {current_range[1]}. New val: {range_upper}')
+                        self.adr_boundary_stats.clear(high_idx)
+                        adr_workers_high = (self.worker_types == RolloutWorkerModes.ADR_BOUNDARY) & (self.adr_modes == high_idx)
                         self.worker_types[adr_workers_high] = RolloutWorkerModes.ADR_ROLLOUT
 
                 if changed_low or next_limit_lower is None:
@@ -883,20 +964,19 @@ class ADRVecTask(VecTaskDextreme):
                     self.extras[f'adr/params/{adr_param_name}/lower'] = range_lower
                     self.extras[f'adr/params/{adr_param_name}/upper'] = range_upper
                     self.extras[f'adr/objective_perf/boundary/{adr_param_name}/lower/value'] = mean_low
-                    self.extras[f'adr/objective_perf/boundary/{adr_param_name}/lower/queue_len'] = len(low_queue)
+                    self.extras[f'adr/objective_perf/boundary/{adr_param_name}/lower/queue_len'] = low_queue_len
                     self.extras[f'adr/objective_perf/boundary/{adr_param_name}/upper/value'] = mean_high
-                    self.extras[f'adr/objective_perf/boundary/{adr_param_name}/upper/queue_len'] = len(high_queue)
+                    self.extras[f'adr/objective_perf/boundary/{adr_param_name}/upper/queue_len'] = high_queue_len
                 
                 if self.adr_clear_other_queues and (changed_low or changed_high):
 
-                    for q in self.adr_objective_queues:
-                        q.clear()
+                    self.adr_boundary_stats.clear()
                     recycle_envs = torch.nonzero((self.worker_types == RolloutWorkerModes.ADR_BOUNDARY), as_tuple=False).squeeze(-1)
                     self.recycle_envs(recycle_envs)
                     already_recycled = True
                     break
             
-            if hasattr(self, 'extras') and self.last_step % 100 == 0: # only log so often to prevent huge log files with ADR vars
+            if log_adr: # only log so often to prevent huge log files with ADR vars
                 mean_perf = adr_objective[rand_env_mask & (self.worker_types == RolloutWorkerModes.ADR_ROLLOUT)].mean()
                 if self.adr_rollout_perf_last is None:
                     self.adr_rollout_perf_last = mean_perf
@@ -978,14 +1058,15 @@ class ADRVecTask(VecTaskDextreme):
             
         # We don't use it for ADR(!)
         if self.randomize_act_builtin:
-            self.action_randomizations = self.get_randomization_dict(dr_params['actions'], (self.num_actions,))
+            self.action_randomizations = self.get_randomization_dict(dr_params['actions'], self.action_randomizations)
         
         if self.use_dict_obs and self.randomize_obs_builtin: 
             for nonphysical_param in self.randomisation_obs:
-                self.obs_randomizations[nonphysical_param] = self.get_randomization_dict(dr_params['observations'][nonphysical_param], 
-                                                                self.obs_space[nonphysical_param].shape)
+                self.obs_randomizations[nonphysical_param] = self.get_randomization_dict(
+                    dr_params['observations'][nonphysical_param], self.obs_randomizations.get(nonphysical_param, None))
         elif self.randomize_obs_builtin:
-            self.observation_randomizations = self.get_randomization_dict(dr_params['observations'], self.obs_space.shape)
+            self.observation_randomizations = self.get_randomization_dict(
+                dr_params['observations'], getattr(self, 'observation_randomizations', None))
 
 
         param_setters_map = get_property_setter_map(self.gym)
@@ -1040,13 +1121,24 @@ class ADRVecTask(VecTaskDextreme):
         # randomise all attributes of each actor (hand, cube etc..)
         # actor_properties are (stiffness, damping etc..)
 
+        if self.use_adr:
+            # envs are grouped by (worker type, ADR mode) and the DR params of each group are only resolved once,
+            # the groups of all envs being read from the device with a single copy
+            env_ids_tensor = torch.tensor(env_ids, dtype=torch.long, device=self.device)
+            env_groups = torch.stack([self.worker_types[env_ids_tensor], self.adr_modes[env_ids_tensor]], dim=-1).tolist()
+            group_dr_params = {}
+
         # Loop over envs, then loop over actors, then loop over their props 
         # and lastly loop over the ranges of the params 
         for i_, env_id in enumerate(env_ids):
 
             if self.use_adr:
                 # need to generate a custom dictionary for ADR parameters
-                env_dr_params = self.get_dr_params_by_env_id(env_id, dr_params, current_adr_params)
+                env_type, adr_mode = env_groups[i_]
+                group = (env_type, adr_mode if env_type == RolloutWorkerModes.ADR_BOUNDARY else None)
+                if group not in group_dr_params:
+                    group_dr_params[group] = self.get_dr_params_by_group(env_type, adr_mode, dr_params, current_adr_params)
+                env_dr_params = group_dr_params[group]
             else:
                 env_dr_params = dr_params
 
@@ -426,8 +426,9 @@ class AllegroHandDextreme(ADRVecTask):
                                                           self.hand_dof_upper_limits[i], steps=softmax_bins).to(self.device)
 
             # input is the joint angles and cube pose (pos: 3 + quat: 4), therefore a total of 16+7 dimensions
+            rna_dtype = getattr(torch, self.cfg["env"]["random_network_adversary"].get("dtype", "float32"))
             self.rna_network = RandomNetworkAdversary(num_envs=self.num_envs, in_dims=num_dofs+7, \
-                out_dims=num_dofs, softmax_bins=softmax_bins, device=self.device)
+                out_dims=num_dofs, softmax_bins=softmax_bins, device=self.device, dtype=rna_dtype)
 
 
 
@@ -724,9 +725,7 @@ class AllegroHandDextreme(ADRVecTask):
 
         if apply_reset:
             goal_object_indices = self.goal_object_indices[env_ids].to(torch.int32)
-            self.gym.set_actor_root_state_tensor_indexed(self.sim,
-                                                         gymtorch.unwrap_tensor(self.root_state_tensor),
-                                                         gymtorch.unwrap_tensor(goal_object_indices), len(env_ids))
+            self.defer_set_actor_root_state_tensor_indexed(self.root_state_tensor, goal_object_indices)
         self.reset_goal_buf[env_ids] = 0
 
         # change back to non-initialized state
@@ -801,9 +800,7 @@ class AllegroHandDextreme(ADRVecTask):
         object_indices = torch.unique(torch.cat([self.object_indices[env_ids],
                                                  self.goal_object_indices[env_ids],
                                                  self.goal_object_indices[goal_env_ids]]).to(torch.int32))
-        self.gym.set_actor_root_state_tensor_indexed(self.sim,
-                                                     gymtorch.unwrap_tensor(self.root_state_tensor),
-                                                     gymtorch.unwrap_tensor(object_indices), len(object_indices))
+        self.defer_set_actor_root_state_tensor_indexed(self.root_state_tensor, object_indices)
 
         # reset random force probabilities
         self.random_force_prob[env_ids] = torch.exp((torch.log(self.force_prob_range[0]) - torch.log(self.force_prob_range[1]))
@@ -829,9 +826,7 @@ class AllegroHandDextreme(ADRVecTask):
                                                         gymtorch.unwrap_tensor(self.prev_targets),
                                                         gymtorch.unwrap_tensor(hand_indices), len(env_ids))
 
-        self.gym.set_dof_state_tensor_indexed(self.sim,
-                                              gymtorch.unwrap_tensor(self.dof_state),
-                                              gymtorch.unwrap_tensor(hand_indices), len(env_ids))
+        self.defer_set_dof_state_tensor_indexed(self.dof_state, hand_indices)
 
 
 
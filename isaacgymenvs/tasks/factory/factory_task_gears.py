@@ -150,10 +150,7 @@ class FactoryTaskGears(FactoryEnvGears, FactoryABCTask):
         self.dof_vel[env_ids, 0:self.franka_num_dofs] = 0.0
 
         franka_actor_ids_sim_int32 = self.franka_actor_ids_sim.to(dtype=torch.int32, device=self.device)[env_ids]
-        self.gym.set_dof_state_tensor_indexed(self.sim,
-                                              gymtorch.unwrap_tensor(self.dof_state),
-                                              gymtorch.unwrap_tensor(franka_actor_ids_sim_int32),
-                                              len(franka_actor_ids_sim_int32))
+        self.defer_set_dof_state_tensor_indexed(self.dof_state, franka_actor_ids_sim_int32)
 
         self.ctrl_target_dof_pos[env_ids, 0:self.franka_num_dofs] = self.dof_pos[env_ids, 0:self.franka_num_dofs]
         self.gym.set_dof_position_target_tensor(self.sim, gymtorch.unwrap_tensor(self.ctrl_target_dof_pos))
@@ -203,13 +200,7 @@ class FactoryTaskGears(FactoryEnvGears, FactoryABCTask):
                                                gear_medium_actor_ids_sim_int32[env_ids],
                                                gear_large_actor_ids_sim_int32[env_ids]))
 
-        self.gym.set_actor_root_state_tensor_indexed(self.sim,
-                                                     gymtorch.unwrap_tensor(self.root_state),
-                                                     gymtorch.unwrap_tensor(gears_actor_ids_sim_int32),
-                                                     len(gear_small_actor_ids_sim_int32[env_ids]) +
-                                                     len(gear_medium_actor_ids_sim_int32[env_ids]) +
-                                                     len(gear_large_actor_ids_sim_int32[env_ids])
-                                                     )
+        self.defer_set_actor_root_state_tensor_indexed(self.root_state, gears_actor_ids_sim_int32)
 
 
     def _reset_buffers(self, env_ids):
@@ -151,10 +151,7 @@ class FactoryTaskInsertion(FactoryEnvInsertion, FactoryABCTask):
         self.dof_vel[env_ids, 0:self.franka_num_dofs] = 0.0
 
         franka_actor_ids_sim_int32 = self.franka_actor_ids_sim.to(dtype=torch.int32, device=self.device)[env_ids]
-        self.gym.set_dof_state_tensor_indexed(self.sim,
-                                              gymtorch.unwrap_tensor(self.dof_state),
-                                              gymtorch.unwrap_tensor(franka_actor_ids_sim_int32),
-                                              len(franka_actor_ids_sim_int32))
+        self.defer_set_dof_state_tensor_indexed(self.dof_state, franka_actor_ids_sim_int32)
 
         self.ctrl_target_dof_pos[env_ids, 0:self.franka_num_dofs] = self.dof_pos[env_ids, 0:self.franka_num_dofs]
         self.gym.set_dof_position_target_tensor(self.sim, gymtorch.unwrap_tensor(self.ctrl_target_dof_pos))
@@ -180,10 +177,7 @@ class FactoryTaskInsertion(FactoryEnvInsertion, FactoryABCTask):
         self.root_angvel[env_ids, self.plug_actor_id_env] = 0.0
 
         plug_actor_ids_sim_int32 = self.plug_actor_ids_sim.to(dtype=torch.int32, device=self.device)
-        self.gym.set_actor_root_state_tensor_indexed(self.sim,
-                                                     gymtorch.unwrap_tensor(self.root_state),
-                                                     gymtorch.unwrap_tensor(plug_actor_ids_sim_int32[env_ids]),
-                                                     len(plug_actor_ids_sim_int32[env_ids]))
+        self.defer_set_actor_root_state_tensor_indexed(self.root_state, plug_actor_ids_sim_int32[env_ids])
 
     def _reset_buffers(self, env_ids):
         """Reset buffers. """
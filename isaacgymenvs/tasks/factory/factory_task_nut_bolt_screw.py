@@ -41,7 +41,7 @@ import omegaconf
 import os
 import torch
 
-from isaacgym import gymapi, gymtorch
+from isaacgym import gymapi
 from isaacgymenvs.utils import torch_jit_utils as torch_utils
 import isaacgymenvs.tasks.factory.factory_control as fc
 from isaacgymenvs.tasks.factory.factory_env_nut_bolt import FactoryEnvNutBolt
@@ -194,10 +194,7 @@ class FactoryTaskNutBoltScrew(FactoryEnvNutBolt, FactoryABCTask):
         self.ctrl_target_dof_pos[env_ids] = self.dof_pos[env_ids]
 
         multi_env_ids_int32 = self.franka_actor_ids_sim[env_ids].flatten()
-        self.gym.set_dof_state_tensor_indexed(self.sim,
-                                              gymtorch.unwrap_tensor(self.dof_state),
-                                              gymtorch.unwrap_tensor(multi_env_ids_int32),
-                                              len(multi_env_ids_int32))
+        self.defer_set_dof_state_tensor_indexed(self.dof_state, multi_env_ids_int32)
 
     def _reset_object(self, env_ids):
         """Reset root state of nut."""
@@ -221,10 +218,7 @@ class FactoryTaskNutBoltScrew(FactoryEnvNutBolt, FactoryABCTask):
         self.root_linvel[env_ids, self.nut_actor_id_env] = 0.0
         self.root_angvel[env_ids, self.nut_actor_id_env] = 0.0
 
-        self.gym.set_actor_root_state_tensor_indexed(self.sim,
-                                                     gymtorch.unwrap_tensor(self.root_state),
-                                                     gymtorch.unwrap_tensor(self.nut_actor_ids_sim),
-                                                     len(self.nut_actor_ids_sim))
+        self.defer_set_actor_root_state_tensor_indexed(self.root_state, self.nut_actor_ids_sim)
 
     def _reset_buffers(self, env_ids):
         """Reset buffers."""
@@ -297,23 +297,10 @@ class Humanoid(VecTask):
 
         # debug viz
         if self.viewer and self.debug_viz:
-            self.gym.clear_lines(self.viewer)
-
-            points = []
-            colors = []
-            for i in range(self.num_envs):
-                origin = self.gym.get_env_origin(self.envs[i])
-                pose = self.root_states[:, 0:3][i].cpu().numpy()
-                glob_pos = gymapi.Vec3(origin.x + pose[0], origin.y + pose[1], origin.z + pose[2])
-                points.append([glob_pos.x, glob_pos.y, glob_pos.z, glob_pos.x + 4 * self.heading_vec[i, 0].cpu().numpy(),
-                               glob_pos.y + 4 * self.heading_vec[i, 1].cpu().numpy(),
-                               glob_pos.z + 4 * self.heading_vec[i, 2].cpu().numpy()])
-                colors.append([0.97, 0.1, 0.06])
-                points.append([glob_pos.x, glob_pos.y, glob_pos.z, glob_pos.x + 4 * self.up_vec[i, 0].cpu().numpy(), glob_pos.y + 4 * self.up_vec[i, 1].cpu().numpy(),
-                               glob_pos.z + 4 * self.up_vec[i, 2].cpu().numpy()])
-                colors.append([0.05, 0.99, 0.04])
-
-            self.gym.add_lines(self.viewer, None, self.num_envs * 2, points, colors)
+            debug_draw = self.get_debug_draw()
+            debug_draw.add_arrows(self.root_states[:, 0:3], self.heading_vec, (0.97, 0.1, 0.06), scale=4)
+            debug_draw.add_arrows(self.root_states[:, 0:3], self.up_vec, (0.05, 0.99, 0.04), scale=4)
+            debug_draw.draw()
 
 #####################################################################
 ###=========================jit functions=========================###
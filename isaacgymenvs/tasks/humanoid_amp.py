@@ -36,7 +36,8 @@ from gym import spaces
 from isaacgym import gymapi
 from isaacgym import gymtorch
 
-from isaacgymenvs.tasks.amp.humanoid_amp_base import HumanoidAMPBase, dof_to_obs
+from isaacgymenvs.tasks.amp.humanoid_amp_base import HumanoidAMPBase
+from isaacgymenvs.tasks.amp.utils_amp.amp_obs_history import AMPObsHistory
 from isaacgymenvs.tasks.amp.utils_amp import gym_util
 from isaacgymenvs.tasks.amp.utils_amp.motion_lib import MotionLib
 
@@ -105,13 +106,9 @@ class HumanoidAMP(HumanoidAMPBase):
             np.ones(self.num_amp_obs) * -np.Inf, np.ones(self.num_amp_obs) * np.Inf
         )
 
-        self._amp_obs_buf = torch.zeros(
-            (self.num_envs, self._num_amp_obs_steps, NUM_AMP_OBS_PER_STEP),
-            device=self.device,
-            dtype=torch.float,
+        self._amp_obs_hist = AMPObsHistory(
+            self.num_envs, self._num_amp_obs_steps, NUM_AMP_OBS_PER_STEP, self.device
         )
-        self._curr_amp_obs_buf = self._amp_obs_buf[:, 0]
-        self._hist_amp_obs_buf = self._amp_obs_buf[:, 1:]
 
         self._amp_obs_demo_buf = None
 
@@ -123,7 +120,9 @@ class HumanoidAMP(HumanoidAMPBase):
         self._update_hist_amp_obs()
         self._compute_amp_observations()
 
-        amp_obs_flat = self._amp_obs_buf.view(-1, self.get_num_amp_obs())
+        amp_obs_flat = self._amp_obs_hist.get_ordered().view(
+            -1, self.get_num_amp_obs()
+        )
         self.extras["amp_obs"] = amp_obs_flat
 
         return
@@ -177,7 +176,11 @@ class HumanoidAMP(HumanoidAMPBase):
         print("===")
         root_states = torch.cat([root_pos, root_rot, root_vel, root_ang_vel], dim=-1)
         amp_obs_demo = build_amp_observations(
-            root_states, dof_pos, dof_vel, key_pos, self._local_root_obs
+            root_states,
+            self._dof_obs_layout.compute(dof_pos),
+            dof_vel,
+            key_pos,
+            self._local_root_obs,
         )
         self._amp_obs_demo_buf[:] = amp_obs_demo.view(self._amp_obs_demo_buf.shape)
 
@@ -322,8 +325,8 @@ class HumanoidAMP(HumanoidAMPBase):
         return
 
     def _init_amp_obs_default(self, env_ids):
-        curr_amp_obs = self._curr_amp_obs_buf[env_ids].unsqueeze(-2)
-        self._hist_amp_obs_buf[env_ids] = curr_amp_obs
+        curr_amp_obs = self._amp_obs_hist.current[env_ids].unsqueeze(-2)
+        self._amp_obs_hist.set_history(env_ids, curr_amp_obs)
         return
 
     def _init_amp_obs_ref(self, env_ids, motion_ids, motion_times):
@@ -348,10 +351,17 @@ class HumanoidAMP(HumanoidAMPBase):
         ) = self._motion_lib.get_motion_state(motion_ids, motion_times)
         root_states = torch.cat([root_pos, root_rot, root_vel, root_ang_vel], dim=-1)
         amp_obs_demo = build_amp_observations(
-            root_states, dof_pos, dof_vel, key_pos, self._local_root_obs
+            root_states,
+            self._dof_obs_layout.compute(dof_pos),
+            dof_vel,
+            key_pos,
+            self._local_root_obs,
         )
-        self._hist_amp_obs_buf[env_ids] = amp_obs_demo.view(
-            self._hist_amp_obs_buf[env_ids].shape
+        self._amp_obs_hist.set_history(
+            env_ids,
+            amp_obs_demo.view(
+                env_ids.shape[0], self._num_amp_obs_steps - 1, amp_obs_demo.shape[-1]
+            ),
         )
         return
 
@@ -381,32 +391,32 @@ class HumanoidAMP(HumanoidAMPBase):
         )
         return
 
-    def _update_hist_amp_obs(self, env_ids=None):
-        if env_ids is None:
-            for i in reversed(range(self._amp_obs_buf.shape[1] - 1)):
-                self._amp_obs_buf[:, i + 1] = self._amp_obs_buf[:, i]
-        else:
-            for i in reversed(range(self._amp_obs_buf.shape[1] - 1)):
-                self._amp_obs_buf[env_ids, i + 1] = self._amp_obs_buf[env_ids, i]
+    def _update_hist_amp_obs(self):
+        self._amp_obs_hist.advance()
         return
 
     def _compute_amp_observations(self, env_ids=None):
         key_body_pos = self._rigid_body_pos[:, self._key_body_ids, :]
         if env_ids is None:
-            self._curr_amp_obs_buf[:] = build_amp_observations(
-                self._root_states,
-                self._dof_pos,
-                self._dof_vel,
-                key_body_pos,
-                self._local_root_obs,
+            self._amp_obs_hist.set_current(
+                build_amp_observations(
+                    self._root_states,
+                    self._dof_obs_layout.compute(self._dof_pos),
+                    self._dof_vel,
+                    key_body_pos,
+                    self._local_root_obs,
+                )
             )
         else:
-            self._curr_amp_obs_buf[env_ids] = build_amp_observations(
-                self._root_states[env_ids],
-                self._dof_pos[env_ids],
-                self._dof_vel[env_ids],
-                key_body_pos[env_ids],
-                self._local_root_obs,
+            self._amp_obs_hist.set_current(
+                build_amp_observations(
+                    self._root_states[env_ids],
+                    self._dof_obs_layout.compute(self._dof_pos[env_ids]),
+                    self._dof_vel[env_ids],
+                    key_body_pos[env_ids],
+                    self._local_root_obs,
+                ),
+                env_ids,
             )
         return
 
@@ -417,7 +427,7 @@ class HumanoidAMP(HumanoidAMPBase):
 
 
 @torch.jit.script
-def build_amp_observations(root_states, dof_pos, dof_vel, key_body_pos, local_root_obs):
+def build_amp_observations(root_states, dof_obs, dof_vel, key_body_pos, local_root_obs):
     # type: (Tensor, Tensor, Tensor, Tensor, bool) -> Tensor
     root_pos = root_states[:, 0:3]
     root_rot = root_states[:, 3:7]
@@ -455,8 +465,6 @@ def build_amp_observations(root_states, dof_pos, dof_vel, key_body_pos, local_ro
         local_key_body_pos.shape[1] * local_key_body_pos.shape[2],
     )
 
-    dof_obs = dof_to_obs(dof_pos)
-
     obs = torch.cat(
         (
             root_h,
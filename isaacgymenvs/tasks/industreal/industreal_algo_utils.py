@@ -33,12 +33,18 @@ Contains functions that implement Simulation-Aware Policy Update (SAPU), SDF-Bas
 Not intended to be executed as a standalone script.
 """
 
+import hashlib
+from isaacgym import torch_utils
 import numpy as np
+import os
 from pysdf import SDF
+import shutil
+import tempfile
 import torch
 import trimesh
 from urdfpy import URDF
 import warp as wp
+from xml.etree import ElementTree
 
 
 """
@@ -46,27 +52,98 @@ Simulation-Aware Policy Update (SAPU)
 """
 
 
-def load_asset_mesh_in_warp(urdf_path, sample_points, num_samples, device):
-    """Create mesh object in Warp."""
+# Version of on-disk mesh cache format; bump when contents of cache entries change
+MESH_CACHE_VERSION = 1
+
+
+def get_asset_mesh_cache_key(urdf_path, num_samples):
+    """Get key of on-disk mesh cache entry from contents of URDF, its collision mesh files, and sample count."""
+
+    key = hashlib.sha1()
+    key.update(f"v{MESH_CACHE_VERSION}_{num_samples}".encode())
+    with open(urdf_path, "rb") as f:
+        key.update(f.read())
+
+    # Hash referenced collision meshes, so that editing a mesh invalidates the entry
+    urdf_dir = os.path.dirname(urdf_path)
+    for mesh in ElementTree.parse(urdf_path).getroot().iter("mesh"):
+        mesh_path = os.path.join(urdf_dir, mesh.get("filename", ""))
+        if os.path.isfile(mesh_path):
+            with open(mesh_path, "rb") as f:
+                key.update(f.read())
+
+    return key.hexdigest()
+
+
+def load_asset_mesh_arrays(urdf_path, sample_points, num_samples, cache_dir=None):
+    """Get vertices, faces, and (if desired) sampled surface points of collision mesh, using on-disk cache if given."""
+
+    names = ["vertices", "faces"]
+    if sample_points:
+        names.append("sampled_points")
+
+    if cache_dir is not None:
+        cache_key = get_asset_mesh_cache_key(
+            urdf_path=urdf_path, num_samples=num_samples if sample_points else -1
+        )
+        cache_path = os.path.join(cache_dir, cache_key)
+        if os.path.isdir(cache_path):
+            return [
+                np.load(os.path.join(cache_path, f"{name}.npy"), mmap_mode="r")
+                for name in names
+            ]
 
     urdf = URDF.load(urdf_path)
     mesh = urdf.links[0].collision_mesh
+    arrays = [mesh.vertices, mesh.faces]
+
+    if sample_points:
+        # Sample points on surface of mesh
+        sampled_points, _ = trimesh.sample.sample_surface_even(mesh, num_samples)
+        arrays.append(sampled_points)
+
+    if cache_dir is not None:
+        # Write to temporary directory and rename, so that concurrent processes never read partial entries
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = tempfile.mkdtemp(dir=cache_dir)
+        for name, array in zip(names, arrays):
+            np.save(os.path.join(tmp_path, f"{name}.npy"), array)
+        try:
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            # Another process already wrote this entry
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    return arrays
+
+
+def load_asset_mesh_in_warp(
+    urdf_path, sample_points, num_samples, device, cache_dir=None
+):
+    """Create mesh object in Warp."""
+
+    arrays = load_asset_mesh_arrays(
+        urdf_path=urdf_path,
+        sample_points=sample_points,
+        num_samples=num_samples,
+        cache_dir=cache_dir,
+    )
 
     wp_mesh = wp.Mesh(
-        points=wp.array(mesh.vertices, dtype=wp.vec3, device=device),
-        indices=wp.array(mesh.faces.flatten(), dtype=wp.int32, device=device),
+        points=wp.array(arrays[0], dtype=wp.vec3, device=device),
+        indices=wp.array(np.ravel(arrays[1]), dtype=wp.int32, device=device),
     )
 
     if sample_points:
-        # Sample points on surface of mesh
-        sampled_points, _ = trimesh.sample.sample_surface_even(mesh, num_samples)
-        wp_mesh_sampled_points = wp.array(sampled_points, dtype=wp.vec3, device=device)
+        wp_mesh_sampled_points = wp.array(arrays[2], dtype=wp.vec3, device=device)
         return wp_mesh, wp_mesh_sampled_points
     else:
         return wp_mesh
 
 
-def load_asset_meshes_in_warp(plug_files, socket_files, num_samples, device):
+def load_asset_meshes_in_warp(
+    plug_files, socket_files, num_samples, device, cache_dir=None
+):
     """Create mesh objects in Warp for all environments."""
 
     # Load and store plug meshes and (if desired) sampled points
@@ -77,6 +154,7 @@ def load_asset_meshes_in_warp(plug_files, socket_files, num_samples, device):
             sample_points=True,
             num_samples=num_samples,
             device=device,
+            cache_dir=cache_dir,
         )
         plug_meshes.append(plug_mesh)
         plug_meshes_sampled_points.append(sampled_points)
@@ -88,6 +166,7 @@ def load_asset_meshes_in_warp(plug_files, socket_files, num_samples, device):
             sample_points=False,
             num_samples=-1,
             device=device,
+            cache_dir=cache_dir,
         )
         for i in range(len(socket_files))
     ]
@@ -155,6 +234,79 @@ def get_max_interpen_dists(
     return max_interpen_dists
 
 
+def pack_interpen_query(
+    asset_indices, wp_plug_meshes_sampled_points, wp_socket_meshes, wp_device
+):
+    """Pack sampled points and mesh IDs of all assets into shared arrays for batched interpenetration queries."""
+
+    num_assets = len(wp_plug_meshes_sampled_points)
+    num_points = [len(points) for points in wp_plug_meshes_sampled_points]
+    max_num_points = max(num_points)
+
+    # Pad sampled points of each asset to a common length; padded entries are skipped by kernel
+    padded_points = np.zeros((num_assets, max_num_points, 3), dtype=np.float32)
+    for i in range(num_assets):
+        padded_points[i, : num_points[i]] = wp_plug_meshes_sampled_points[i].numpy()
+
+    return {
+        "points": wp.array(padded_points, dtype=wp.vec3, device=wp_device),
+        "num_points": wp.array(num_points, dtype=wp.int32, device=wp_device),
+        "mesh_ids": wp.array(
+            [mesh.id for mesh in wp_socket_meshes], dtype=wp.uint64, device=wp_device
+        ),
+        "asset_indices": wp.array(asset_indices, dtype=wp.int32, device=wp_device),
+        "interpen_dists": wp.zeros(
+            (len(asset_indices), max_num_points), dtype=wp.float32, device=wp_device
+        ),
+    }
+
+
+def get_max_interpen_dists_batched(
+    plug_pos, plug_quat, socket_pos, socket_quat, wp_interpen_query, wp_device, device
+):
+    """Get maximum interpenetration distances between plugs and sockets with a single kernel launch over all environments."""
+
+    wp_torch_device = wp.device_to_torch(wp_device)
+    interpen_dists = wp_interpen_query["interpen_dists"]
+    interpen_dists.zero_()
+
+    wp.launch(
+        kernel=get_interpen_dist_batched,
+        dim=interpen_dists.shape,
+        inputs=[
+            wp_interpen_query["points"],
+            wp_interpen_query["num_points"],
+            wp_interpen_query["mesh_ids"],
+            wp_interpen_query["asset_indices"],
+            wp.from_torch(
+                plug_pos.to(wp_torch_device, torch.float32).contiguous(),
+                dtype=wp.vec3,
+            ),
+            wp.from_torch(
+                plug_quat.to(wp_torch_device, torch.float32).contiguous(),
+                dtype=wp.quat,
+            ),
+            wp.from_torch(
+                socket_pos.to(wp_torch_device, torch.float32).contiguous(),
+                dtype=wp.vec3,
+            ),
+            wp.from_torch(
+                socket_quat.to(wp_torch_device, torch.float32).contiguous(),
+                dtype=wp.quat,
+            ),
+            interpen_dists,
+        ],
+        device=wp_device,
+    )
+
+    # Only negative (i.e., interpenetrating) distances are written, so clamping matches per-env version
+    max_interpen_dists = torch.clamp(
+        -torch.min(wp.to_torch(interpen_dists), dim=1).values, min=0.0
+    )
+
+    return max_interpen_dists.to(device)
+
+
 def get_sapu_reward_scale(
     asset_indices,
     plug_pos,
@@ -166,21 +318,33 @@ def get_sapu_reward_scale(
     interpen_thresh,
     wp_device,
     device,
+    wp_interpen_query=None,
 ):
     """Compute reward scale for SAPU."""
 
     # Get max interpenetration distances
-    max_interpen_dists = get_max_interpen_dists(
-        asset_indices=asset_indices,
-        plug_pos=plug_pos,
-        plug_quat=plug_quat,
-        socket_pos=socket_pos,
-        socket_quat=socket_quat,
-        wp_plug_meshes_sampled_points=wp_plug_meshes_sampled_points,
-        wp_socket_meshes=wp_socket_meshes,
-        wp_device=wp_device,
-        device=device,
-    )
+    if wp_interpen_query is not None:
+        max_interpen_dists = get_max_interpen_dists_batched(
+            plug_pos=plug_pos,
+            plug_quat=plug_quat,
+            socket_pos=socket_pos,
+            socket_quat=socket_quat,
+            wp_interpen_query=wp_interpen_query,
+            wp_device=wp_device,
+            device=device,
+        )
+    else:
+        max_interpen_dists = get_max_interpen_dists(
+            asset_indices=asset_indices,
+            plug_pos=plug_pos,
+            plug_quat=plug_quat,
+            socket_pos=socket_pos,
+            socket_quat=socket_quat,
+            wp_plug_meshes_sampled_points=wp_plug_meshes_sampled_points,
+            wp_socket_meshes=wp_socket_meshes,
+            wp_device=wp_device,
+            device=device,
+        )
 
     # Determine if envs have low interpenetration or high interpenetration
     low_interpen_envs = torch.nonzero(max_interpen_dists <= interpen_thresh)
@@ -199,39 +363,51 @@ SDF-Based Reward
 """
 
 
-def get_plug_goal_sdfs(
-    wp_plug_meshes, asset_indices, socket_pos, socket_quat, wp_device
-):
-    """Get SDFs of plug meshes at goal pose."""
+# Canonical-frame SDFs of plug meshes, keyed by mesh hash and shared across envs and resets
+_canonical_plug_sdfs = {}
 
-    num_envs = len(socket_pos)
-    plug_goal_sdfs = []
 
-    for i in range(num_envs):
-        # Create copy of plug mesh
-        mesh = wp_plug_meshes[asset_indices[i]]
-        mesh_points = wp.clone(mesh.points)
-        mesh_indices = wp.clone(mesh.indices)
-        mesh_copy = wp.Mesh(points=mesh_points, indices=mesh_indices)
-
-        # Transform plug mesh from current pose to goal pose
-        # NOTE: In source OBJ files, when plug and socket are assembled,
-        # their poses are identical
-        goal_transform = wp.transform(socket_pos[i], socket_quat[i])
-        wp.launch(
-            kernel=transform_points,
-            dim=len(mesh_copy.points),
-            inputs=[mesh_copy.points, mesh_copy.points, goal_transform],
-            device=wp_device,
-        )
+def get_mesh_hash(wp_mesh):
+    """Get hash of vertices and faces of mesh object in Warp."""
+
+    mesh_hash = hashlib.sha1()
+    mesh_hash.update(wp_mesh.points.numpy().tobytes())
+    mesh_hash.update(wp_mesh.indices.numpy().tobytes())
+
+    return mesh_hash.hexdigest()
+
 
-        # Rebuild BVH (see https://nvidia.github.io/warp/_build/html/modules/runtime.html#meshes)
-        mesh_copy.refit()
+def get_canonical_plug_sdfs(wp_plug_meshes):
+    """Get SDFs of plug meshes in canonical (i.e., asset) frame, building each distinct mesh only once."""
 
-        # Create SDF from transformed mesh
-        sdf = SDF(mesh_copy.points.numpy(), mesh_copy.indices.numpy().reshape(-1, 3))
+    plug_sdfs = []
+    for mesh in wp_plug_meshes:
+        mesh_hash = get_mesh_hash(mesh)
+        if mesh_hash not in _canonical_plug_sdfs:
+            _canonical_plug_sdfs[mesh_hash] = SDF(
+                mesh.points.numpy(), mesh.indices.numpy().reshape(-1, 3)
+            )
+        plug_sdfs.append(_canonical_plug_sdfs[mesh_hash])
 
-        plug_goal_sdfs.append(sdf)
+    return plug_sdfs
+
+
+def get_plug_goal_sdfs(
+    wp_plug_meshes, asset_indices, socket_pos, socket_quat, wp_device
+):
+    """Get SDFs of plug meshes at goal pose.
+
+    Rather than rebuilding an SDF from the transformed plug mesh of each env, SDFs are shared per asset in
+    canonical frame, and the goal pose of each env is stored so that query points can be transformed into it.
+    """
+
+    # NOTE: In source OBJ files, when plug and socket are assembled,
+    # their poses are identical
+    plug_goal_sdfs = {
+        "sdfs": get_canonical_plug_sdfs(wp_plug_meshes),
+        "goal_pos": socket_pos.clone(),
+        "goal_quat": socket_quat.clone(),
+    }
 
     return plug_goal_sdfs
 
@@ -254,17 +430,25 @@ def get_sdf_reward(
         # Create copy of sampled points
         sampled_points = wp.clone(wp_plug_meshes_sampled_points[asset_indices[i]])
 
-        # Transform sampled points from original plug pose to current plug pose
+        # Transform sampled points from original plug pose to current plug pose,
+        # then from goal pose to canonical frame of plug SDF
         curr_transform = wp.transform(plug_pos[i], plug_quat[i])
+        goal_transform = wp.transform(
+            plug_goal_sdfs["goal_pos"][i], plug_goal_sdfs["goal_quat"][i]
+        )
+        curr_to_canonical_transform = wp.transform_multiply(
+            wp.transform_inverse(goal_transform), curr_transform
+        )
         wp.launch(
             kernel=transform_points,
             dim=len(sampled_points),
-            inputs=[sampled_points, sampled_points, curr_transform],
+            inputs=[sampled_points, sampled_points, curr_to_canonical_transform],
             device=wp_device,
         )
 
         # Get SDF values at transformed points
-        sdf_dists = torch.from_numpy(plug_goal_sdfs[i](sampled_points.numpy())).double()
+        sdf = plug_goal_sdfs["sdfs"][asset_indices[i]]
+        sdf_dists = torch.from_numpy(sdf(sampled_points.numpy())).double()
 
         # Clamp values outside isosurface and take absolute value
         sdf_dists = torch.abs(torch.where(sdf_dists > 0.0, 0.0, sdf_dists))
@@ -276,6 +460,60 @@ def get_sdf_reward(
     return sdf_reward
 
 
+def get_sdf_reward_batched(
+    wp_plug_meshes_sampled_points,
+    asset_indices,
+    plug_pos,
+    plug_quat,
+    plug_goal_sdfs,
+    device,
+):
+    """Calculate SDF-based reward with one batched transform and SDF query per plug asset, rather than per env."""
+
+    num_envs = len(plug_pos)
+    sdf_reward = torch.zeros((num_envs,), dtype=torch.float32, device=device)
+
+    # Get transforms from current plug pose to canonical frame of plug SDF for all envs
+    goal_inv_quat, goal_inv_pos = torch_utils.tf_inverse(
+        plug_goal_sdfs["goal_quat"], plug_goal_sdfs["goal_pos"]
+    )
+    curr_to_canonical_quat, curr_to_canonical_pos = torch_utils.tf_combine(
+        goal_inv_quat, goal_inv_pos, plug_quat, plug_pos
+    )
+
+    asset_indices = torch.as_tensor(asset_indices, device=device)
+    for asset_idx in torch.unique(asset_indices).tolist():
+        env_ids = torch.nonzero(asset_indices == asset_idx).squeeze(-1)
+        sampled_points = wp.to_torch(wp_plug_meshes_sampled_points[asset_idx]).to(
+            device
+        )
+        num_points = len(sampled_points)
+
+        # Transform sampled points of all envs with this asset to canonical frame of plug SDF
+        canonical_points = torch_utils.tf_apply(
+            curr_to_canonical_quat[env_ids].unsqueeze(1).expand(-1, num_points, 4),
+            curr_to_canonical_pos[env_ids].unsqueeze(1).expand(-1, num_points, 3),
+            sampled_points.unsqueeze(0).expand(len(env_ids), -1, -1),
+        )
+
+        # Get SDF values at transformed points
+        sdf = plug_goal_sdfs["sdfs"][asset_idx]
+        sdf_dists = (
+            torch.from_numpy(sdf(canonical_points.reshape(-1, 3).cpu().numpy()))
+            .double()
+            .reshape(len(env_ids), num_points)
+        )
+
+        # Clamp values outside isosurface and take absolute value
+        sdf_dists = torch.abs(torch.where(sdf_dists > 0.0, 0.0, sdf_dists))
+
+        sdf_reward[env_ids] = torch.mean(sdf_dists, dim=1).to(device, torch.float32)
+
+    sdf_reward = -torch.log(sdf_reward)
+
+    return sdf_reward
+
+
 """
 Sampling-Based Curriculum (SBC)
 """
@@ -560,3 +798,66 @@ def get_interpen_dist(
         if signed_dist < 0.0:
             # Store interpenetration distance
             interpen_dists[tid] = signed_dist
+
+
+# Return interpenetration distances between query points and mesh surfaces for all environments at once,
+# where each thread transforms one sampled plug point of one environment to the socket frame and queries the socket mesh
+@wp.kernel
+def get_interpen_dist_batched(
+    queries: wp.array2d(dtype=wp.vec3),
+    num_queries: wp.array(dtype=wp.int32),
+    meshes: wp.array(dtype=wp.uint64),
+    asset_indices: wp.array(dtype=wp.int32),
+    plug_pos: wp.array(dtype=wp.vec3),
+    plug_quat: wp.array(dtype=wp.quat),
+    socket_pos: wp.array(dtype=wp.vec3),
+    socket_quat: wp.array(dtype=wp.quat),
+    interpen_dists: wp.array2d(dtype=wp.float32),
+):
+    env_idx, tid = wp.tid()
+
+    # Skip padded query points
+    asset_idx = asset_indices[env_idx]
+    if tid >= num_queries[asset_idx]:
+        return
+
+    # Compute transform from plug frame to socket frame
+    plug_transform = wp.transform(plug_pos[env_idx], plug_quat[env_idx])
+    socket_transform = wp.transform(socket_pos[env_idx], socket_quat[env_idx])
+    plug_to_socket_transform = wp.transform_multiply(
+        plug_transform, wp.transform_inverse(socket_transform)
+    )
+
+    # Declare arguments to wp.mesh_query_point() that will not be modified
+    q = wp.transform_point(
+        plug_to_socket_transform, queries[asset_idx, tid]
+    )  # query point
+    mesh = meshes[asset_idx]
+    max_dist = 1.5  # max distance on mesh from query point
+
+    # Declare arguments to wp.mesh_query_point() that will be modified
+    sign = float(
+        0.0
+    )  # -1 if query point inside mesh; 0 if on mesh; +1 if outside mesh (NOTE: Mesh must be watertight!)
+    face_idx = int(0)  # index of closest face
+    face_u = float(0.0)  # barycentric u-coordinate of closest point
+    face_v = float(0.0)  # barycentric v-coordinate of closest point
+
+    # Get closest point on mesh to query point
+    closest_mesh_point_exists = wp.mesh_query_point(
+        mesh, q, max_dist, sign, face_idx, face_u, face_v
+    )
+
+    # If point exists within max_dist
+    if closest_mesh_point_exists:
+        # Get 3D position of point on mesh given face index and barycentric coordinates
+        p = wp.mesh_eval_position(mesh, face_idx, face_u, face_v)
+
+        # Get signed distance between query point and mesh point
+        delta = q - p
+        signed_dist = sign * wp.length(delta)
+
+        # If signed distance is negative
+        if signed_dist < 0.0:
+            # Store interpenetration distance
+            interpen_dists[env_idx, tid] = signed_dist
@@ -94,6 +94,17 @@ class IndustRealTaskGearsInsert(IndustRealEnvGears, FactoryABCTask):
             socket_files=self.shaft_files,
             num_samples=self.cfg_task.rl.sdf_reward_num_samples,
             device=self.wp_device,
+            cache_dir=os.path.expanduser(self.cfg_task.rl.mesh_cache_dir)
+            if self.cfg_task.rl.mesh_cache
+            else None,
+        )
+
+        # Pack Warp mesh objects for batched SAPU interpenetration queries
+        self.wp_interpen_query = algo_utils.pack_interpen_query(
+            asset_indices=self.asset_indices,
+            wp_plug_meshes_sampled_points=self.wp_gear_meshes_sampled_points,
+            wp_socket_meshes=self.wp_shaft_meshes,
+            wp_device=self.wp_device,
         )
 
         if self.viewer != None:
@@ -359,13 +370,12 @@ class IndustRealTaskGearsInsert(IndustRealEnvGears, FactoryABCTask):
         self.prev_rew_buf = self.rew_buf.clone()
 
         # SDF-Based Reward: Compute reward based on SDF distance
-        sdf_reward = algo_utils.get_sdf_reward(
+        sdf_reward = algo_utils.get_sdf_reward_batched(
             wp_plug_meshes_sampled_points=self.wp_gear_meshes_sampled_points,
             asset_indices=self.asset_indices,
             plug_pos=self.gear_medium_pos,
             plug_quat=self.gear_medium_quat,
             plug_goal_sdfs=self.gear_goal_sdfs,
-            wp_device=self.wp_device,
             device=self.device,
         )
 
@@ -391,6 +401,7 @@ class IndustRealTaskGearsInsert(IndustRealEnvGears, FactoryABCTask):
             interpen_thresh=self.cfg_task.rl.interpen_thresh,
             wp_device=self.wp_device,
             device=self.device,
+            wp_interpen_query=self.wp_interpen_query,
         )
 
         # SAPU: For envs with low interpenetration, apply reward scale ("weight" step)
@@ -0,0 +1,192 @@
+# Copyright (c) 2018-2023, NVIDIA Corporation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""IndustReal: tests for batched SAPU and SDF-based reward against the per-env reference implementations.
+
+Run on the Warp CPU device, so no GPU is required.
+"""
+
+import pytest
+
+pytest.importorskip("isaacgym")
+pytest.importorskip("pysdf")
+pytest.importorskip("warp")
+
+import isaacgymenvs.tasks.industreal.industreal_algo_utils as algo_utils
+import numpy as np
+import torch
+import trimesh
+import warp as wp
+
+
+WP_DEVICE = "cpu"
+DEVICE = "cpu"
+NUM_ENVS = 64
+
+
+@pytest.fixture(scope="module")
+def wp_assets():
+    """Two plug/socket pairs of different shapes and sample counts, so batched queries need padding."""
+
+    wp.init()
+    rng = np.random.default_rng(0)
+
+    plug_meshes = [
+        trimesh.creation.box(extents=(0.02, 0.02, 0.04)),
+        trimesh.creation.cylinder(radius=0.01, height=0.03, sections=16),
+    ]
+    socket_meshes = [
+        trimesh.creation.box(extents=(0.04, 0.04, 0.02)),
+        trimesh.creation.cylinder(radius=0.015, height=0.02, sections=16),
+    ]
+    num_samples = [300, 500]
+
+    wp_plug_meshes, wp_plug_meshes_sampled_points, wp_socket_meshes = [], [], []
+    for plug_mesh, socket_mesh, n in zip(plug_meshes, socket_meshes, num_samples):
+        wp_plug_meshes.append(
+            wp.Mesh(
+                points=wp.array(plug_mesh.vertices, dtype=wp.vec3, device=WP_DEVICE),
+                indices=wp.array(
+                    plug_mesh.faces.flatten(), dtype=wp.int32, device=WP_DEVICE
+                ),
+            )
+        )
+        sampled_points, _ = trimesh.sample.sample_surface_even(
+            plug_mesh, n, seed=int(rng.integers(1 << 31))
+        )
+        wp_plug_meshes_sampled_points.append(
+            wp.array(sampled_points, dtype=wp.vec3, device=WP_DEVICE)
+        )
+        wp_socket_meshes.append(
+            wp.Mesh(
+                points=wp.array(socket_mesh.vertices, dtype=wp.vec3, device=WP_DEVICE),
+                indices=wp.array(
+                    socket_mesh.faces.flatten(), dtype=wp.int32, device=WP_DEVICE
+                ),
+            )
+        )
+
+    return wp_plug_meshes, wp_plug_meshes_sampled_points, wp_socket_meshes
+
+
+def random_poses(generator, num_envs, pos_noise):
+    """Random socket poses, and plug poses close enough to the sockets to interpenetrate in some envs."""
+
+    socket_pos = 0.02 * (torch.rand((num_envs, 3), generator=generator) - 0.5)
+    socket_quat = torch.nn.functional.normalize(
+        torch.randn((num_envs, 4), generator=generator), dim=-1
+    )
+    plug_pos = socket_pos + pos_noise * (
+        torch.rand((num_envs, 3), generator=generator) - 0.5
+    )
+    plug_quat = torch.nn.functional.normalize(
+        socket_quat + 0.2 * torch.randn((num_envs, 4), generator=generator), dim=-1
+    )
+
+    return plug_pos, plug_quat, socket_pos, socket_quat
+
+
+def test_max_interpen_dists_batched_matches_per_env(wp_assets):
+    _, wp_plug_meshes_sampled_points, wp_socket_meshes = wp_assets
+
+    generator = torch.Generator().manual_seed(0)
+    asset_indices = torch.randint(0, 2, (NUM_ENVS,), generator=generator).tolist()
+    plug_pos, plug_quat, socket_pos, socket_quat = random_poses(
+        generator, NUM_ENVS, pos_noise=0.06
+    )
+
+    expected = algo_utils.get_max_interpen_dists(
+        asset_indices=asset_indices,
+        plug_pos=plug_pos,
+        plug_quat=plug_quat,
+        socket_pos=socket_pos,
+        socket_quat=socket_quat,
+        wp_plug_meshes_sampled_points=wp_plug_meshes_sampled_points,
+        wp_socket_meshes=wp_socket_meshes,
+        wp_device=WP_DEVICE,
+        device=DEVICE,
+    )
+
+    wp_interpen_query = algo_utils.pack_interpen_query(
+        asset_indices=asset_indices,
+        wp_plug_meshes_sampled_points=wp_plug_meshes_sampled_points,
+        wp_socket_meshes=wp_socket_meshes,
+        wp_device=WP_DEVICE,
+    )
+    actual = algo_utils.get_max_interpen_dists_batched(
+        plug_pos=plug_pos,
+        plug_quat=plug_quat,
+        socket_pos=socket_pos,
+        socket_quat=socket_quat,
+        wp_interpen_query=wp_interpen_query,
+        wp_device=WP_DEVICE,
+        device=DEVICE,
+    )
+
+    # Both interpenetrating and separated envs must be covered
+    assert (expected > 0.0).any() and (expected == 0.0).any()
+    torch.testing.assert_close(actual, expected, rtol=0.0, atol=1e-6)
+
+
+def test_sdf_reward_batched_matches_per_env(wp_assets):
+    wp_plug_meshes, wp_plug_meshes_sampled_points, _ = wp_assets
+
+    generator = torch.Generator().manual_seed(1)
+    asset_indices = torch.randint(0, 2, (NUM_ENVS,), generator=generator).tolist()
+    plug_pos, plug_quat, goal_pos, goal_quat = random_poses(
+        generator, NUM_ENVS, pos_noise=0.01
+    )
+
+    plug_goal_sdfs = algo_utils.get_plug_goal_sdfs(
+        wp_plug_meshes=wp_plug_meshes,
+        asset_indices=asset_indices,
+        socket_pos=goal_pos,
+        socket_quat=goal_quat,
+        wp_device=WP_DEVICE,
+    )
+
+    expected = algo_utils.get_sdf_reward(
+        wp_plug_meshes_sampled_points=wp_plug_meshes_sampled_points,
+        asset_indices=asset_indices,
+        plug_pos=plug_pos,
+        plug_quat=plug_quat,
+        plug_goal_sdfs=plug_goal_sdfs,
+        wp_device=WP_DEVICE,
+        device=DEVICE,
+    )
+    actual = algo_utils.get_sdf_reward_batched(
+        wp_plug_meshes_sampled_points=wp_plug_meshes_sampled_points,
+        asset_indices=asset_indices,
+        plug_pos=plug_pos,
+        plug_quat=plug_quat,
+        plug_goal_sdfs=plug_goal_sdfs,
+        device=DEVICE,
+    )
+
+    assert torch.isfinite(expected).all()
+    torch.testing.assert_close(actual, expected, rtol=1e-4, atol=1e-4)
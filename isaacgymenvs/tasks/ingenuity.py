@@ -66,6 +66,7 @@ class Ingenuity(VecTask):
         vec_root_tensor = gymtorch.wrap_tensor(self.root_tensor).view(self.num_envs, 2, 13)
         vec_dof_tensor = gymtorch.wrap_tensor(self.dof_state_tensor).view(self.num_envs, dofs_per_env, 2)
 
+        self.vec_root_tensor = vec_root_tensor
         self.root_states = vec_root_tensor[:, 0, :]
         self.root_positions = self.root_states[:, 0:3]
         self.target_root_positions = torch.zeros((self.num_envs, 3), device=self.device, dtype=torch.float32)
@@ -311,7 +312,7 @@ class Ingenuity(VecTask):
         self.root_states[env_ids, 1] += torch_rand_float(-1.5, 1.5, (num_resets, 1), self.device).flatten()
         self.root_states[env_ids, 2] += torch_rand_float(-0.2, 1.5, (num_resets, 1), self.device).flatten()
 
-        self.gym.set_dof_state_tensor_indexed(self.sim, self.dof_state_tensor, gymtorch.unwrap_tensor(actor_indices), num_resets)
+        self.defer_set_dof_state_tensor_indexed(self.dof_states, actor_indices)
 
         self.reset_buf[env_ids] = 0
         self.progress_buf[env_ids] = 0
@@ -331,9 +332,9 @@ class Ingenuity(VecTask):
         if len(reset_env_ids) > 0:
             actor_indices = self.reset_idx(reset_env_ids)
 
-        reset_indices = torch.unique(torch.cat([target_actor_indices, actor_indices]))
+        reset_indices = torch.cat([target_actor_indices, actor_indices])
         if len(reset_indices) > 0:
-            self.gym.set_actor_root_state_tensor_indexed(self.sim, self.root_tensor, gymtorch.unwrap_tensor(reset_indices), len(reset_indices))
+            self.defer_set_actor_root_state_tensor_indexed(self.vec_root_tensor, reset_indices)
 
         actions = _actions.to(self.device)
 
@@ -289,11 +289,11 @@ class Quadcopter(VecTask):
         self.root_states[env_ids, 0] += torch_rand_float(-1.5, 1.5, (num_resets, 1), self.device).flatten()
         self.root_states[env_ids, 1] += torch_rand_float(-1.5, 1.5, (num_resets, 1), self.device).flatten()
         self.root_states[env_ids, 2] += torch_rand_float(-0.2, 1.5, (num_resets, 1), self.device).flatten()
-        self.gym.set_actor_root_state_tensor_indexed(self.sim, self.root_tensor, gymtorch.unwrap_tensor(actor_indices), num_resets)
+        self.defer_set_actor_root_state_tensor_indexed(self.root_states, actor_indices)
 
         self.dof_positions[env_ids] = torch_rand_float(-0.2, 0.2, (num_resets, 8), self.device)
         self.dof_velocities[env_ids] = 0.0
-        self.gym.set_dof_state_tensor_indexed(self.sim, self.dof_state_tensor, gymtorch.unwrap_tensor(actor_indices), num_resets)
+        self.defer_set_dof_state_tensor_indexed(self.dof_states, actor_indices)
 
         self.reset_buf[env_ids] = 0
         self.progress_buf[env_ids] = 0
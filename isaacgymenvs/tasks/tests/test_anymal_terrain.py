@@ -0,0 +1,65 @@
+# Copyright (c) 2018-2023, NVIDIA Corporation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import numpy as np
+import pytest
+
+pytest.importorskip("isaacgym")
+
+from isaacgymenvs.tasks.anymal_terrain import Terrain  # noqa: E402
+
+
+def terrain_cfg(curriculum, workers):
+    return {
+        "terrainType": "trimesh",
+        "curriculum": curriculum,
+        "mapLength": 8.,
+        "mapWidth": 8.,
+        "numLevels": 3,
+        "numTerrains": 4,
+        "terrainProportions": [0.1, 0.1, 0.35, 0.25, 0.2],
+        "slopeTreshold": 0.5,
+        "generationWorkers": workers,
+    }
+
+
+@pytest.mark.parametrize("curriculum", [True, False], ids=["curriculum", "randomized"])
+def test_terrain_does_not_depend_on_generation_workers(curriculum):
+    terrains = []
+    rng_states = []
+    for workers in (1, 3):
+        np.random.seed(42)
+        terrains.append(Terrain(terrain_cfg(curriculum, workers), num_robots=24))
+        rng_states.append(np.random.get_state())
+
+    serial, parallel = terrains
+    np.testing.assert_array_equal(serial.height_field_raw, parallel.height_field_raw)
+    np.testing.assert_array_equal(serial.env_origins, parallel.env_origins)
+    # the rest of the run draws the same numbers
+    np.testing.assert_array_equal(rng_states[0][1], rng_states[1][1])
+    assert rng_states[0][2:] == rng_states[1][2:]
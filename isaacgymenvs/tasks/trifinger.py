@@ -821,14 +821,12 @@ class Trifinger(VecTask):
         robot_indices = self.gym_indices["robot"][env_ids].to(torch.int32)
         object_indices = self.gym_indices["object"][env_ids].to(torch.int32)
         goal_object_indices = self.gym_indices["goal_object"][env_ids].to(torch.int32)
-        all_indices = torch.unique(torch.cat([robot_indices, object_indices, goal_object_indices]))
-        # D) Set values into simulator
+        all_indices = torch.cat([robot_indices, object_indices, goal_object_indices])
+        # D) Set values into simulator, written right before the next physics step
         # -- DOF
-        self.gym.set_dof_state_tensor_indexed(self.sim, gymtorch.unwrap_tensor(self._dof_state),
-                                               gymtorch.unwrap_tensor(robot_indices), len(robot_indices))
+        self.defer_set_dof_state_tensor_indexed(self._dof_state, robot_indices)
         # -- actor root states
-        self.gym.set_actor_root_state_tensor_indexed(self.sim, gymtorch.unwrap_tensor(self._actors_root_state),
-                                                      gymtorch.unwrap_tensor(all_indices), len(all_indices))
+        self.defer_set_actor_root_state_tensor_indexed(self._actors_root_state, all_indices)
 
     def _sample_robot_state(self, instances: torch.Tensor, distribution: str = 'default',
                              dof_pos_stddev: float = 0.0, dof_vel_stddev: float = 0.0):
@@ -995,7 +993,6 @@ class Trifinger(VecTask):
 
         if len(env_ids) > 0:
             self.reset_idx(env_ids)
-            self.gym.simulate(self.sim)
 
         self.actions = actions.clone().to(self.device)
 
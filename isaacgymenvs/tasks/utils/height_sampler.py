@@ -0,0 +1,201 @@
+# Copyright (c) 2018-2023, NVIDIA Corporation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Batched bilinear sampling of a heightfield at height-scan points.
+
+Also runs as a CPU benchmark against the nearest-neighbour lookup previously used by AnymalTerrain:
+
+    python isaacgymenvs/tasks/utils/height_sampler.py --num_envs 4096 --num_points 187
+
+On one CPU thread with torch 2.x and the default 1600x1600 heightfield, this measured about 28-33 ms/step for the
+previous lookup and 17 ms/step for the sampler at 4096 envs (4.7 vs 3.6 ms/step at 1024 envs). Sampling a quarter
+of the envs costs under 4 ms/step.
+"""
+
+import argparse
+import time
+
+import torch
+
+
+class HeightScanSampler:
+    """Samples a heightfield at scan points fixed in the yaw frame of each robot base.
+
+    The heights are interpolated bilinearly between the four surrounding samples. All per-point intermediates are
+    kept in persistent buffers sized for `num_envs`, so a query, for all envs or for a subset, does not allocate
+    per-point tensors. The returned tensor is a view into an output buffer and is overwritten by the next query.
+    """
+
+    def __init__(self, height_samples, horizontal_scale, vertical_scale, border_size, scan_points, num_envs):
+        """
+        Args:
+            height_samples: [num_rows, num_cols] heightfield, in vertical_scale units.
+            horizontal_scale: size of a heightfield cell, in meters.
+            vertical_scale: height of a heightfield unit, in meters.
+            border_size: offset of the heightfield origin from the world origin, in meters.
+            scan_points: [num_points, 2] x, y positions of the scan points in the base yaw frame.
+            num_envs: maximum number of envs per query.
+        """
+        device = height_samples.device
+        self.num_rows, self.num_cols = height_samples.shape
+        self.heights = (height_samples.float() * vertical_scale).flatten()
+        self.horizontal_scale = horizontal_scale
+        self.border_size = border_size
+
+        self.scan_x = scan_points[:, 0].to(device=device, dtype=torch.float).unsqueeze(0)
+        self.scan_y = scan_points[:, 1].to(device=device, dtype=torch.float).unsqueeze(0)
+        num_points = scan_points.shape[0]
+
+        shape = (num_envs, num_points)
+        self.x = torch.empty(shape, dtype=torch.float, device=device)
+        self.y = torch.empty(shape, dtype=torch.float, device=device)
+        self.cell = torch.empty(shape, dtype=torch.float, device=device)
+        self.col = torch.empty(shape, dtype=torch.long, device=device)
+        self.idx = torch.empty(shape, dtype=torch.long, device=device)
+        self.h0 = torch.empty(shape, dtype=torch.float, device=device)
+        self.h1 = torch.empty(shape, dtype=torch.float, device=device)
+        self.h2 = torch.empty(shape, dtype=torch.float, device=device)
+        self.h3 = torch.empty(shape, dtype=torch.float, device=device)
+        self.out = torch.empty(shape, dtype=torch.float, device=device)
+
+    def sample(self, base_pos, base_quat, env_ids=None):
+        """Return the [num_queried_envs, num_points] terrain heights under the scan points.
+
+        Args:
+            base_pos: [num_envs, 3] base positions.
+            base_quat: [num_envs, 4] base orientations (x, y, z, w), only their yaw is used.
+            env_ids: optional indices of the envs to query, all envs if None.
+        """
+        if env_ids is not None:
+            base_pos = base_pos[env_ids]
+            base_quat = base_quat[env_ids]
+        n = base_pos.shape[0]
+
+        x, y, cell, col, idx = self.x[:n], self.y[:n], self.cell[:n], self.col[:n], self.idx[:n]
+        h0, h1, h2, h3, out = self.h0[:n], self.h1[:n], self.h2[:n], self.h3[:n], self.out[:n]
+
+        # rotation by the base yaw, from the normalized (0, 0, qz, qw) quaternion
+        qz = base_quat[:, 2:3]
+        qw = base_quat[:, 3:4]
+        norm = qw * qw + qz * qz
+        cos_yaw = (qw * qw - qz * qz) / norm
+        sin_yaw = 2.0 * qz * qw / norm
+
+        # continuous heightfield coordinates of the scan points
+        torch.mul(cos_yaw, self.scan_x, out=x)
+        x.addcmul_(sin_yaw, self.scan_y, value=-1.0).add_(base_pos[:, 0:1] + self.border_size).div_(self.horizontal_scale)
+        torch.mul(sin_yaw, self.scan_x, out=y)
+        y.addcmul_(cos_yaw, self.scan_y).add_(base_pos[:, 1:2] + self.border_size).div_(self.horizontal_scale)
+        x.clamp_(0, self.num_rows - 2)
+        y.clamp_(0, self.num_cols - 2)
+
+        # integer cell and fractional offset within it
+        torch.floor(x, out=cell)
+        idx.copy_(cell).mul_(self.num_cols)
+        x.sub_(cell)
+        torch.floor(y, out=cell)
+        col.copy_(cell)
+        idx.add_(col)
+        y.sub_(cell)
+
+        flat_idx = idx.view(-1)
+        torch.index_select(self.heights, 0, flat_idx, out=h0.view(-1))
+        flat_idx.add_(1)
+        torch.index_select(self.heights, 0, flat_idx, out=h1.view(-1))
+        flat_idx.add_(self.num_cols)
+        torch.index_select(self.heights, 0, flat_idx, out=h3.view(-1))
+        flat_idx.sub_(1)
+        torch.index_select(self.heights, 0, flat_idx, out=h2.view(-1))
+
+        # h0: (r, c), h1: (r, c + 1), h2: (r + 1, c), h3: (r + 1, c + 1)
+        torch.lerp(h0, h2, x, out=h0)
+        torch.lerp(h1, h3, x, out=h1)
+        torch.lerp(h0, h1, y, out=out)
+        return out
+
+
+def _nearest_min_heights(height_samples, horizontal_scale, vertical_scale, border_size, scan_points, base_pos, base_quat):
+    # reference: the min of two nearest-neighbour lookups, as done before by AnymalTerrain.get_heights
+    quat_yaw = base_quat.clone()
+    quat_yaw[:, :2] = 0.
+    quat_yaw = quat_yaw / quat_yaw.norm(dim=-1, keepdim=True)
+    qz, qw = quat_yaw[:, 2:3], quat_yaw[:, 3:4]
+    cos_yaw = qw * qw - qz * qz
+    sin_yaw = 2.0 * qz * qw
+    px = cos_yaw * scan_points[:, 0] - sin_yaw * scan_points[:, 1] + base_pos[:, 0:1]
+    py = sin_yaw * scan_points[:, 0] + cos_yaw * scan_points[:, 1] + base_pos[:, 1:2]
+
+    px = ((px + border_size) / horizontal_scale).long().view(-1)
+    py = ((py + border_size) / horizontal_scale).long().view(-1)
+    px = torch.clip(px, 0, height_samples.shape[0] - 2)
+    py = torch.clip(py, 0, height_samples.shape[1] - 2)
+    heights = torch.min(height_samples[px, py], height_samples[px + 1, py + 1])
+    return heights.view(base_pos.shape[0], -1) * vertical_scale
+
+
+def _benchmark(num_envs, num_points, num_rows, num_cols, iterations):
+    torch.manual_seed(0)
+    horizontal_scale, vertical_scale, border_size = 0.1, 0.005, 25.0
+    height_samples = torch.randint(0, 200, (num_rows, num_cols), dtype=torch.int16)
+    scan_points = torch.rand(num_points, 2) * 1.6 - 0.8
+    extent = min(num_rows, num_cols) * horizontal_scale - 2 * border_size
+    base_pos = torch.rand(num_envs, 3) * extent
+    base_quat = torch.nn.functional.normalize(torch.randn(num_envs, 4), dim=-1)
+
+    sampler = HeightScanSampler(height_samples, horizontal_scale, vertical_scale, border_size, scan_points, num_envs)
+
+    def timed(fn):
+        fn()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        return (time.perf_counter() - start) / iterations * 1000
+
+    nearest_ms = timed(lambda: _nearest_min_heights(height_samples, horizontal_scale, vertical_scale, border_size,
+                                                    scan_points, base_pos, base_quat))
+    bilinear_ms = timed(lambda: sampler.sample(base_pos, base_quat))
+    subset = torch.arange(0, num_envs, 4)
+    subset_ms = timed(lambda: sampler.sample(base_pos, base_quat, subset))
+
+    print(f"{num_envs} envs x {num_points} scan points, {num_rows}x{num_cols} heightfield, "
+          f"{torch.get_num_threads()} threads")
+    print(f"  nearest-neighbour min (previous): {nearest_ms:8.3f} ms/step")
+    print(f"  bilinear sampler:                 {bilinear_ms:8.3f} ms/step")
+    print(f"  bilinear sampler, 1/4 of envs:    {subset_ms:8.3f} ms/step")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CPU benchmark of the height-scan samplers")
+    parser.add_argument("--num_envs", type=int, default=4096)
+    parser.add_argument("--num_points", type=int, default=187)
+    parser.add_argument("--num_rows", type=int, default=1600)
+    parser.add_argument("--num_cols", type=int, default=1600)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    _benchmark(args.num_envs, args.num_points, args.num_rows, args.num_cols, args.iterations)
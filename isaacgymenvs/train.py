@@ -155,6 +155,14 @@ def launch_rlg_hydra(cfg: DictConfig):
             )
         return envs
 
+    if cfg.sync_audit_steps > 0:
+        from isaacgymenvs.utils.sync_audit import audit_task_syncs
+
+        audit_task_syncs(
+            create_isaacgym_env(), cfg.sync_audit_steps, cfg.sync_audit_report
+        )
+        return
+
     env_configurations.register(
         "rlgpu",
         {
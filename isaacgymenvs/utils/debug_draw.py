@@ -0,0 +1,100 @@
+# Copyright (c) 2018-2023, NVIDIA Corporation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import torch
+
+from isaacgymenvs.utils.torch_jit_utils import quat_apply
+
+
+AXIS_COLORS = ((0.85, 0.1, 0.1), (0.1, 0.85, 0.1), (0.1, 0.1, 0.85))
+
+
+class DebugDraw:
+    """Batched debug line drawing for all envs of a task.
+
+    Line segments are queued as tensors of shape [num_envs, ..., 3] in env-local coordinates, with one batched
+    tensor op per call. `draw` offsets them by the env origins, moves all of them to the host with a single copy
+    and submits them with a single `add_lines` call. Only the first `max_envs` envs are drawn if it is set.
+    """
+
+    def __init__(self, gym, viewer, envs, device, max_envs=None):
+        self.gym = gym
+        self.viewer = viewer
+        self.device = device
+        self.num_envs = len(envs) if max_envs is None else min(max_envs, len(envs))
+
+        origins = [gym.get_env_origin(env) for env in envs[:self.num_envs]]
+        self.env_origins = torch.tensor([[o.x, o.y, o.z] for o in origins], dtype=torch.float, device=device)
+        self.unit_axes = torch.eye(3, dtype=torch.float, device=device)
+
+        self.starts = []
+        self.ends = []
+        self.colors = []
+
+    def add_lines(self, start, end, color):
+        """Queue segments from `start` to `end`, both [num_envs, ..., 3], drawn in `color`."""
+        start = start[:self.num_envs].reshape(self.num_envs, -1, 3)
+        end = end[:self.num_envs].reshape(self.num_envs, -1, 3)
+        self.starts.append(start + self.env_origins.unsqueeze(1))
+        self.ends.append(end + self.env_origins.unsqueeze(1))
+        self.colors.append(torch.tensor(color, dtype=torch.float, device=self.device).expand(start.shape))
+
+    def add_arrows(self, pos, vec, color, scale=1.0):
+        """Queue segments from `pos` along `vec` * `scale`."""
+        pos = pos[:self.num_envs]
+        self.add_lines(pos, pos + vec[:self.num_envs] * scale, color)
+
+    def add_axes(self, pos, rot, scale=0.2, colors=AXIS_COLORS):
+        """Queue the x, y and z axes of the frames at `pos` [num_envs, ..., 3] with orientation `rot` [num_envs, ..., 4]."""
+        pos = pos[:self.num_envs].reshape(self.num_envs, -1, 1, 3)
+        rot = rot[:self.num_envs].reshape(self.num_envs, -1, 1, 4).expand(-1, -1, 3, -1)
+        axes = quat_apply(rot, (self.unit_axes * scale).expand(rot.shape[:-1] + (3,)))
+        for i, color in enumerate(colors):
+            self.add_lines(pos[..., 0, :], pos[..., 0, :] + axes[..., i, :], color)
+
+    def add_points(self, pos, color, size=0.02):
+        """Queue a small cross marker at every point of `pos` [num_envs, ..., 3]."""
+        pos = pos[:self.num_envs].reshape(self.num_envs, -1, 1, 3)
+        offsets = self.unit_axes * size
+        self.add_lines(pos - offsets, pos + offsets, color)
+
+    def draw(self, clear=True):
+        """Submit all queued segments with one `add_lines` call, clearing the previously drawn lines first."""
+        if clear:
+            self.gym.clear_lines(self.viewer)
+        if not self.starts:
+            return
+
+        # [num_envs, num_lines_per_env, 9] rows of start, end and color, copied to the host at once
+        lines = torch.cat([torch.cat(self.starts, dim=1), torch.cat(self.ends, dim=1), torch.cat(self.colors, dim=1)],
+                          dim=-1).view(-1, 9).cpu().numpy()
+        self.gym.add_lines(self.viewer, None, lines.shape[0], lines[:, :6].copy(), lines[:, 6:].copy())
+
+        self.starts = []
+        self.ends = []
+        self.colors = []
@@ -0,0 +1,122 @@
+# Copyright (c) 2018-2023, NVIDIA Corporation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import operator
+
+import torch
+
+
+class NonphysicalNoise:
+    """Observation/action noise of a DR config, applied with persistent buffers.
+
+    The noise is `white + correlated`, where the white noise is redrawn on every call and the correlated noise is
+    drawn once per env and kept until `resample_correlated` is called. Both are combined with the input through
+    `operation` ('additive' or 'scaling'). The distribution parameters live in a device tensor, so schedule
+    updates through `set_params` only overwrite it. The buffers follow the device of the perturbed tensor, so the
+    same module can be applied to sim-device observations and rl-device actions.
+
+    The correlated noise is standard normal by default, `corr_distribution='uniform'` draws it from U(0, 1) instead.
+    An optional per-env mask set with `set_white_noise_mask` scales the white noise draw of each env.
+    """
+
+    def __init__(self, distribution, operation, device, corr_distribution='gaussian'):
+        if distribution not in ('gaussian', 'uniform'):
+            raise ValueError(f"Unsupported noise distribution: {distribution}")
+        if corr_distribution not in ('gaussian', 'uniform'):
+            raise ValueError(f"Unsupported correlated noise distribution: {corr_distribution}")
+
+        self.distribution = distribution
+        self.corr_distribution = corr_distribution
+        self.operation = operation
+        self.op = operator.add if operation == 'additive' else operator.mul
+
+        # (offset, scale) of the white noise followed by (offset, scale) of the correlated noise
+        self.params = torch.zeros(4, dtype=torch.float, device=device)
+        self.white_mask = None
+        self.noise = None
+        self.corr = None
+        self.corr_stale = True
+
+    def set_params(self, lo, hi, lo_corr, hi_corr):
+        """Set the distribution ranges: (mu, var) pairs for gaussian noise or (lo, hi) pairs for uniform noise."""
+        if self.distribution == 'gaussian':
+            values = [lo, hi, lo_corr, hi_corr]
+        else:
+            values = [lo, hi - lo, lo_corr, hi_corr - lo_corr]
+        self.params.copy_(torch.tensor(values, dtype=torch.float), non_blocking=True)
+
+    def set_white_noise_mask(self, mask):
+        """Scale the white noise of each env by the [num_envs] `mask`, or remove the mask if None."""
+        self.white_mask = None if mask is None else mask.float()
+
+    def resample_correlated(self, env_ids=None):
+        """Redraw the correlated noise of `env_ids`, or of all envs on the next call."""
+        if env_ids is None or self.corr is None:
+            self.corr_stale = True
+        else:
+            if isinstance(env_ids, torch.Tensor):
+                env_ids = env_ids.to(self.corr.device)
+            corr = self.corr[env_ids]
+            self.corr[env_ids] = corr.normal_() if self.corr_distribution == 'gaussian' else corr.uniform_()
+
+    def __call__(self, tensor, out=None):
+        if self.noise is None or self.noise.shape != tensor.shape or self.noise.device != tensor.device:
+            self.noise = torch.empty_like(tensor)
+            self.corr = torch.empty_like(tensor)
+            self.corr_stale = True
+        if self.params.device != tensor.device:
+            self.params = self.params.to(tensor.device)
+        if self.corr_stale:
+            if self.corr_distribution == 'gaussian':
+                self.corr.normal_()
+            else:
+                self.corr.uniform_()
+            self.corr_stale = False
+
+        if self.distribution == 'gaussian':
+            self.noise.normal_()
+        else:
+            self.noise.uniform_()
+        if self.white_mask is not None:
+            if self.white_mask.device != tensor.device:
+                self.white_mask = self.white_mask.to(tensor.device)
+            self.noise.mul_(self.white_mask.view(-1, *([1] * (tensor.dim() - 1))))
+
+        noise = compute_nonphysical_noise(self.noise, self.corr, self.params)
+        if out is None:
+            return self.op(tensor, noise)
+        return torch.add(tensor, noise, out=out) if self.op is operator.add else torch.mul(tensor, noise, out=out)
+
+
+@torch.jit.script
+def compute_nonphysical_noise(noise, corr, params):
+    # type: (Tensor, Tensor, Tensor) -> Tensor
+    # noise <- noise * scale + offset + corr * scale_corr + offset_corr, in place
+    torch.addcmul(params[0] + params[2], noise, params[1], out=noise)
+    torch.addcmul(noise, corr, params[3], out=noise)
+    return noise
@@ -27,6 +27,9 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 
+import threading
+import time
+
 import numpy as np
 from bisect import bisect
 from isaacgym import gymapi
@@ -69,7 +72,10 @@ def get_default_setter_args(gym):
 
 
 def generate_random_samples(attr_randomization_params, shape, curr_gym_step_count,
-                            extern_sample=None):
+                            extern_sample=None, rng=None):
+
+    if rng is None:
+        rng = np.random
 
     rand_range = attr_randomization_params['range']
     distribution = attr_randomization_params['distribution']
@@ -105,7 +111,7 @@ def generate_random_samples(attr_randomization_params, shape, curr_gym_step_coun
         elif operation == 'scaling':
             var = var * sched_scaling  # scale up var over time
             mu = mu * sched_scaling + 1 * (1 - sched_scaling)  # linearly interpolate
-        sample = np.random.normal(mu, var, shape)
+        sample = rng.normal(mu, var, shape)
 
     elif distribution == "loguniform":
 
@@ -116,7 +122,7 @@ def generate_random_samples(attr_randomization_params, shape, curr_gym_step_coun
         elif operation == 'scaling':
             lo = lo * sched_scaling + 1 * (1 - sched_scaling)
             hi = hi * sched_scaling + 1 * (1 - sched_scaling)
-        sample = np.exp(np.random.uniform(np.log(lo), np.log(hi), shape))
+        sample = np.exp(rng.uniform(np.log(lo), np.log(hi), shape))
 
     elif distribution == "uniform":
 
@@ -127,7 +133,7 @@ def generate_random_samples(attr_randomization_params, shape, curr_gym_step_coun
         elif operation == 'scaling':
             lo = lo * sched_scaling + 1 * (1 - sched_scaling)
             hi = hi * sched_scaling + 1 * (1 - sched_scaling)
-        sample = np.random.uniform(lo, hi, shape)
+        sample = rng.uniform(lo, hi, shape)
 
     return sample
 
@@ -145,6 +151,18 @@ def get_bucketed_val(new_prop_val, attr_randomization_params):
     return buckets[bisect(buckets, new_prop_val) - 1]
 
 
+def get_bucketed_vals(new_prop_vals, attr_randomization_params):
+    """Vectorized `get_bucketed_val` over an array of property values."""
+    if attr_randomization_params['distribution'] == 'uniform':
+        lo, hi = attr_randomization_params['range'][0], attr_randomization_params['range'][1]
+    else:
+        lo = attr_randomization_params['range'][0] - 2 * np.sqrt(attr_randomization_params['range'][1])
+        hi = attr_randomization_params['range'][0] + 2 * np.sqrt(attr_randomization_params['range'][1])
+    num_buckets = attr_randomization_params['num_buckets']
+    buckets = np.array([(hi - lo) * i / num_buckets + lo for i in range(num_buckets)])
+    return buckets[np.searchsorted(buckets, new_prop_vals, side='right') - 1]
+
+
 def apply_random_samples(prop, og_prop, attr, attr_randomization_params,
                          curr_gym_step_count, extern_sample=None, bucketing_randomization_params=None):
     
@@ -236,4 +254,284 @@ def check_buckets(gym, envs, dr_params):
             if actor_name in dr_params["actor_params"] and 'rigid_shape_properties' in dr_params["actor_params"][actor_name]:
                 shape_ct += gym.get_actor_rigid_shape_count(env, actor_handle)
 
-    assert shape_ct <= 64000 or total_num_buckets > 0, 'Explicit material bucketing is not used but the total number of shapes exceeds material limit. Please specify bucketing to limit material count.'
\ No newline at end of file
+    assert shape_ct <= 64000 or total_num_buckets > 0, 'Explicit material bucketing is not used but the total number of shapes exceeds material limit. Please specify bucketing to limit material count.'
+
+
+class DRPropertyBank:
+    """A bank of pre-sampled randomization samples for the actor properties of a DR config.
+
+    `size` entries are drawn at startup for every randomized attribute, with the same distributions as
+    `generate_random_samples` at the end of their schedule. Schedules are applied at lookup time, by scaling the
+    looked up samples as `generate_random_samples` does for external samples, so a bank drawn at step 0 still follows
+    the schedule. On reset an env is assigned a bank entry, which turns sampling into a table lookup. Both the bank
+    and the assignments are drawn from generators seeded with `seed`, so DR runs are reproducible. With
+    `regenerate_every` > 0 the bank is redrawn with fresh samples once the gym step count advanced by that many steps.
+    The new bank is drawn in a background thread and swapped in at the next `update` call, waiting for the thread if
+    needed, so the step at which it takes effect does not depend on timing.
+    """
+
+    def __init__(self, sample_specs, size, seed=0, regenerate_every=0):
+        """
+        Args:
+            sample_specs: dict mapping a key to (attr_randomization_params, per-entry sample shape).
+            size: number of entries in the bank.
+            seed: seed of the bank and of the entry assignment.
+            regenerate_every: number of gym steps between regenerations of the bank, 0 to disable.
+        """
+        self.sample_specs = sample_specs
+        self.size = size
+        self.seed = seed
+        self.regenerate_every = regenerate_every
+
+        self.assign_rng = np.random.RandomState(seed)
+        self.num_generations = 0
+        self.bank_step = -1
+        self.samples = {}
+        self._regen_thread = None
+        self._next_samples = None
+        self._next_step = -1
+
+    def _generate(self, generation):
+        rng = np.random.RandomState(self.seed + generation)
+        samples = {}
+        for key, (params, shape) in self.sample_specs.items():
+            # drawn unscheduled, the schedule is applied in `lookup`
+            unscheduled_params = {k: v for k, v in params.items() if k != 'schedule'}
+            samples[key] = generate_random_samples(unscheduled_params, (self.size,) + tuple(shape), 0, rng=rng)
+        return samples
+
+    def _prefetch(self, generation):
+        self._next_samples = self._generate(generation)
+
+    def update(self, curr_gym_step_count):
+        """Generate the bank on first use, swap in a prefetched bank, or start prefetching one when it is due."""
+        if self.bank_step < 0:
+            self.samples = self._generate(self.num_generations)
+            self.num_generations += 1
+            self.bank_step = curr_gym_step_count
+            return
+
+        if self._regen_thread is not None:
+            # swap at a fixed call rather than whenever the thread happens to finish
+            self._regen_thread.join()
+            self.samples, self.bank_step = self._next_samples, self._next_step
+            self._regen_thread = self._next_samples = None
+            return
+
+        if self.regenerate_every <= 0 or curr_gym_step_count - self.bank_step < self.regenerate_every:
+            return
+
+        self._next_step = curr_gym_step_count
+        self._regen_thread = threading.Thread(target=self._prefetch, args=(self.num_generations,), daemon=True)
+        self.num_generations += 1
+        self._regen_thread.start()
+
+    def assign(self, num_envs):
+        """Draw bank entries for `num_envs` envs."""
+        return self.assign_rng.randint(0, self.size, num_envs)
+
+    def lookup(self, key, entry_ids, curr_gym_step_count):
+        """Samples of bank entries `entry_ids` for `key`, scaled by the schedule of the attribute at the given step."""
+        samples = self.samples[key][entry_ids]
+        params = self.sample_specs[key][0]
+        if 'schedule' not in params:
+            return samples
+        return generate_random_samples(params, samples.shape, curr_gym_step_count, extern_sample=samples)
+
+
+class BatchedActorRandomizer:
+    """Applies the ``actor_params`` randomizations of a DR config to many envs at once.
+
+    Actor handles, property layouts and the original (unrandomized) property values of every env are resolved
+    once, when the randomizer is created. Randomizing a batch of envs then draws all the values of an attribute
+    for the whole batch with a single `generate_random_samples` call, and only the gym getter/setter pair of every
+    randomized property group is issued per env. Attributes must be scalars (per rigid body, shape or DOF).
+    Envs may hold different assets for the same actor, with different rigid body, shape or DOF counts. The
+    original values of such a ragged group are then kept per env, and every env uses the first values of samples
+    drawn for the largest layout.
+
+    If the DR config has a `property_bank` section (`size`, `seed`, `regenerate_every`), the samples are taken
+    from a `DRPropertyBank` instead and `env_bank_ids` records the bank entry assigned to every env.
+
+    `last_report` holds the timing of the last `apply` call.
+    """
+
+    def __init__(self, gym, envs, dr_params):
+        self.gym = gym
+        self.envs = envs
+        self.getters = get_property_getter_map(gym)
+        self.setters = get_property_setter_map(gym)
+        self.setter_args = get_default_setter_args(gym)
+
+        self.actor_handles = {}
+        self.color_actors = []
+        self.scale_params = {}
+        self.prop_groups = []
+
+        for actor, actor_properties in dr_params["actor_params"].items():
+            handles = [gym.find_actor_handle(env, actor) for env in envs]
+            self.actor_handles[actor] = handles
+
+            for prop_name, prop_attrs in actor_properties.items():
+                if prop_name == 'color':
+                    self.color_actors.append(actor)
+                    continue
+                if prop_name == 'scale':
+                    self.scale_params[actor] = prop_attrs
+                    continue
+
+                og_vals = {attr: [] for attr in prop_attrs}
+                is_array = False
+                for env, handle in zip(envs, handles):
+                    prop = self.getters[prop_name](env, handle)
+                    is_array = isinstance(prop, np.ndarray)
+                    for attr in prop_attrs:
+                        og_vals[attr].append(self._read_attr(prop, attr))
+
+                sizes = [len(vals) for vals in og_vals[next(iter(prop_attrs))]] if prop_attrs else [0]
+                ragged = len(set(sizes)) > 1
+                self.prop_groups.append(dict(
+                    actor=actor,
+                    prop_name=prop_name,
+                    attrs=prop_attrs,
+                    is_array=is_array,
+                    ragged=ragged,
+                    max_size=max(sizes),
+                    # per-env arrays when envs have different layouts, one [num_envs, size] array otherwise
+                    og_vals={attr: vals if ragged else np.stack(vals) for attr, vals in og_vals.items()},
+                ))
+
+        self.bank = None
+        self.env_bank_ids = np.full(len(envs), -1, dtype=np.int64)
+        bank_cfg = dr_params.get("property_bank", None)
+        if bank_cfg is not None:
+            sample_specs = {('scale', actor): (params, ()) for actor, params in self.scale_params.items()}
+            for group in self.prop_groups:
+                for attr, params in group['attrs'].items():
+                    key = (group['actor'], group['prop_name'], attr)
+                    sample_specs[key] = (params, (group['max_size'],))
+            self.bank = DRPropertyBank(sample_specs, bank_cfg["size"], bank_cfg.get("seed", 0),
+                                       bank_cfg.get("regenerate_every", 0))
+
+        self.last_report = {}
+
+    def _sample(self, key, attr_randomization_params, shape, curr_gym_step_count, entry_ids):
+        if entry_ids is None:
+            return generate_random_samples(attr_randomization_params, shape, curr_gym_step_count)
+        return self.bank.lookup(key, entry_ids, curr_gym_step_count)
+
+    @staticmethod
+    def _randomized_vals(og_vals, sample, attr_randomization_params):
+        if attr_randomization_params['operation'] == 'scaling':
+            vals = og_vals * sample
+        elif attr_randomization_params['operation'] == 'additive':
+            vals = og_vals + sample
+        if 'num_buckets' in attr_randomization_params and attr_randomization_params['num_buckets'] > 0:
+            vals = get_bucketed_vals(vals, attr_randomization_params)
+        return vals
+
+    @staticmethod
+    def _read_attr(prop, attr):
+        if isinstance(prop, np.ndarray):
+            return np.array(prop[attr], dtype=np.float64)
+        if not isinstance(prop, list):
+            prop = [prop]
+        return np.array([getattr(p, attr) for p in prop], dtype=np.float64)
+
+    def apply(self, env_ids, curr_gym_step_count, sim_initialized):
+        """Randomize the actor properties of `env_ids` (a list of env indices)."""
+        start = time.perf_counter()
+        num_setter_calls = 0
+        sample_time = 0.
+
+        env_ids_np = np.asarray(env_ids, dtype=np.int64)
+        if len(env_ids_np) == 0:
+            self.last_report = dict(num_envs=0, sample_s=0., total_s=0., setter_calls=0)
+            return
+
+        entry_ids = None
+        if self.bank is not None:
+            self.bank.update(curr_gym_step_count)
+            entry_ids = self.bank.assign(len(env_ids_np))
+            self.env_bank_ids[env_ids_np] = entry_ids
+
+        for actor in self.color_actors:
+            handles = self.actor_handles[actor]
+            for env_id in env_ids:
+                env = self.envs[env_id]
+                num_bodies = self.gym.get_actor_rigid_body_count(env, handles[env_id])
+                colors = np.random.uniform(0, 1, (num_bodies, 3))
+                for n in range(num_bodies):
+                    self.gym.set_rigid_body_color(env, handles[env_id], n, gymapi.MESH_VISUAL, gymapi.Vec3(*colors[n]))
+
+        for actor, attr_randomization_params in self.scale_params.items():
+            setup_only = attr_randomization_params.get('setup_only', False)
+            if setup_only and sim_initialized:
+                continue
+            t = time.perf_counter()
+            samples = self._sample(('scale', actor), attr_randomization_params, len(env_ids_np),
+                                   curr_gym_step_count, entry_ids)
+            if attr_randomization_params['operation'] == 'scaling':
+                new_scales = 1 * samples
+            elif attr_randomization_params['operation'] == 'additive':
+                new_scales = 1 + samples
+            sample_time += time.perf_counter() - t
+
+            handles = self.actor_handles[actor]
+            for env_id, new_scale in zip(env_ids, new_scales):
+                self.gym.set_actor_scale(self.envs[env_id], handles[env_id], float(new_scale))
+                num_setter_calls += 1
+
+        for group in self.prop_groups:
+            prop_attrs = group['attrs']
+            # as for per-env randomization, a property group is left untouched if any of its attributes can
+            # only be randomized during setup
+            if sim_initialized and any(params.get('setup_only', False) for params in prop_attrs.values()):
+                continue
+
+            t = time.perf_counter()
+            new_vals = {}
+            for attr, attr_randomization_params in prop_attrs.items():
+                sample = self._sample((group['actor'], group['prop_name'], attr), attr_randomization_params,
+                                      (len(env_ids_np), group['max_size']), curr_gym_step_count, entry_ids)
+                if group['ragged']:
+                    og_vals = group['og_vals'][attr]
+                    new_vals[attr] = [self._randomized_vals(og_vals[env_id], sample[i, :len(og_vals[env_id])],
+                                                            attr_randomization_params)
+                                      for i, env_id in enumerate(env_ids_np)]
+                else:
+                    new_vals[attr] = self._randomized_vals(group['og_vals'][attr][env_ids_np], sample,
+                                                           attr_randomization_params)
+            sample_time += time.perf_counter() - t
+
+            getter = self.getters[group['prop_name']]
+            setter = self.setters[group['prop_name']]
+            default_args = self.setter_args[group['prop_name']]
+            handles = self.actor_handles[group['actor']]
+            for i, env_id in enumerate(env_ids):
+                env = self.envs[env_id]
+                prop = getter(env, handles[env_id])
+                if group['is_array']:
+                    for attr, vals in new_vals.items():
+                        prop[attr] = vals[i]
+                else:
+                    props = prop if isinstance(prop, list) else [prop]
+                    for attr, vals in new_vals.items():
+                        for p, val in zip(props, vals[i]):
+                            setattr(p, attr, float(val))
+                setter(env, handles[env_id], prop, *default_args)
+                num_setter_calls += 1
+
+        self.last_report = dict(
+            num_envs=len(env_ids_np),
+            sample_s=sample_time,
+            total_s=time.perf_counter() - start,
+            setter_calls=num_setter_calls,
+        )
+
+    def format_report(self):
+        r = self.last_report
+        if not r:
+            return 'DR: no randomization applied yet'
+        return f"DR: randomized {r['num_envs']} envs in {r['total_s'] * 1000:.2f} ms " \
+               f"(sampling {r['sample_s'] * 1000:.2f} ms, {r['setter_calls']} setter calls)"
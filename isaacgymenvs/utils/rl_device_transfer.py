@@ -0,0 +1,121 @@
+# Copyright (c) 2018-2023, NVIDIA Corporation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from typing import Dict, List
+
+import torch
+
+
+class RlDeviceTransfer:
+    """Copies step outputs from the sim device to the rl device without blocking the host.
+
+    Copies are issued on a dedicated CUDA stream of the rl device, and the rl device's current stream waits on an
+    event recorded after each copy, so work submitted afterwards sees the new data. Every destination is double
+    buffered: the copy into one buffer only waits for the rl device work queued up to the previous call, i.e. for
+    the consumers of that buffer, and overlaps with the learner work that reads the other buffer. Returned buffers
+    therefore stay valid until the call after next.
+
+    When the sim runs on the CPU, sources are copied from pinned host memory so the host-to-device copy can be
+    asynchronous. Sources that are not pinned are staged in pinned buffers, and a pinned source must not be written
+    before its previous copy has completed, see `wait_source`.
+    """
+
+    def __init__(self, sim_device: str, rl_device: str):
+        self.sim_device = torch.device(sim_device)
+        self.rl_device = torch.device(rl_device)
+
+        self.stream = torch.cuda.Stream(device=self.rl_device)
+        self.staging_bufs: Dict[str, torch.Tensor] = {}
+        self.copy_events: Dict[str, torch.cuda.Event] = {}
+
+        self.dst_bufs: Dict[str, List[torch.Tensor]] = {}
+        self.release_events: Dict[str, List[torch.cuda.Event]] = {}
+        self.next_dst: Dict[str, int] = {}
+
+    @staticmethod
+    def is_supported(sim_device: str, rl_device: str) -> bool:
+        """Whether asynchronous transfers can be used between the two devices."""
+        return torch.device(rl_device).type == "cuda" and torch.cuda.is_available() \
+            and torch.device(sim_device) != torch.device(rl_device)
+
+    def wait_source(self, name: str) -> None:
+        """Block the host until the last copy issued under `name` has finished reading its source.
+
+        Must be called before a pinned source passed to `copy` is written again. Sources on a CUDA sim device need
+        no call, later work on the sim device's current stream is already ordered after the copy.
+        """
+        event = self.copy_events.get(name, None)
+        if event is not None and self.sim_device.type == "cpu":
+            event.synchronize()
+
+    def copy(self, name: str, src: torch.Tensor, dst: torch.Tensor) -> torch.Tensor:
+        """Asynchronously copy `src` into a buffer on the rl device shaped like `dst`, and return that buffer.
+
+        `dst` is used as one of the two buffers alternated under `name`. Work submitted afterwards to the rl
+        device's current stream is ordered after the copy.
+        """
+        if name not in self.dst_bufs:
+            self.dst_bufs[name] = [dst, torch.empty_like(dst)]
+            self.release_events[name] = [torch.cuda.Event(), torch.cuda.Event()]
+            self.copy_events[name] = torch.cuda.Event()
+            self.next_dst[name] = 0
+
+        idx = self.next_dst[name]
+        self.next_dst[name] = 1 - idx
+        dst = self.dst_bufs[name][idx]
+        event = self.copy_events[name]
+
+        rl_stream = torch.cuda.current_stream(self.rl_device)
+        # everything queued so far may read the buffer returned by the previous call
+        self.release_events[name][1 - idx].record(rl_stream)
+
+        if self.sim_device.type == "cpu":
+            if not src.is_pinned():
+                staging = self.staging_bufs.get(name, None)
+                if staging is None:
+                    staging = torch.empty(src.shape, dtype=src.dtype, pin_memory=True)
+                    self.staging_bufs[name] = staging
+                # the previous copy out of this staging buffer must be done before it is overwritten
+                event.synchronize()
+                staging.copy_(src)
+                src = staging
+        else:
+            # the sim device must be done producing src before it is read on the copy stream
+            self.stream.wait_stream(torch.cuda.current_stream(self.sim_device))
+
+        # only the consumers of this buffer, queued before the previous call, must be done before it is overwritten
+        self.stream.wait_event(self.release_events[name][idx])
+        with torch.cuda.stream(self.stream):
+            dst.copy_(src, non_blocking=True)
+        event.record(self.stream)
+        rl_stream.wait_event(event)
+        if self.sim_device.type == "cuda":
+            # later sim work must not overwrite src while the copy is still reading it
+            torch.cuda.current_stream(self.sim_device).wait_event(event)
+
+        return dst
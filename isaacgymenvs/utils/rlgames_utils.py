@@ -323,6 +323,9 @@ class ComplexObsRLGPUEnv(vecenv.IVecEnv):
 
         self.obs_spec = obs_spec
 
+        # concatenated observations are written into these buffers, which are reused on every step
+        self.concat_obs_bufs: Dict[Tuple[str, ...], torch.Tensor] = {}
+
     def _generate_obs(
         self, env_obs: Dict[str, torch.Tensor]
     ) -> Dict[str, Dict[str, torch.Tensor]]:
@@ -377,9 +380,19 @@ class ComplexObsRLGPUEnv(vecenv.IVecEnv):
         return info
     
     def gen_obs_dict(self, obs_dict, obs_names, concat):
-        """Generate the RL Games observations given the observations from the environment."""
+        """Generate the RL Games observations given the observations from the environment.
+
+        Concatenated observations are written into a reused buffer and are only valid until the next call.
+        """
         if concat:
-            return torch.cat([obs_dict[name] for name in obs_names], dim=1)
+            obs_list = [obs_dict[name] for name in obs_names]
+            key = tuple(obs_names)
+            out = self.concat_obs_bufs.get(key, None)
+            num_obs = sum(obs.shape[1] for obs in obs_list)
+            if out is None or out.shape != (obs_list[0].shape[0], num_obs) or out.device != obs_list[0].device:
+                out = torch.empty((obs_list[0].shape[0], num_obs), dtype=obs_list[0].dtype, device=obs_list[0].device)
+                self.concat_obs_bufs[key] = out
+            return torch.cat(obs_list, dim=1, out=out)
         else:
             return {k: obs_dict[k] for k in obs_names}
             
@@ -29,6 +29,9 @@
 
 from __future__ import print_function
 
+import argparse
+import time
+
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
@@ -36,7 +39,7 @@ import torch.nn.functional as F
 
 class RandomNetworkAdversary(nn.Module):
 
-    def __init__(self, num_envs, in_dims, out_dims, softmax_bins, device):
+    def __init__(self, num_envs, in_dims, out_dims, softmax_bins, device, dtype=torch.float32):
         super(RandomNetworkAdversary, self).__init__()
 
         """
@@ -56,6 +59,9 @@ class RandomNetworkAdversary(nn.Module):
            creating N_envs RNA networks which will overwhelm the GPU-memory. 
            Therefore, dropout is a nice approximation of this by re-sampling 
            weights of the same neural network for each different env on the GPU. 
+
+        The network and its dropout masks can be kept in half or bfloat16 precision through `dtype`, the softmax
+        over the bins is always computed in fp32.
         """
 
         self.in_dims  = in_dims 
@@ -64,29 +70,25 @@ class RandomNetworkAdversary(nn.Module):
         self.num_envs = num_envs
 
         self.device = device 
+        self.dtype = dtype
        
         self.num_feats1 = 512
         self.num_feats2 = 1024
 
-        # Sampling random probablities for dropout masks 
-        dropout_probs = torch.rand((2, ))
-
         # Setting up the RNA neural network here    
 
         # First layer
 
         self.fc1 = nn.Linear(in_dims, self.num_feats1).to(self.device)
 
-        self.dropout_masks1 = torch.bernoulli(torch.ones((self.num_envs, \
-            self.num_feats1)), p=dropout_probs[0]).to(self.device)
+        self.dropout_masks1 = torch.empty((self.num_envs, self.num_feats1), dtype=dtype, device=self.device)
 
         self.fc1_1 = nn.Linear(self.num_feats1, self.num_feats1).to(self.device)
 
         # Second layer 
         self.fc2 = nn.Linear(self.num_feats1, self.num_feats2).to(self.device)
 
-        self.dropout_masks2 = torch.bernoulli(torch.ones((self.num_envs, \
-            self.num_feats2)), p=dropout_probs[1]).to(self.device)
+        self.dropout_masks2 = torch.empty((self.num_envs, self.num_feats2), dtype=dtype, device=self.device)
 
         self.fc2_1 = nn.Linear(self.num_feats2, self.num_feats2).to(self.device)
 
@@ -106,42 +108,37 @@ class RandomNetworkAdversary(nn.Module):
 
         print('initialising weights for random network')
 
+        # weights are initialised in fp32 so that the random network does not depend on the precision
+        self.float()
         nn.init.kaiming_uniform_(self.fc1.weight)
         nn.init.kaiming_uniform_(self.fc1_1.weight)
         nn.init.kaiming_uniform_(self.fc2.weight)
         nn.init.kaiming_uniform_(self.fc2_1.weight)
         nn.init.kaiming_uniform_(self.fc3.weight)
+        self.to(self.dtype)
 
         return
 
     def refresh_dropout_masks(self):
 
-        dropout_probs = torch.rand((2, ))
+        # masks are resampled in place on their device, with the keep probabilities drawn on the host
+        dropout_probs = torch.rand((2, )).tolist()
 
-        self.dropout_masks1 = torch.bernoulli(torch.ones((self.num_envs, self.num_feats1)), \
-            p=dropout_probs[0]).to(self.dropout_masks1.device)
-
-        self.dropout_masks2 = torch.bernoulli(torch.ones((self.num_envs, self.num_feats2)), \
-            p=dropout_probs[1]).to(self.dropout_masks2.device)
+        self.dropout_masks1.bernoulli_(dropout_probs[0])
+        self.dropout_masks2.bernoulli_(dropout_probs[1])
 
         return
    
+    @torch.no_grad()
     def forward(self, x):
 
-        x = self.fc1(x)
-        x = F.relu(x)
-        x = self.fc1_1(x)
-        x = self.dropout_masks1 * x 
-
-        x = self.fc2(x)
-        x = F.relu(x)
-        x = self.fc2_1(x)
-        x = self.dropout_masks2 * x 
-
-        x = self.fc3(x)
+        x = rna_forward(x.to(self.dtype),
+                        self.fc1.weight, self.fc1.bias, self.fc1_1.weight, self.fc1_1.bias, self.dropout_masks1,
+                        self.fc2.weight, self.fc2.bias, self.fc2_1.weight, self.fc2_1.bias, self.dropout_masks2,
+                        self.fc3.weight, self.fc3.bias)
 
         x = x.view(-1, self.out_dims, self.softmax_bins)
-        output = F.softmax(x, dim=-1)
+        output = F.softmax(x, dim=-1, dtype=torch.float32)
 
         # We have discretised the joint angles into bins 
         # Now we pick up the bin for each joint angle 
@@ -150,14 +147,113 @@ class RandomNetworkAdversary(nn.Module):
         return output
 
 
-if __name__ == "__main__":
-
-    num_envs = 1024
-    RNA = RandomNetworkAdversary(num_envs=num_envs, in_dims=16, out_dims=16, softmax_bins=32, device='cuda')
+@torch.jit.script
+def rna_forward(x, w1, b1, w1_1, b1_1, masks1, w2, b2, w2_1, b2_1, masks2, w3, b3):
+    # type: (Tensor, Tensor, Tensor, Tensor, Tensor, Tensor, Tensor, Tensor, Tensor, Tensor, Tensor, Tensor, Tensor) -> Tensor
+    # the layers of RandomNetworkAdversary, with the relus and the per-env dropout masks applied in place
+    x = F.linear(x, w1, b1).relu_()
+    x = F.linear(x, w1_1, b1_1).mul_(masks1)
+    x = F.linear(x, w2, b2).relu_()
+    x = F.linear(x, w2_1, b2_1).mul_(masks2)
+    return F.linear(x, w3, b3)
+
+
+def _previous_forward(rna, x, masks1, masks2):
+    # reference: the unfused fp32 forward used before the masks moved on device
+    x = F.relu(rna.fc1(x))
+    x = masks1 * rna.fc1_1(x)
+    x = F.relu(rna.fc2(x))
+    x = masks2 * rna.fc2_1(x)
+    x = rna.fc3(x).view(-1, rna.out_dims, rna.softmax_bins)
+    return F.softmax(x, dim=-1)
+
+
+def _previous_refresh_dropout_masks(rna):
+    # reference: the masks built on the CPU and copied to the device, as done before
+    dropout_probs = torch.rand((2, ))
+    masks1 = torch.bernoulli(torch.ones((rna.num_envs, rna.num_feats1)), p=dropout_probs[0]).to(rna.device)
+    masks2 = torch.bernoulli(torch.ones((rna.num_envs, rna.num_feats2)), p=dropout_probs[1]).to(rna.device)
+    return masks1, masks2
+
+
+def _benchmark(num_envs, in_dims, out_dims, softmax_bins, device, dtypes, iterations, weight_sample_freq, env_step_ms):
+    """Time the adversary per env step for each precision against the previous fp32 implementation, and compare
+    the output statistics."""
+
+    def synchronize():
+        if str(device).startswith('cuda'):
+            torch.cuda.synchronize()
+
+    def timed(fn):
+        fn()
+        synchronize()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        synchronize()
+        return (time.perf_counter() - start) / iterations * 1000
+
+    def step_ms(forward, refresh):
+        # the masks are resampled every weight_sample_freq steps, so their cost is amortized over that many steps
+        return timed(forward) + timed(refresh) / weight_sample_freq
+
+    def report(name, ms, out):
+        bins = torch.argmax(out, dim=-1)
+        line = (f'{name:>13}: {ms:8.3f} ms/step, '
+                f'prob std {out.std().item():.5f} max {out.max().item():.4f}, '
+                f'max prob diff {(out - ref_out).abs().max().item():.2e}, '
+                f'bin agreement {(bins == ref_bins).float().mean().item() * 100:.2f}%, '
+                f'mean bin {bins.float().mean().item():.3f}')
+        if env_step_ms is not None:
+            line += f', {ms / (env_step_ms + ms) * 100:.1f}% of the step'
+        print(line)
+
+    torch.manual_seed(0)
+    reference = RandomNetworkAdversary(num_envs, in_dims, out_dims, softmax_bins, device)
+    x = torch.randn(num_envs, in_dims, device=device)
+    ref_out = _previous_forward(reference, x, reference.dropout_masks1, reference.dropout_masks2)
+    ref_bins = torch.argmax(ref_out, dim=-1)
+
+    print(f'{num_envs} envs, {in_dims} -> {out_dims}x{softmax_bins} bins on {device}, '
+          f'masks resampled every {weight_sample_freq} steps, {torch.get_num_threads()} threads')
+
+    previous_masks = [reference.dropout_masks1, reference.dropout_masks2]
+
+    def previous_refresh():
+        previous_masks[:] = _previous_refresh_dropout_masks(reference)
+
+    def previous_forward():
+        with torch.no_grad():
+            return _previous_forward(reference, x, *previous_masks)
+
+    ms = step_ms(previous_forward, previous_refresh)
+    with torch.no_grad():
+        report('previous fp32', ms, _previous_forward(reference, x, reference.dropout_masks1,
+                                                      reference.dropout_masks2))
+
+    for name in dtypes:
+        rna = RandomNetworkAdversary(num_envs, in_dims, out_dims, softmax_bins, device, dtype=getattr(torch, name))
+        rna.load_state_dict(reference.state_dict())
+
+        ms = step_ms(lambda: rna(x), rna.refresh_dropout_masks)
+        # compare with the same masks as the reference
+        rna.dropout_masks1.copy_(reference.dropout_masks1)
+        rna.dropout_masks2.copy_(reference.dropout_masks2)
+        report(name, ms, rna(x))
 
-    x = torch.tensor(torch.randn(num_envs, 16).to(RNA.device))
-    y = RNA(x)
-    import ipdb; ipdb.set_trace()
 
-    
+if __name__ == "__main__":
 
+    parser = argparse.ArgumentParser(description='Benchmark of the random network adversary')
+    parser.add_argument('--num_envs', type=int, default=16384)
+    parser.add_argument('--device', type=str, default='cuda')
+    parser.add_argument('--dtypes', type=str, nargs='+', default=['float32', 'float16', 'bfloat16'])
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--weight_sample_freq', type=int, default=1000)
+    parser.add_argument('--env_step_ms', type=float, default=None,
+                        help='time of the rest of an env step, to report the share of the step spent in the adversary')
+    args = parser.parse_args()
+
+    # allegro hand: 16 joint angles and the object pose as input, 32 bins per joint angle
+    _benchmark(args.num_envs, 16 + 7, 16, 32, args.device, args.dtypes, args.iterations, args.weight_sample_freq,
+               args.env_step_ms)
@@ -0,0 +1,168 @@
+# Copyright (c) 2018-2023, NVIDIA Corporation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Audit the host syncs hidden in the step path of a task.
+
+Runs a task for a number of steps with `torch.cuda.set_sync_debug_mode("warn")` and attributes every
+synchronizing CUDA operation (`.item()`, `.cpu()`, `nonzero`, ...) to the source line that issued it and to the
+task phase it happened in (pre_physics, post_physics, reset or the remaining step code of VecTask).
+
+Enabled from the hydra config with `sync_audit_steps=<N>`, e.g.:
+
+    python train.py task=Trifinger sync_audit_steps=100 sync_audit_report=trifinger_syncs.json
+"""
+
+import json
+import os
+import traceback
+import warnings
+from collections import Counter
+
+import torch
+
+
+# methods of the task whose calls define a phase, the innermost one wins
+_PHASE_METHODS = {
+    "pre_physics_step": "pre_physics",
+    "post_physics_step": "post_physics",
+    "reset_idx": "reset",
+}
+
+_IGNORED_PATHS = (
+    os.path.dirname(torch.__file__),
+    os.path.dirname(warnings.__file__),
+    os.path.abspath(__file__),
+)
+
+
+class SyncAuditor:
+    """Records the synchronizing CUDA operations issued while stepping a task."""
+
+    def __init__(self, env):
+        self.env = env
+        self.phases = ["step"]
+        self.counts = Counter()
+        self.num_steps = 0
+
+        # wrap the phase methods on the instance, so that calls from within the task are attributed as well
+        for method_name, phase in _PHASE_METHODS.items():
+            method = getattr(env, method_name, None)
+            if method is not None:
+                setattr(env, method_name, self._wrap_phase(method, phase))
+
+    def _wrap_phase(self, method, phase):
+        def wrapper(*args, **kwargs):
+            self.phases.append(phase)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.phases.pop()
+        return wrapper
+
+    def _record(self, message, category, filename, lineno, file=None, line=None):
+        if "synchroniz" not in str(message):
+            return
+
+        source = None
+        for frame in reversed(traceback.extract_stack()):
+            if not frame.filename.startswith(_IGNORED_PATHS):
+                source = frame
+                break
+
+        if source is None:
+            source_key = (f"{filename}:{lineno}", "", "")
+        else:
+            source_key = (f"{source.filename}:{source.lineno}", source.name, (source.line or "").strip())
+        self.counts[(self.phases[-1],) + source_key] += 1
+
+    def run(self, num_steps):
+        num_actions = self.env.num_actions
+        with warnings.catch_warnings():
+            warnings.simplefilter("always")
+            warnings.showwarning = self._record
+            torch.cuda.set_sync_debug_mode("warn")
+            try:
+                for _ in range(num_steps):
+                    actions = torch.rand((self.env.num_envs, num_actions), device=self.env.rl_device) * 2.0 - 1.0
+                    self.env.step(actions)
+                    self.num_steps += 1
+            finally:
+                torch.cuda.set_sync_debug_mode("default")
+
+    def report(self):
+        entries = []
+        for (phase, location, function, code), count in self.counts.most_common():
+            entries.append({
+                "phase": phase,
+                "location": location,
+                "function": function,
+                "code": code,
+                "count": count,
+                "per_step": count / max(self.num_steps, 1),
+            })
+
+        per_phase = Counter()
+        for entry in entries:
+            per_phase[entry["phase"]] += entry["count"]
+
+        return {
+            "num_steps": self.num_steps,
+            "total_syncs": sum(per_phase.values()),
+            "syncs_per_phase": dict(per_phase),
+            "syncs": entries,
+        }
+
+
+def print_sync_report(report):
+    print(f"Sync audit: {report['total_syncs']} syncs in {report['num_steps']} steps")
+    for phase, count in report["syncs_per_phase"].items():
+        print(f"  {phase:<14}{count:>8}")
+    for entry in report["syncs"]:
+        print(f"{entry['per_step']:>8.2f}/step  [{entry['phase']}] {entry['location']} ({entry['function']})")
+        if entry["code"]:
+            print(f"                {entry['code']}")
+
+
+def audit_task_syncs(env, num_steps, report_path=""):
+    """Step `env` for `num_steps` steps with random actions, then print and optionally save the sync report."""
+    if not str(env.device).startswith("cuda"):
+        print("Sync audit: the task does not run on a CUDA device, nothing to audit")
+        return None
+
+    env.reset()
+    auditor = SyncAuditor(env)
+    auditor.run(num_steps)
+    report = auditor.report()
+
+    print_sync_report(report)
+    if report_path:
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Sync audit report saved to {report_path}")
+
+    return report
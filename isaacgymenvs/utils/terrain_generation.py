@@ -0,0 +1,153 @@
+# Copyright (c) 2018-2023, NVIDIA Corporation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""Generation of AnymalTerrain sub-terrain tiles, serially or in a pool of worker processes.
+
+Kept apart from the task modules so that spawned workers only import numpy and `isaacgym.terrain_utils`, not torch
+or the task packages. Also runs as a benchmark of serial against parallel generation of a curriculum terrain:
+
+    python isaacgymenvs/utils/terrain_generation.py --num_levels 10 --num_terrains 20 --workers 8
+"""
+
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from isaacgym.terrain_utils import SubTerrain, discrete_obstacles_terrain, pyramid_sloped_terrain, \
+    pyramid_stairs_terrain, random_uniform_terrain, stepping_stones_terrain
+
+
+def generate_sub_terrains(jobs, num_workers=1):
+    """Return the height fields of `jobs`, in order, generated by up to `num_workers` processes.
+
+    See `generate_sub_terrain` for the job layout. Every job carries its own seed, so the result does not depend on
+    `num_workers`. The state of the global numpy generator is left unchanged.
+    """
+    rng_state = np.random.get_state()
+    num_workers = min(num_workers, len(jobs))
+    if num_workers > 1:
+        # spawn rather than fork: the calling process already runs Isaac Gym, CUDA and PhysX threads
+        mp_context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers, mp_context=mp_context) as executor:
+            height_fields = list(executor.map(generate_sub_terrain, jobs, chunksize=max(1, len(jobs) // (4 * num_workers))))
+    else:
+        height_fields = [generate_sub_terrain(job) for job in jobs]
+    np.random.set_state(rng_state)
+    return height_fields
+
+
+def generate_sub_terrain(job):
+    """Generate the height field of one tile, randomly if `difficulty` is None, else for the curriculum.
+
+    Args:
+        job: (seed, tile_cfg, difficulty, choice) tuple, where `tile_cfg` holds the `width` in pixels, the
+            `vertical_scale` and `horizontal_scale` and the cumulative terrain `proportions`.
+    """
+    seed, tile_cfg, difficulty, choice = job
+    np.random.seed(seed)
+    terrain = SubTerrain("terrain",
+                         width=tile_cfg["width"],
+                         length=tile_cfg["width"],
+                         vertical_scale=tile_cfg["vertical_scale"],
+                         horizontal_scale=tile_cfg["horizontal_scale"])
+
+    if difficulty is None:
+        choice = np.random.uniform(0, 1)
+        if choice < 0.1:
+            if np.random.choice([0, 1]):
+                pyramid_sloped_terrain(terrain, np.random.choice([-0.3, -0.2, 0, 0.2, 0.3]))
+                random_uniform_terrain(terrain, min_height=-0.1, max_height=0.1, step=0.05, downsampled_scale=0.2)
+            else:
+                pyramid_sloped_terrain(terrain, np.random.choice([-0.3, -0.2, 0, 0.2, 0.3]))
+        elif choice < 0.6:
+            # step_height = np.random.choice([-0.18, -0.15, -0.1, -0.05, 0.05, 0.1, 0.15, 0.18])
+            step_height = np.random.choice([-0.15, 0.15])
+            pyramid_stairs_terrain(terrain, step_width=0.31, step_height=step_height, platform_size=3.)
+        elif choice < 1.:
+            discrete_obstacles_terrain(terrain, 0.15, 1., 2., 40, platform_size=3.)
+        return terrain.height_field_raw
+
+    proportions = tile_cfg["proportions"]
+    slope = difficulty * 0.4
+    step_height = 0.05 + 0.175 * difficulty
+    discrete_obstacles_height = 0.025 + difficulty * 0.15
+    stepping_stones_size = 2 - 1.8 * difficulty
+    if choice < proportions[0]:
+        if choice < 0.05:
+            slope *= -1
+        pyramid_sloped_terrain(terrain, slope=slope, platform_size=3.)
+    elif choice < proportions[1]:
+        if choice < 0.15:
+            slope *= -1
+        pyramid_sloped_terrain(terrain, slope=slope, platform_size=3.)
+        random_uniform_terrain(terrain, min_height=-0.1, max_height=0.1, step=0.025, downsampled_scale=0.2)
+    elif choice < proportions[3]:
+        if choice<proportions[2]:
+            step_height *= -1
+        pyramid_stairs_terrain(terrain, step_width=0.31, step_height=step_height, platform_size=3.)
+    elif choice < proportions[4]:
+        discrete_obstacles_terrain(terrain, discrete_obstacles_height, 1., 2., 40, platform_size=3.)
+    else:
+        stepping_stones_terrain(terrain, stone_size=stepping_stones_size, stone_distance=0.1, max_height=0., platform_size=3.)
+    return terrain.height_field_raw
+
+
+def _benchmark(num_levels, num_terrains, map_size, workers):
+    # curriculum tiles with the default AnymalTerrain proportions and scales
+    proportions = list(np.cumsum([0.1, 0.1, 0.35, 0.25, 0.2]))
+    tile_cfg = dict(width=int(map_size / 0.1), vertical_scale=0.005, horizontal_scale=0.1, proportions=proportions)
+    jobs = [(k, tile_cfg, i / num_levels, j / num_terrains)
+            for k, (j, i) in enumerate(np.ndindex(num_terrains, num_levels))]
+
+    timings = {}
+    results = {}
+    for num_workers in (1, workers):
+        start = time.perf_counter()
+        results[num_workers] = generate_sub_terrains(jobs, num_workers)
+        timings[num_workers] = time.perf_counter() - start
+
+    identical = all(np.array_equal(a, b) for a, b in zip(results[1], results[workers]))
+    print(f"{len(jobs)} tiles of {tile_cfg['width']}x{tile_cfg['width']} pixels, {os.cpu_count()} CPUs")
+    print(f"  serial:      {timings[1]:8.3f} s")
+    print(f"  {workers:3d} workers: {timings[workers]:8.3f} s")
+    print(f"  identical height fields: {identical}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark of serial against parallel sub-terrain generation")
+    parser.add_argument("--num_levels", type=int, default=10)
+    parser.add_argument("--num_terrains", type=int, default=20)
+    parser.add_argument("--map_size", type=float, default=8.)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    _benchmark(args.num_levels, args.num_terrains, args.map_size, args.workers)
@@ -0,0 +1,85 @@
+# Copyright (c) 2018-2023, NVIDIA Corporation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import pytest
+import torch
+
+from isaacgymenvs.utils.dr_noise import NonphysicalNoise
+
+
+def test_correlated_noise_is_kept_until_resampled():
+    torch.manual_seed(0)
+    noise = NonphysicalNoise('gaussian', 'additive', 'cpu')
+    # no white noise, correlated noise only
+    noise.set_params(0.0, 0.0, 0.0, 1.0)
+    x = torch.zeros(8, 3)
+
+    first = noise(x)
+    torch.testing.assert_close(noise(x), first)
+
+    noise.resample_correlated(torch.tensor([2, 5]))
+    second = noise(x)
+    changed = (second != first).any(dim=1)
+    assert changed.tolist() == [i in (2, 5) for i in range(8)]
+
+
+def test_uniform_noise_ranges_and_white_noise_mask():
+    torch.manual_seed(0)
+    noise = NonphysicalNoise('uniform', 'scaling', 'cpu', corr_distribution='uniform')
+    noise.set_params(0.5, 1.5, 0.0, 0.1)
+    mask = torch.tensor([True, False] * 512)
+    noise.set_white_noise_mask(mask)
+
+    out = noise(torch.ones(1024, 4))
+    corr = noise.corr * 0.1
+    assert corr.min() >= 0.0 and corr.max() < 0.1
+
+    # masked envs only get the offset of the white noise on top of their correlated noise
+    torch.testing.assert_close(out[~mask], 0.5 + corr[~mask])
+    white = out[mask] - corr[mask]
+    assert white.min() >= 0.5 and white.max() < 1.5
+    assert white.max() - white.min() > 0.9
+
+
+def test_noise_written_in_place():
+    noise = NonphysicalNoise('gaussian', 'scaling', 'cpu')
+    noise.set_params(2.0, 0.0, 0.0, 0.0)
+    x = torch.full((4, 2), 3.0)
+    noise(x, out=x)
+    torch.testing.assert_close(x, torch.full((4, 2), 6.0))
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="requires a CUDA device")
+def test_buffers_follow_the_perturbed_tensor_device():
+    # e.g. params on the sim device, actions on the rl device
+    noise = NonphysicalNoise('gaussian', 'additive', 'cuda:0')
+    noise.set_params(1.0, 0.0, 0.0, 0.0)
+    noise.set_white_noise_mask(torch.ones(4, dtype=torch.bool, device='cuda:0'))
+    out = noise(torch.zeros(4, 2))
+    assert out.device.type == 'cpu'
+    torch.testing.assert_close(out, torch.ones(4, 2))
@@ -0,0 +1,160 @@
+# Copyright (c) 2018-2023, NVIDIA Corporation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import numpy as np
+import pytest
+
+pytest.importorskip("isaacgym")
+
+from isaacgymenvs.utils.dr_utils import BatchedActorRandomizer, DRPropertyBank  # noqa: E402
+
+
+DOF_DTYPE = np.dtype([("stiffness", np.float32), ("damping", np.float32)])
+
+
+class ShapeProps:
+    def __init__(self, friction):
+        self.friction = friction
+
+
+class FakeGym:
+    """Records the properties set per env, for actors whose layout may differ across envs."""
+
+    def __init__(self, num_shapes_per_env, num_dofs):
+        self.shape_props = {env: [ShapeProps(1.0 + 0.1 * i) for i in range(n)]
+                            for env, n in enumerate(num_shapes_per_env)}
+        self.dof_props = {env: np.array([(100.0, 2.0)] * num_dofs, dtype=DOF_DTYPE)
+                          for env in range(len(num_shapes_per_env))}
+        self.set_shapes = {}
+        self.set_dofs = {}
+        self.scales = {}
+
+    def find_actor_handle(self, env, actor):
+        return 0
+
+    def get_actor_rigid_shape_properties(self, env, handle):
+        return [ShapeProps(p.friction) for p in self.shape_props[env]]
+
+    def set_actor_rigid_shape_properties(self, env, handle, props):
+        self.set_shapes[env] = np.array([p.friction for p in props])
+
+    def get_actor_dof_properties(self, env, handle):
+        return self.dof_props[env].copy()
+
+    def set_actor_dof_properties(self, env, handle, props):
+        self.set_dofs[env] = props.copy()
+
+    def set_actor_scale(self, env, handle, scale):
+        self.scales[env] = scale
+
+    def __getattr__(self, name):
+        # getters and setters of properties that are not randomized here
+        return lambda *args: None
+
+
+def dr_params(property_bank=None):
+    params = {
+        "actor_params": {
+            "object": {
+                "scale": {"range": [0.9, 1.1], "operation": "scaling", "distribution": "uniform"},
+                "rigid_shape_properties": {
+                    "friction": {"range": [0.5, 1.5], "operation": "scaling", "distribution": "uniform"},
+                },
+                "dof_properties": {
+                    "stiffness": {"range": [-10.0, 10.0], "operation": "additive", "distribution": "uniform"},
+                    "damping": {"range": [0.5, 2.0], "operation": "scaling", "distribution": "loguniform"},
+                },
+            }
+        }
+    }
+    if property_bank is not None:
+        params["property_bank"] = property_bank
+    return params
+
+
+@pytest.mark.parametrize("num_shapes_per_env", [[3, 3, 3, 3], [2, 5, 3, 1]], ids=["uniform", "ragged"])
+def test_batched_randomizer_applies_samples_within_ranges(num_shapes_per_env):
+    np.random.seed(0)
+    num_envs = len(num_shapes_per_env)
+    gym = FakeGym(num_shapes_per_env, num_dofs=4)
+    randomizer = BatchedActorRandomizer(gym, list(range(num_envs)), dr_params())
+
+    env_ids = list(range(num_envs))
+    randomizer.apply(env_ids, curr_gym_step_count=0, sim_initialized=False)
+
+    for env in env_ids:
+        og_friction = np.array([p.friction for p in gym.shape_props[env]])
+        friction = gym.set_shapes[env]
+        assert friction.shape == og_friction.shape
+        assert np.all(friction >= 0.5 * og_friction - 1e-9) and np.all(friction <= 1.5 * og_friction + 1e-9)
+
+        dofs = gym.set_dofs[env]
+        assert np.all(np.abs(dofs["stiffness"] - 100.0) <= 10.0 + 1e-4)
+        assert np.all(dofs["damping"] >= 2.0 * 0.5 - 1e-4) and np.all(dofs["damping"] <= 2.0 * 2.0 + 1e-4)
+
+        assert 0.9 <= gym.scales[env] <= 1.1
+
+    report = randomizer.last_report
+    assert report["num_envs"] == num_envs
+    # one setter call per env for the scale and each of the two property groups
+    assert report["setter_calls"] == 3 * num_envs
+
+
+def test_batched_randomizer_with_property_bank_is_reproducible():
+    num_shapes_per_env = [2, 5, 3, 1]
+    bank_cfg = {"size": 16, "seed": 3}
+
+    results = []
+    for _ in range(2):
+        gym = FakeGym(num_shapes_per_env, num_dofs=4)
+        randomizer = BatchedActorRandomizer(gym, list(range(4)), dr_params(bank_cfg))
+        randomizer.apply([0, 1, 2, 3], curr_gym_step_count=0, sim_initialized=False)
+        assert np.all(randomizer.env_bank_ids >= 0) and np.all(randomizer.env_bank_ids < 16)
+        results.append((randomizer.env_bank_ids.copy(), {env: gym.set_shapes[env] for env in range(4)}))
+
+    np.testing.assert_array_equal(results[0][0], results[1][0])
+    for env in range(4):
+        np.testing.assert_array_equal(results[0][1][env], results[1][1][env])
+
+
+def test_property_bank_applies_schedule_at_lookup():
+    params = {"range": [0.5, 1.5], "operation": "scaling", "distribution": "uniform",
+              "schedule": "linear", "schedule_steps": 100}
+    bank = DRPropertyBank({"key": (params, ())}, size=1000, seed=0)
+    bank.update(0)
+    entry_ids = bank.assign(1000)
+
+    np.testing.assert_allclose(bank.lookup("key", entry_ids, 0), 1.0)
+
+    half = bank.lookup("key", entry_ids, 50)
+    assert half.min() >= 0.75 - 1e-9 and half.max() <= 1.25 + 1e-9
+    assert half.max() - half.min() > 0.45
+
+    full = bank.lookup("key", entry_ids, 200)
+    assert full.min() >= 0.5 and full.max() <= 1.5
+    assert full.max() - full.min() > 0.9
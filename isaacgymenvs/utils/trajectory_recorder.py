@@ -0,0 +1,172 @@
+# Copyright (c) 2018-2023, NVIDIA Corporation
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from
+#    this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+
+class TrajectoryRecorder:
+    """Streams per-step tensors of a subset of envs to disk.
+
+    Every recorded field owns a preallocated device buffer of ``chunk_length`` rows. Recording a step is a single
+    indexed copy into the next row, so the per-step cost does not depend on how long the capture runs. Once a
+    chunk is full it is copied to the host and handed to a background thread which writes it as an append-only
+    ``<field>_<chunk>.npz`` shard. A ``meta.json`` header next to the shards describes the capture.
+
+    Use :func:`load_trajectory` to read a capture back.
+    """
+
+    def __init__(self, output_dir: str, fields: Dict[str, int], env_ids: Sequence[int], chunk_length: int,
+                 device: str):
+        """
+        Args:
+            output_dir: directory the shards are written to. Created if needed.
+            fields: mapping from field name to the per-env width of the recorded tensor.
+            env_ids: envs to record.
+            chunk_length: number of steps buffered on device before a flush.
+            device: device the recorded tensors live on.
+        """
+        self.output_dir = output_dir
+        self.env_ids = torch.tensor(list(env_ids), dtype=torch.long, device=device)
+        self.chunk_length = chunk_length
+        self.device = device
+
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        num_rec_envs = len(env_ids)
+        self._buffers = {name: torch.zeros((chunk_length, num_rec_envs, width), dtype=torch.float, device=device)
+                         for name, width in fields.items()}
+        self._times = {name: np.zeros(chunk_length, dtype=np.float64) for name in fields}
+        self._episodes = {name: np.zeros((chunk_length, num_rec_envs), dtype=np.int64) for name in fields}
+        self._cursors = {name: 0 for name in fields}
+        self._chunk_ids = {name: 0 for name in fields}
+        # episode index of every recorded env
+        self._episode = np.zeros(num_rec_envs, dtype=np.int64)
+
+        with open(os.path.join(self.output_dir, "meta.json"), "w") as f:
+            json.dump(dict(fields=dict(fields), env_ids=list(env_ids), chunk_length=chunk_length), f)
+
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        self._closed = False
+        atexit.register(self.close)
+
+    def record(self, name: str, tensor: torch.Tensor):
+        """Record one step of ``tensor`` ([num_envs, width]) for the recorded envs."""
+        cursor = self._cursors[name]
+        self._buffers[name][cursor] = tensor[self.env_ids]
+        self._times[name][cursor] = time.time()
+        self._episodes[name][cursor] = self._episode
+
+        self._cursors[name] = cursor + 1
+        if self._cursors[name] == self.chunk_length:
+            self._flush(name)
+
+    def new_episode(self, env_ids: torch.Tensor):
+        """Mark the start of a new episode for the recorded envs among ``env_ids``.
+
+        Subsequent rows of these envs are tagged with their new episode index, the other recorded envs keep theirs.
+        """
+        reset = torch.isin(self.env_ids, env_ids.to(self.env_ids.device)).cpu().numpy()
+        self._episode += reset
+
+    def close(self):
+        """Flush partially filled chunks and wait for the writer thread to finish."""
+        if self._closed:
+            return
+        self._closed = True
+
+        for name in self._buffers:
+            if self._cursors[name] > 0:
+                self._flush(name)
+        self._queue.put(None)
+        self._writer.join()
+
+    def _flush(self, name: str):
+        length = self._cursors[name]
+        shard = dict(
+            data=self._buffers[name][:length].cpu().numpy(),
+            time=self._times[name][:length].copy(),
+            episode=self._episodes[name][:length].copy(),
+        )
+        path = os.path.join(self.output_dir, f"{name}_{self._chunk_ids[name]:06d}.npz")
+        self._queue.put((path, shard))
+
+        self._chunk_ids[name] += 1
+        self._cursors[name] = 0
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, shard = item
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **shard)
+            os.replace(tmp_path, path)
+
+
+def load_trajectory(output_dir: str, name: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Load a field recorded by :class:`TrajectoryRecorder`.
+
+    Returns:
+        data of shape [num_steps, num_recorded_envs, width], wall-clock time of every step and episode index of
+        every step and recorded env ([num_steps, num_recorded_envs]).
+    """
+    shard_paths: List[str] = sorted(glob.glob(os.path.join(output_dir, f"{name}_[0-9]*.npz")))
+    if len(shard_paths) == 0:
+        raise FileNotFoundError(f"No recorded '{name}' shards found in {output_dir}")
+
+    data, times, episodes = [], [], []
+    for path in shard_paths:
+        with np.load(path) as shard:
+            data.append(shard["data"])
+            times.append(shard["time"])
+            episodes.append(shard["episode"])
+
+    return np.concatenate(data), np.concatenate(times), np.concatenate(episodes)
+
+
+def load_trajectory_meta(output_dir: str) -> Optional[Dict]:
+    """Load the ``meta.json`` header of a capture, or None if it is missing."""
+    path = os.path.join(output_dir, "meta.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
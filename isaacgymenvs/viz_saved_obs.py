@@ -1,5 +1,4 @@
 import argparse
-import pickle
 import time
 
 import FramesViewer.utils as fv_utils
@@ -7,8 +6,11 @@ import numpy as np
 from FramesViewer.viewer import Viewer
 from scipy.spatial.transform import Rotation as R
 
+from isaacgymenvs.utils.trajectory_recorder import load_trajectory
+
 parser = argparse.ArgumentParser()
-parser.add_argument("--path", type=str, default="saved_obs.pkl")
+parser.add_argument("--path", type=str, default="recordings")
+parser.add_argument("--env", type=int, default=0, help="index into the recorded envs")
 args = parser.parse_args()
 
 fv = Viewer()
@@ -19,7 +21,8 @@ ang_vel_pose = fv_utils.make_pose([0.1, 0.2, 0.1], [0, 0, 0])
 ang_vel_euler = [0, 0, 0]
 ang_vel_mat = np.eye(3)
 
-saved_obs = pickle.loads(open(args.path, "rb").read())
+saved_obs, _, _ = load_trajectory(args.path, "obs")
+saved_obs = saved_obs[:, args.env]
 i = 0
 while True:
     obs = saved_obs[i]